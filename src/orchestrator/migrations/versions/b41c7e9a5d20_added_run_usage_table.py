@@ -0,0 +1,57 @@
+"""added run usage table
+
+Revision ID: b41c7e9a5d20
+Revises: e77b8d7a2d3e
+Create Date: 2026-10-18 16:05:12.481937
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b41c7e9a5d20'
+down_revision: Union[str, Sequence[str], None] = 'e77b8d7a2d3e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('run_usage',
+    sa.Column('run_id', sa.UUID(), nullable=False),
+    sa.Column('thread_id', sa.UUID(), nullable=True),
+    sa.Column('assistant_id', sa.UUID(), nullable=True),
+    sa.Column('api_key_id', sa.UUID(), nullable=True),
+    sa.Column('provider', sa.String(length=100), nullable=True),
+    sa.Column('model', sa.String(length=100), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('llm_calls', sa.Integer(), nullable=False),
+    sa.Column('input_tokens', sa.Integer(), nullable=False),
+    sa.Column('output_tokens', sa.Integer(), nullable=False),
+    sa.Column('duration_ms', sa.Integer(), nullable=False),
+    sa.Column('first_token_ms', sa.Integer(), nullable=True),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('created_by', sa.String(length=255), nullable=True),
+    sa.Column('modified_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('modified_by', sa.String(length=255), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    schema='agents'
+    )
+    op.create_index('ix_run_usage_started_at', 'run_usage', ['started_at'], unique=False, schema='agents')
+    op.create_index('ix_run_usage_api_key_id_started_at', 'run_usage', ['api_key_id', 'started_at'], unique=False, schema='agents')
+    op.create_index('ix_run_usage_assistant_id_started_at', 'run_usage', ['assistant_id', 'started_at'], unique=False, schema='agents')
+    op.create_index('ix_run_usage_thread_id', 'run_usage', ['thread_id'], unique=False, schema='agents')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_run_usage_thread_id', table_name='run_usage', schema='agents')
+    op.drop_index('ix_run_usage_assistant_id_started_at', table_name='run_usage', schema='agents')
+    op.drop_index('ix_run_usage_api_key_id_started_at', table_name='run_usage', schema='agents')
+    op.drop_index('ix_run_usage_started_at', table_name='run_usage', schema='agents')
+    op.drop_table('run_usage', schema='agents')
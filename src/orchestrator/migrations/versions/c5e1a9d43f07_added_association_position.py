@@ -0,0 +1,45 @@
+"""added position to association tables
+
+Revision ID: c5e1a9d43f07
+Revises: b41c7e9a5d20
+Create Date: 2026-10-18 18:42:36.215804
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e1a9d43f07'
+down_revision: Union[str, Sequence[str], None] = 'b41c7e9a5d20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Existing links are numbered in their current physical order, the order they
+# were listed in until now; from here on the crud writes the position.
+BACKFILL_SQL = """
+UPDATE agents.{table} t SET position = o.position
+FROM (
+    SELECT ctid, row_number() OVER (PARTITION BY {owner} ORDER BY ctid) - 1 AS position
+    FROM agents.{table}
+) o
+WHERE t.ctid = o.ctid
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, owner in (('agent_mcp_server', 'agent_id'), ('orchestrator_sub_agent', 'orchestrator_id')):
+        op.add_column(table,
+            sa.Column('position', sa.Integer(), server_default='0', nullable=False),
+            schema='agents'
+        )
+        op.execute(BACKFILL_SQL.format(table=table, owner=owner))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('orchestrator_sub_agent', 'position', schema='agents')
+    op.drop_column('agent_mcp_server', 'position', schema='agents')
@@ -0,0 +1,49 @@
+"""added thread table
+
+Revision ID: e77b8d7a2d3e
+Revises: 31f392f4e451
+Create Date: 2026-10-18 10:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'e77b8d7a2d3e'
+down_revision: Union[str, Sequence[str], None] = '31f392f4e451'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('thread',
+    sa.Column('assistant_id', sa.UUID(), nullable=True),
+    sa.Column('status', sa.String(length=50), nullable=True),
+    sa.Column('metadata', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('config', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('ttl_minutes', sa.Integer(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('created_by', sa.String(length=255), nullable=True),
+    sa.Column('modified_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('modified_by', sa.String(length=255), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    schema='agents'
+    )
+    op.create_index('ix_thread_assistant_id', 'thread', ['assistant_id'], unique=False, schema='agents')
+    op.create_index('ix_thread_modified_at', 'thread', ['modified_at'], unique=False, schema='agents')
+    op.create_index('ix_thread_expires_at', 'thread', ['expires_at'], unique=False, schema='agents',
+                    postgresql_where=sa.text('expires_at IS NOT NULL'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_thread_expires_at', table_name='thread', schema='agents')
+    op.drop_index('ix_thread_modified_at', table_name='thread', schema='agents')
+    op.drop_index('ix_thread_assistant_id', table_name='thread', schema='agents')
+    op.drop_table('thread', schema='agents')
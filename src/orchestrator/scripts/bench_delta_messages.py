@@ -0,0 +1,109 @@
+import sys
+import os
+
+# Append root directory (the one containing `src`) to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+"""
+Benchmark: checkpoint bytes written per conversation, with and without
+DeltaMessageSaver.
+
+Runs one conversation of --turns turns (fake model call with a tool call, tool,
+fake model answer) on a fresh SQLite file, then reports the bytes stored in
+checkpoints (plus message bodies for the delta saver), the bytes per step and
+the time of the run and of a history read. Checks that both savers return the
+same state.
+
+    uv run ./scripts/bench_delta_messages.py --turns 50
+"""
+
+import argparse
+import asyncio
+import sqlite3
+import tempfile
+import time
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from langgraph.prebuilt import create_react_agent
+
+from src.orchestrator.core.delta_messages import DeltaMessageSaver
+
+
+@tool
+def lookup(query: str) -> str:
+    """Look up a query"""
+    return f"result for {query} " + "data " * 100
+
+
+class ToolCallingFakeModel(GenericFakeChatModel):
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+def model_messages(turns: int):
+    for turn in range(turns):
+        yield AIMessage(content="", tool_calls=[{"name": "lookup", "args": {"query": f"q{turn}"}, "id": f"call-{turn}"}])
+        yield AIMessage(content=f"answer {turn} " + "lorem ipsum " * 100)
+
+
+def stored_bytes(path: str) -> tuple:
+    conn = sqlite3.connect(path)
+    try:
+        checkpoints, checkpoint_bytes = conn.execute("SELECT count(*), sum(length(checkpoint)) FROM checkpoints").fetchone()
+        tables = {name for name, in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        message_bytes = 0
+        if "checkpoint_messages" in tables:
+            message_bytes = conn.execute("SELECT coalesce(sum(length(body)), 0) FROM checkpoint_messages").fetchone()[0]
+        return checkpoints, checkpoint_bytes, message_bytes
+    finally:
+        conn.close()
+
+
+async def run(label: str, delta: bool, turns: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "checkpoints.sqlite")
+        async with AsyncSqliteSaver.from_conn_string(path) as cp:
+            if delta:
+                cp = DeltaMessageSaver(cp)
+            graph = create_react_agent(model=ToolCallingFakeModel(messages=model_messages(turns)),
+                                       tools=[lookup], checkpointer=cp)
+            config = {"configurable": {"thread_id": "bench"}}
+
+            start = time.perf_counter()
+            for turn in range(turns):
+                await graph.ainvoke({"messages": [{"role": "user", "content": f"question {turn}"}]}, config)
+            run_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            history = [state async for state in graph.aget_state_history(config)]
+            history_time = time.perf_counter() - start
+            state = await graph.aget_state(config)
+
+        checkpoints, checkpoint_bytes, message_bytes = stored_bytes(path)
+
+    total = checkpoint_bytes + message_bytes
+    print(f"{label:<8} checkpoints={checkpoints:<5} stored={total / 1024:9.1f} KiB "
+          f"(checkpoints {checkpoint_bytes / 1024:.1f} KiB, messages {message_bytes / 1024:.1f} KiB)  "
+          f"per step={total / checkpoints / 1024:6.1f} KiB  run={run_time * 1000:7.1f} ms  "
+          f"history({len(history)})={history_time * 1000:6.1f} ms")
+    return state.values["messages"]
+
+
+async def main(turns: int):
+    expected = await run("current", False, turns)
+    messages = await run("delta", True, turns)
+    # Message ids are random per run, compare everything else
+    def strip(ms):
+        return [m.model_dump(exclude={"id"}) for m in ms]
+    assert strip(messages) == strip(expected), "delta saver returned different messages"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=50)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.turns))
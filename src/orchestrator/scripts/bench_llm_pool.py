@@ -0,0 +1,117 @@
+import sys
+import os
+
+# Append root directory (the one containing `src`) to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+"""
+Microbenchmark: per-agent LLM clients vs the shared LLM client registry.
+
+Builds an orchestrator-sized set of ReAct agents on one api key, sends one
+streamed request per agent in turn to a local OpenAI compatible stub, and reports
+graph build time and the sockets left open by the process.
+
+    uv run ./scripts/bench_llm_pool.py --agents 8
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import socket
+import time
+
+from langgraph.prebuilt import create_react_agent
+
+from src.orchestrator.core import llm_provider
+
+
+def run_stub_server(port: int):
+    import uvicorn
+    from fastapi import FastAPI
+    from fastapi.responses import StreamingResponse
+
+    app = FastAPI()
+
+    @app.post("/v1/chat/completions")
+    async def completions():
+        async def stream():
+            for token in ["Hello", " from", " stub"]:
+                chunk = {
+                    "id": "chatcmpl-bench", "object": "chat.completion.chunk", "created": 0, "model": "bench",
+                    "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="error")
+
+
+def open_sockets() -> int:
+    fd_dir = f"/proc/{os.getpid()}/fd"
+    if not os.path.isdir(fd_dir):
+        return -1  # not available on this platform
+    count = 0
+    for fd in os.listdir(fd_dir):
+        try:
+            count += os.readlink(os.path.join(fd_dir, fd)).startswith("socket:")
+        except OSError:
+            pass
+    return count
+
+
+async def run(label: str, agents: int, base_url: str, pooled: bool):
+    llm_provider.LLM_CLIENT_POOL_ENABLED = pooled
+    await llm_provider.close_llm_clients()
+    sockets_before = open_sockets()
+
+    start = time.perf_counter()
+    graphs = []
+    for i in range(agents):
+        model = llm_provider.get_llm("openai", "sk-bench", "bench", base_url, "bench-key")
+        graphs.append(create_react_agent(model=model, tools=[], name=f"agent_{i}", prompt="You are a benchmark agent."))
+    build_ms = (time.perf_counter() - start) * 1000
+
+    # Sub agents are called one after another, as the supervisor hands off
+    start = time.perf_counter()
+    for graph in graphs:
+        await graph.ainvoke({"messages": [{"role": "user", "content": "hi"}]})
+    run_ms = (time.perf_counter() - start) * 1000
+
+    print(f"{label:<10} agents={agents:<3} build={build_ms:8.1f} ms  first run={run_ms:8.1f} ms  "
+          f"open sockets={open_sockets() - sockets_before}")
+
+
+async def main(agents: int, port: int):
+    base_url = f"http://127.0.0.1:{port}/v1"
+    # Warm up imports and lazy initialisation so neither side pays for them
+    llm_provider.create_llm("openai", "sk-bench", "bench", base_url)
+    await run("per-agent", agents, base_url, pooled=False)
+    await run("pooled", agents, base_url, pooled=True)
+    await llm_provider.close_llm_clients()
+
+
+def wait_for_port(port: int, timeout: float = 10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as s:
+            if s.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.1)
+    raise RuntimeError("stub server did not start")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--agents", type=int, default=8)
+    parser.add_argument("--port", type=int, default=18765)
+    args = parser.parse_args()
+
+    server = multiprocessing.Process(target=run_stub_server, args=(args.port,), daemon=True)
+    server.start()
+    try:
+        wait_for_port(args.port)
+        asyncio.run(main(args.agents, args.port))
+    finally:
+        server.terminate()
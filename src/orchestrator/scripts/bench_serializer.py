@@ -0,0 +1,109 @@
+import sys
+import os
+
+# Append root directory (the one containing `src`) to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+"""
+Microbenchmark: SSE frame encoding of a recorded stream.
+
+Records the events of a fake-model run (--chunks message chunks plus the values
+events) and encodes every frame the way the stream endpoint does: the previous
+json.dumps(cls=LangChainMessageEncoder) path, and the json and orjson backends of
+helpers/serializer.py. Checks that the json backend is byte-identical and that
+the orjson backend writes the same values in its own (compact, UTF-8) style
+throughout every frame.
+
+    uv run ./scripts/bench_serializer.py --chunks 10000
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.prebuilt import create_react_agent
+
+from src.orchestrator.helpers import serializer, utils
+from src.orchestrator.helpers.utils import (
+    convert_message_to_serializable, create_metadata, LangChainMessageEncoder, MetadataTemplate
+)
+
+HEADERS = {"host": "localhost:8000", "x-request-id": "bench", "user-agent": "bench", "accept": "*/*"}
+
+
+async def record(chunks: int) -> list:
+    # The fake model streams words and the spaces between them as separate chunks
+    answer = " ".join(f"token{i}" for i in range(chunks // 2 + 1))
+    model = GenericFakeChatModel(messages=iter([AIMessage(content=answer)]))
+    graph = create_react_agent(model=model, tools=[], checkpointer=InMemorySaver())
+    config = {"configurable": {"thread_id": "bench"}}
+    events = []
+    async for event in graph.astream({"messages": [{"role": "user", "content": "hi"}]},
+                                     config=config, stream_mode=["values", "messages"]):
+        events.append(event)
+    return events
+
+
+def encode_legacy(events: list) -> list:
+    frames = []
+    for event in events:
+        if event[0] == "messages":
+            message = convert_message_to_serializable(event[1])
+            metadata = create_metadata("run", "bench", "assistant", HEADERS, message[1])
+            frames.append(json.dumps([message[0], metadata], cls=LangChainMessageEncoder))
+        else:
+            frames.append(json.dumps(event[1], cls=LangChainMessageEncoder))
+    return frames
+
+
+def encode(events: list, backend) -> list:
+    utils.dumps, utils.separator = backend.dumps, backend.separator
+    template = MetadataTemplate("run", "bench", "assistant", HEADERS)
+    frames = []
+    for event in events:
+        if event[0] == "messages":
+            message = convert_message_to_serializable(event[1])
+            frames.append(f"[{backend.dumps(message[0])}{backend.separator}{template.render(message[1])}]")
+        else:
+            frames.append(backend.dumps(event[1]))
+    return frames
+
+
+def timed(label: str, fn, events: list, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        frames = fn(events)
+        best = min(best, time.perf_counter() - start)
+    size = sum(len(frame.encode()) for frame in frames)
+    print(f"{label:<10} frames={len(frames):<6} total={best * 1000:8.1f} ms  "
+          f"per frame={best / len(frames) * 1e6:6.2f} us  bytes={size}")
+    return frames
+
+
+def main(chunks: int, repeat: int):
+    events = asyncio.run(record(chunks))
+
+    expected = timed("legacy", encode_legacy, events, repeat)
+    frames = timed("json", lambda e: encode(e, serializer.JsonSerializer()), events, repeat)
+    assert frames == expected, "json backend output differs"
+
+    if serializer.orjson is None:
+        print("orjson is not installed, skipped")
+        return
+    frames = timed("orjson", lambda e: encode(e, serializer.OrjsonSerializer()), events, repeat)
+    compact = [json.dumps(json.loads(f), separators=(",", ":"), ensure_ascii=False) for f in expected]
+    assert frames == compact, "orjson backend output differs from the compact form of the json output"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    main(args.chunks, args.repeat)
@@ -0,0 +1,107 @@
+import sys
+import os
+
+# Append root directory (the one containing `src`) to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+"""
+Benchmark: concurrent conversations on the SQLite checkpointer.
+
+Runs --conversations simulated conversations at once, --turns turns each, on a
+fresh SQLite file. Every turn is a fake model call that calls a tool, the tool,
+and a fake model answer (each model call waits --model-latency-ms), then a read
+of the thread history (as the chat UI does after each run). Compares AsyncSqliteSaver with TunedSqliteSaver and reports the
+throughput and the turn and history latencies.
+
+    uv run ./scripts/bench_sqlite_checkpointer.py --conversations 50 --turns 5
+"""
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from langgraph.prebuilt import create_react_agent
+
+from src.orchestrator.core.lite_memory.sqlite_tuned import TunedSqliteSaver
+
+
+@tool
+def lookup(query: str) -> str:
+    """Look up a query"""
+    return f"result for {query}"
+
+
+class ToolCallingFakeModel(GenericFakeChatModel):
+    latency: float = 0.0
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    async def _agenerate(self, *args, **kwargs):
+        await asyncio.sleep(self.latency)  # stands in for the provider round trip
+        return await super()._agenerate(*args, **kwargs)
+
+
+def model_messages(turns: int):
+    for turn in range(turns):
+        yield AIMessage(content="", tool_calls=[{"name": "lookup", "args": {"query": f"q{turn}"}, "id": f"call-{turn}"}])
+        yield AIMessage(content=f"answer {turn} " + "lorem ipsum " * 50)
+
+
+async def conversation(cp, index: int, turns: int, latency: float, turn_times: list, history_times: list):
+    model = ToolCallingFakeModel(messages=model_messages(turns), latency=latency)
+    graph = create_react_agent(model=model, tools=[lookup], checkpointer=cp)
+    config = {"configurable": {"thread_id": f"conversation-{index}"}}
+    for turn in range(turns):
+        start = time.perf_counter()
+        await graph.ainvoke({"messages": [{"role": "user", "content": f"question {turn}"}]}, config)
+        turn_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        _ = [state async for state in graph.aget_state_history(config, limit=20)]
+        history_times.append(time.perf_counter() - start)
+
+
+def percentile(values: list, q: float) -> float:
+    return statistics.quantiles(values, n=100)[int(q) - 1] * 1000
+
+
+async def run(label: str, saver_cls, conversations: int, turns: int, latency: float):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "checkpoints.sqlite")
+        async with saver_cls.from_conn_string(path) as cp:
+            await cp.setup()
+            turn_times, history_times = [], []
+            start = time.perf_counter()
+            await asyncio.gather(*[
+                conversation(cp, i, turns, latency, turn_times, history_times) for i in range(conversations)
+            ])
+            elapsed = time.perf_counter() - start
+            stats = cp.stats() if hasattr(cp, "stats") else {}
+
+    print(f"{label:<8} total={elapsed:6.2f} s  turns/s={len(turn_times) / elapsed:7.1f}  "
+          f"turn p50={percentile(turn_times, 50):7.1f} ms p95={percentile(turn_times, 95):7.1f} ms  "
+          f"history p50={percentile(history_times, 50):6.1f} ms p95={percentile(history_times, 95):6.1f} ms")
+    if stats:
+        print(f"         commits={stats['commits']} statements={stats['statements']}")
+
+
+async def main(conversations: int, turns: int, latency: float):
+    await run("current", AsyncSqliteSaver, conversations, turns, latency)
+    await run("tuned", TunedSqliteSaver, conversations, turns, latency)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--conversations", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--model-latency-ms", type=float, default=200)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.conversations, args.turns, args.model_latency_ms / 1000))
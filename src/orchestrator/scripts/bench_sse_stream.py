@@ -0,0 +1,129 @@
+import sys
+import os
+
+# Append root directory (the one containing `src`) to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+"""
+Microbenchmark: time-to-last-token of the chat stream endpoint.
+
+Streams a fake model answer of --tokens chunks through POST
+/chat/threads/{id}/runs/stream and reports time to the first and last token for
+the old fixed 10 ms per-event sleep, the buffered stream, and the buffered stream
+with chunk coalescing.
+
+    uv run ./scripts/bench_sse_stream.py --tokens 500
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.prebuilt import create_react_agent
+
+from src.api import chat
+from src.core.database import get_db
+from src.orchestrator.core.lite_memory.sqlite_cp import get_saver
+
+
+class SleepingGraph:
+    """Replays the previous endpoint behaviour: a 10 ms sleep after every stream event."""
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    async def astream(self, *args, **kwargs):
+        async for event in self.graph.astream(*args, **kwargs):
+            yield event
+            await asyncio.sleep(0.01)
+
+
+def build_graph(tokens: int):
+    answer = " ".join(f"token{i}" for i in range(tokens))
+    model = GenericFakeChatModel(messages=iter([AIMessage(content=answer)]))
+    return create_react_agent(model=model, tools=[], checkpointer=InMemorySaver())
+
+
+async def run(label: str, base_url: str, tokens: int, legacy: bool = False, coalesce_ms: float = 0):
+    graph = build_graph(tokens)
+    if legacy:
+        graph = SleepingGraph(graph)
+
+    async def fake_get_compiled_graph(db, assistant_id, checkpointer):
+        return graph
+
+    chat.get_compiled_graph = fake_get_compiled_graph
+    chat.SSE_COALESCE_INTERVAL_MS = coalesce_ms
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+        thread_id = str(uuid.uuid4())
+        body = {
+            "assistant_id": "bench",
+            "input": {"messages": [{"role": "user", "content": "hi"}]},
+            "stream_mode": ["messages-tuple"],
+        }
+
+        start = time.perf_counter()
+        first_token = None
+        frames = 0
+        async with client.stream("POST", f"/chat/threads/{thread_id}/runs/stream", json=body) as response:
+            async for line in response.aiter_lines():
+                if line == "event: messages":
+                    frames += 1
+                    if first_token is None:
+                        first_token = time.perf_counter() - start
+        last_token = time.perf_counter() - start
+
+    print(f"{label:<22} tokens={tokens:<5} frames={frames:<5} "
+          f"first={first_token * 1000:8.1f} ms  last={last_token * 1000:8.1f} ms")
+
+
+async def fake_get_thread(thread_id):
+    return {"thread_id": thread_id, "assistant_id": "bench"}
+
+
+async def fake_touch_thread(thread_id):
+    pass
+
+
+async def main(tokens: int, coalesce_ms: float, port: int):
+    # Threads are kept in memory, the benchmark needs no database
+    chat.thread_crud.get_thread = fake_get_thread
+    chat.thread_crud.touch_thread = fake_touch_thread
+
+    # Served over a real socket, so time to first token is what a client sees
+    app = FastAPI()
+    app.include_router(chat.router)
+    app.dependency_overrides[get_db] = lambda: None
+    app.dependency_overrides[get_saver] = lambda: None
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="error"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        await run("warm-up", base_url, 10)
+        await run("fixed 10 ms sleep", base_url, tokens, legacy=True)
+        await run("buffered", base_url, tokens)
+        await run(f"buffered+coalesce {coalesce_ms:g}ms", base_url, tokens, coalesce_ms=coalesce_ms)
+    finally:
+        server.should_exit = True
+        await serving
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=500)
+    parser.add_argument("--coalesce-ms", type=float, default=20)
+    parser.add_argument("--port", type=int, default=18766)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.tokens, args.coalesce_ms, args.port))
@@ -0,0 +1,130 @@
+import sys
+import os
+
+# Append root directory (the one containing `src`) to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+"""
+Copy the checkpoints of the SQLite checkpointer into Postgres.
+
+Reads the checkpoints and writes tables of the SQLite file (and the
+checkpoint_messages table of CHECKPOINT_DELTA_MESSAGES) in batches and
+inserts them into the Postgres checkpointer tables as is (the serialized
+checkpoints don't change). Rows that already exist are skipped, so the script
+can be re-run. Stop the service, run it, then start the service with
+CHECKPOINTER_BACKEND=postgres.
+
+    uv run ./scripts/migrate_checkpoints.py --sqlite data/checkpoints.sqlite
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import aiosqlite
+import asyncpg
+
+from src.core.config import CHECKPOINT_PG_DSN, CHECKPOINT_PG_SCHEMA
+from src.orchestrator.core.delta_messages import PG_SETUP_SQL as PG_MESSAGES_SETUP_SQL
+from src.orchestrator.core.lite_memory.sqlite_cp import DB_PATH
+from src.orchestrator.core.pg_memory.pg_cp import AsyncPostgresSaver, strip_nul
+
+INSERT_CHECKPOINTS_SQL = """
+INSERT INTO {schema}.checkpoints (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata)
+VALUES ($1, $2, $3, $4, $5, $6, $7::jsonb)
+ON CONFLICT (thread_id, checkpoint_ns, checkpoint_id) DO NOTHING
+"""
+
+INSERT_WRITES_SQL = """
+INSERT INTO {schema}.writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value)
+VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+ON CONFLICT (thread_id, checkpoint_ns, checkpoint_id, task_id, idx) DO NOTHING
+"""
+
+INSERT_MESSAGES_SQL = """
+INSERT INTO {schema}.messages (thread_id, digest, type, body)
+VALUES ($1, $2, $3, $4)
+ON CONFLICT (thread_id, digest) DO NOTHING
+"""
+
+
+def _metadata(value) -> str:
+    # SQLite stores the metadata as serialized JSON bytes
+    if value is None:
+        return "{}"
+    return json.dumps(strip_nul(json.loads(value)))
+
+
+async def copy_table(source: aiosqlite.Connection, conn: asyncpg.Connection, select_sql: str,
+                     insert_sql: str, convert, batch_size: int) -> int:
+    copied = 0
+    async with source.execute(select_sql) as cursor:
+        while rows := await cursor.fetchmany(batch_size):
+            async with conn.transaction():
+                await conn.executemany(insert_sql, [convert(row) for row in rows])
+            copied += len(rows)
+            print(f"  {copied} rows", end="\r")
+    print()
+    return copied
+
+
+async def main(sqlite_path: str, dsn: str, schema: str, batch_size: int):
+    start = time.perf_counter()
+
+    # Creates the schema and tables if needed
+    async with AsyncPostgresSaver.from_conn_string(dsn, schema=schema):
+        pass
+
+    async with aiosqlite.connect(sqlite_path) as source:
+        conn = await asyncpg.connect(dsn)
+        try:
+            print("checkpoints")
+            checkpoints = await copy_table(
+                source, conn,
+                "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata "
+                "FROM checkpoints",
+                INSERT_CHECKPOINTS_SQL.format(schema=schema),
+                lambda row: (*row[:6], _metadata(row[6])),
+                batch_size,
+            )
+            print("writes")
+            writes = await copy_table(
+                source, conn,
+                "SELECT thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value FROM writes",
+                INSERT_WRITES_SQL.format(schema=schema),
+                tuple,
+                batch_size,
+            )
+            messages = 0
+            async with source.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'checkpoint_messages'"
+            ) as cursor:
+                has_messages = await cursor.fetchone() is not None
+            if has_messages:
+                # Checkpoints saved with delta messages only hold the digests of their messages
+                print("messages")
+                await conn.execute(PG_MESSAGES_SETUP_SQL.format(schema=schema))
+                messages = await copy_table(
+                    source, conn,
+                    "SELECT thread_id, digest, type, body FROM checkpoint_messages",
+                    INSERT_MESSAGES_SQL.format(schema=schema),
+                    tuple,
+                    batch_size,
+                )
+        finally:
+            await conn.close()
+
+    print(f"Read {checkpoints} checkpoints, {writes} writes and {messages} messages in "
+          f"{time.perf_counter() - start:.1f} s (rows already in Postgres are skipped)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sqlite", default=DB_PATH)
+    parser.add_argument("--dsn", default=CHECKPOINT_PG_DSN)
+    parser.add_argument("--schema", default=CHECKPOINT_PG_SCHEMA)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.sqlite, args.dsn, args.schema, args.batch_size))
@@ -0,0 +1,51 @@
+import sys
+import os
+
+# Append root directory (the one containing `src`) to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+"""
+Switch an existing SQLite checkpointer file to incremental vacuum.
+
+Checkpoint retention gives the pages of deleted checkpoints back to the file
+system with PRAGMA incremental_vacuum, which needs auto_vacuum=INCREMENTAL.
+Files created by the tuned saver start in that mode; an older file only takes
+it with one full VACUUM, which rewrites the whole file and needs as much free
+disk space. Stop the service, run it, then start the service again.
+
+    uv run ./scripts/sqlite_incremental_vacuum.py --sqlite data/checkpoints.sqlite
+"""
+
+import argparse
+import sqlite3
+import time
+
+from src.orchestrator.core.lite_memory.sqlite_cp import DB_PATH
+
+
+def main(sqlite_path: str):
+    start = time.perf_counter()
+    conn = sqlite3.connect(sqlite_path, isolation_level=None)
+    try:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            print(f"{sqlite_path} already uses incremental vacuum")
+            return
+        size_before = os.path.getsize(sqlite_path)
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+        mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+    finally:
+        conn.close()
+
+    if mode != 2:
+        raise SystemExit(f"{sqlite_path} was not converted (auto_vacuum={mode})")
+    print(f"Converted {sqlite_path} in {time.perf_counter() - start:.1f} s "
+          f"({size_before} -> {os.path.getsize(sqlite_path)} bytes)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sqlite", default=DB_PATH)
+    args = parser.parse_args()
+
+    main(args.sqlite)
@@ -1,19 +1,37 @@
 # main.py
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request, Header
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional#, AsyncGenerator
+from typing import List, Dict, Any, Optional, Union#, AsyncGenerator
 import asyncio
+import logging
 import importlib.metadata
+import time
 import uuid
 from datetime import datetime, timezone
 import json
-from fastapi.responses import StreamingResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.core.database import get_db
+from src.core.database import get_db, async_session, engine
+from src.core.db_metrics import db_metrics
 from langgraph.types import Command
-from src.orchestrator.helpers.utils import convert_message_to_serializable, create_metadata, LangChainMessageEncoder
-from src.orchestrator.runtime_service import get_agent
+from src.orchestrator.helpers.utils import convert_message_to_serializable, MetadataTemplate
+from src.orchestrator.helpers.serializer import dumps, separator
+from src.crud import thread as thread_crud
+from src.core.config import THREAD_DEFAULT_TTL_MINUTES
+from src.orchestrator.runtime_service import get_agent, get_graph_cache_stats
 from src.orchestrator.core.lite_memory.sqlite_cp import get_saver
+from src.orchestrator.core.checkpoint_retention import checkpoint_retention
+from src.orchestrator.core.run_manager import Run, RunQueueFull, run_manager
+from src.orchestrator.core.run_streams import run_streams
+from src.orchestrator.core.tracing import TracingCallbackHandler, tracer
+from src.orchestrator.core.metrics import record_message, run_first_token
+from src.orchestrator.core.usage_recorder import usage_recorder
+from src.orchestrator.helpers.streaming import SseFrameBuffer, coalesce_message_chunks
+from src.core.config import SSE_COALESCE_INTERVAL_MS, SSE_KEEPALIVE_SECONDS, SSE_METADATA_FIRST_MESSAGE_ONLY
+from src.core.config import RUN_DISCONNECT_POLL_SECONDS, BATCH_MAX_CONCURRENCY, BATCH_MAX_INPUTS
+
+logger = logging.getLogger(__name__)
 
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
@@ -37,7 +55,7 @@ async def get_info() -> Dict[str, Any]:
     Returns information about the server configuration.
     This endpoint is called by the agent-chat-ui to determine capabilities.
     """
-    print(">>> Info API call")
+    logger.debug("Info API call")
     return {
         "version": "0.3.1",  # Your API adapter version
         "langgraph_py_version": get_langgraph_version(),
@@ -57,15 +75,45 @@ async def get_info() -> Dict[str, Any]:
     }
 
 
+@router.get("/graphs/cache")
+async def get_graph_cache_info() -> Dict[str, Any]:
+    """
+    Returns compiled graph cache counters (hits, misses, evictions), entries and
+    the duration (or error) of the last build of every sub agent.
+    """
+    return get_graph_cache_stats()
+
+
+@router.get("/database/stats")
+async def get_database_stats() -> Dict[str, Any]:
+    """
+    Returns application database pool usage (connections in use, overflow), checkout
+    wait times and statement timings with the recent slow queries.
+    """
+    return db_metrics.stats(engine.pool)
+
+
+@router.get("/traces")
+async def get_traces(limit: int = 100, trace_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Returns the last finished spans, newest first (TRACING_EXPORTER=memory), optionally
+    those of one trace. Each run is a trace rooted at its run.stream span.
+    """
+    return {"exporter": tracer.exporter, "spans": tracer.recent(limit, trace_id)}
+
+
+@router.get("/checkpoints/retention")
+async def get_checkpoint_retention_info() -> Dict[str, Any]:
+    """
+    Returns checkpoint retention counters (checkpoints, writes and message bodies deleted, bytes reclaimed) and the last run.
+    """
+    return checkpoint_retention.stats()
+
+
 ##################
 # Threads endpoint
 ##################
 
-# In-memory storage for threads (replace with persistent storage in production)
-threads_store = {}
-# In-memory storage for tracking threads with agent Ids
-kv_store = {}
-
 class ThreadCreateRequest(BaseModel):
     thread_id: Optional[str] = None
     metadata: Optional[Dict[str, Any]] = {}
@@ -90,28 +138,29 @@ async def create_thread(request: ThreadCreateRequest):
     Creates a new thread with the provided metadata and config.
     Returns the thread object with generated ID and timestamps.
     """
-    print(">>> Create Thread API call")
-    print(f">>> Params: {request}")
-    # Generate a unique thread ID
-    thread_id = str(uuid.uuid4())
-    print(f">>> Thread Id: {thread_id}")
-    # Get current timestamp in ISO format with timezone
-    current_time = datetime.now(timezone.utc).isoformat()
-    
-    # Create the thread object
-    thread = {
-        "thread_id": thread_id,
-        "created_at": current_time,
-        "updated_at": current_time,
-        "metadata": request.metadata or {},
+    logger.debug("Create thread: %s", request)
+
+    # LangGraph thread TTL: {"strategy": "delete", "ttl": <minutes>}
+    ttl_minutes = THREAD_DEFAULT_TTL_MINUTES or None
+    if request.ttl:
+        if request.ttl.get("strategy", "delete") != "delete":
+            raise HTTPException(status_code=422, detail="Only the 'delete' TTL strategy is supported")
+        try:
+            ttl = int(request.ttl.get("ttl") or 0)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=422, detail="ttl must be a number of minutes")
+        if ttl < 0:
+            raise HTTPException(status_code=422, detail="ttl must not be negative")
+        ttl_minutes = ttl or ttl_minutes
+
+    thread = await thread_crud.create_thread({
+        "metadata_json": request.metadata or {},
+        "config_json": request.config or {},
         "status": "idle",
-        "config": request.config or {},
-        "values": None
-    }
-    
-    # Store the thread
-    threads_store[thread_id] = thread
-    
+        "ttl_minutes": ttl_minutes
+    })
+    logger.debug("Thread %s created", thread["thread_id"])
+
     return thread
 
 
@@ -119,32 +168,46 @@ async def create_thread(request: ThreadCreateRequest):
 @router.get("/threads/{thread_id}", response_model=ThreadResponse)
 async def get_thread(thread_id: str):
     """Retrieve a thread by its ID"""
-    print(">>> Get Thread API call")
-    if thread_id not in threads_store:
+    logger.debug("Get thread %s", thread_id)
+    thread = await thread_crud.get_thread(thread_id)
+    if not thread:
         raise HTTPException(status_code=404, detail="Thread not found")
-    return threads_store[thread_id]
+    return thread
 
 
 # a DELETE endpoint to remove a thread
 @router.delete("/threads/{thread_id}")
 async def delete_thread(thread_id: str):
     """Delete a thread by its ID"""
-    print(">>> Delete Thread API call")
-    if thread_id not in threads_store:
+    logger.debug("Delete thread %s", thread_id)
+    if not await thread_crud.delete_thread(thread_id):
         raise HTTPException(status_code=404, detail="Thread not found")
-    del threads_store[thread_id]
+    await run_manager.cancel_thread(thread_id)
     return {"status": "deleted", "thread_id": thread_id}
 
 
+async def _set_thread_assistant(thread_id: str, assistant_id: str):
+    """Bind the thread to the assistant of its first run; an id that is not a UUID is a 422"""
+    try:
+        await thread_crud.set_thread_assistant(thread_id, assistant_id)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
 ##################
 # History endpoint
 ##################
 
 class HistoryRequest(BaseModel):
     limit: Optional[int] = 1000
+    before: Optional[Union[str, Dict[str, Any]]] = None
+    metadata: Optional[Dict[str, Any]] = None
+    checkpoint: Optional[Dict[str, Any]] = None
+    # False returns checkpoint headers only (no state values)
+    include_values: Optional[bool] = True
 
 class CheckpointResponse(BaseModel):
-    values: Dict[str, Any]
+    values: Optional[Dict[str, Any]] = None
     next: List[str]
     tasks: List[Dict[str, Any]]
     metadata: Dict[str, Any]
@@ -169,68 +232,114 @@ async def get_thread_history(
     db: AsyncSession = Depends(get_db),
     checkpointer = Depends(get_saver)):
     """
-    Returns the full graph execution history for a specific thread.
-    The history is ordered from most recent to oldest checkpoint.
+    Returns the graph execution history for a specific thread, one page of up
+    to `limit` checkpoints before `before`, matching the `metadata` filter.
+    The history is ordered from most recent to oldest checkpoint and streamed
+    as it is read from the checkpointer. include_values=false only leaves the
+    values out of the response: each checkpoint is still read and
+    deserialized in full, as the graph needs it to compute tasks and next.
     """
 #    print(">>> Get History API call")
 #    print(f">>> Params: {request}")
 #    print(f">>> Thread Id: {thread_id}")
 
-    if thread_id not in kv_store:
+    thread = await thread_crud.get_thread(thread_id)
+    if not thread:
         raise HTTPException(status_code=404, detail="Thread not found")
     
-    assistantId = kv_store.get(thread_id)
+    assistantId = thread["assistant_id"]
 
     if not assistantId:
         raise HTTPException(status_code=404, detail="Agent not found")
 
-    try:
+    config = {"configurable": {**(request.checkpoint or {}), "thread_id": thread_id}}
+    before = _history_before(thread_id, request.before)
 
-        # Get the history using LangGraph's get_state_history
-        config = {"configurable": {"thread_id": thread_id}}
-        
+    try:
         agent = await get_compiled_graph(db, assistantId, checkpointer)
 
-        # Get history and convert generator to list
-        history = [cp async for cp in agent.aget_state_history(config)]
-        
-        # Format the response
-        formatted_history = []
-
-        for checkpoint in history:
-            formatted_checkpoint = {
-                "values": checkpoint.values,
-                "next": list(checkpoint.next) if checkpoint.next else [],
-                "tasks": _format_tasks(checkpoint.tasks),
-                "metadata": checkpoint.metadata,
-                "created_at": checkpoint.created_at if checkpoint.created_at else str(datetime.now(timezone.utc).isoformat()),
-                "checkpoint": {
-                    "checkpoint_id": checkpoint.config.get("configurable", {}).get("checkpoint_id"),
-                    "thread_id": checkpoint.config.get("configurable", {}).get("thread_id") or thread_id,
-                    "checkpoint_ns": checkpoint.config.get("configurable", {}).get("checkpoint_ns") or ""
-                },
-                "parent_checkpoint": {
-                    "checkpoint_id": checkpoint.parent_config.get("configurable", {}).get("checkpoint_id") if checkpoint.parent_config else "",
-                    "thread_id": checkpoint.parent_config.get("configurable", {}).get("thread_id") if checkpoint.parent_config else thread_id,
-                    "checkpoint_ns": checkpoint.parent_config.get("configurable", {}).get("checkpoint_ns") if checkpoint.parent_config else ""
-                },
-                "interrupts": checkpoint.interrupts if checkpoint.interrupts else [],
-                "checkpoint_id": checkpoint.config.get("configurable", {}).get("checkpoint_id"),
-                "parent_checkpoint_id": checkpoint.parent_config.get("configurable", {}).get("checkpoint_id") if checkpoint.parent_config else ""
-            }
-            formatted_history.append(formatted_checkpoint)
-
-        return formatted_history
-    
+        history = agent.aget_state_history(
+            config,
+            filter=request.metadata or None,
+            before=before,
+            limit=request.limit
+        )
+        # Read the first checkpoint before responding, so errors still get a status code
+        first = await anext(history, None)
+
     except ValueError as e:
         if "thread not found" in str(e).lower():
             raise HTTPException(status_code=404, detail=f"Thread {thread_id} not found")
-        print(f">>> Value Error: {str(e)}")
+        logger.warning("History of thread %s failed: %s", thread_id, e)
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        print(f">>> Exception: {str(e)}")
+        logger.exception("History of thread %s failed: %r", thread_id, e)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+    async def history_generator():
+        if first is None:
+            yield "[]"
+            return
+        try:
+            yield "[" + _encode_checkpoint(first, thread_id, request.include_values)
+            async for checkpoint in history:
+                yield ", " + _encode_checkpoint(checkpoint, thread_id, request.include_values)
+            yield "]"
+        finally:
+            await history.aclose()
+
+    return StreamingResponse(history_generator(), media_type="application/json")
+
+
+def _encode_checkpoint(checkpoint, thread_id: str, include_values: bool) -> str:
+    """
+    One history entry as JSON, encoded like the response_model did before the
+    history was streamed: jsonable_encoder turns interrupts (dataclasses) and
+    messages into dicts, where dumps would fall back to str().
+    """
+    return dumps(jsonable_encoder(_format_checkpoint(checkpoint, thread_id, include_values)))
+
+
+def _history_before(thread_id: str, before) -> Optional[Dict[str, Any]]:
+    """`before` as a checkpoint id, a checkpoint dict or a full config"""
+    if not before:
+        return None
+    if isinstance(before, str):
+        return {"configurable": {"thread_id": thread_id, "checkpoint_id": before}}
+    if "configurable" in before:
+        return {"configurable": {"thread_id": thread_id, **before["configurable"]}}
+    return {"configurable": {"thread_id": thread_id, **before}}
+
+
+def _format_checkpoint(checkpoint, thread_id: str, include_values: bool = True) -> Dict[str, Any]:
+    """Format a StateSnapshot the way the LangGraph API returns it"""
+    configurable = checkpoint.config.get("configurable", {})
+    parent_configurable = checkpoint.parent_config.get("configurable", {}) if checkpoint.parent_config else None
+
+    formatted_checkpoint = {
+        "values": checkpoint.values,
+        "next": list(checkpoint.next) if checkpoint.next else [],
+        "tasks": _format_tasks(checkpoint.tasks),
+        "metadata": checkpoint.metadata,
+        "created_at": checkpoint.created_at if checkpoint.created_at else str(datetime.now(timezone.utc).isoformat()),
+        "checkpoint": {
+            "checkpoint_id": configurable.get("checkpoint_id"),
+            "thread_id": configurable.get("thread_id") or thread_id,
+            "checkpoint_ns": configurable.get("checkpoint_ns") or ""
+        },
+        "parent_checkpoint": {
+            "checkpoint_id": parent_configurable.get("checkpoint_id") if parent_configurable is not None else "",
+            "thread_id": parent_configurable.get("thread_id") if parent_configurable is not None else thread_id,
+            "checkpoint_ns": parent_configurable.get("checkpoint_ns") if parent_configurable is not None else ""
+        },
+        "interrupts": checkpoint.interrupts if checkpoint.interrupts else [],
+        "checkpoint_id": configurable.get("checkpoint_id"),
+        "parent_checkpoint_id": parent_configurable.get("checkpoint_id") if parent_configurable is not None else ""
+    }
+    if not include_values:
+        del formatted_checkpoint["values"]
+    return formatted_checkpoint
+
 def _format_tasks(tasks) -> List[Dict[str, Any]]:
     """Format PregelTask objects into serializable dictionaries"""
     formatted_tasks = []
@@ -281,7 +390,6 @@ async def stream_run(
     request: RunCreateStateful,
     background_tasks: BackgroundTasks,
     http_request: Request,
-    db: AsyncSession = Depends(get_db),
     checkpointer = Depends(get_saver)
 ):
     """
@@ -292,112 +400,165 @@ async def stream_run(
 #    print(f">>> Thread Id: {thread_id}")
 #    print(f">>> Request: {request}")
 
-    if thread_id not in threads_store:
+    thread = await thread_crud.get_thread(thread_id)
+    if not thread:
         raise HTTPException(status_code=404, detail=f"Thread {thread_id} not found")
     
-    if thread_id not in kv_store:
-        kv_store[thread_id] = request.assistant_id
-        
+    if not thread["assistant_id"]:
+        await _set_thread_assistant(thread_id, request.assistant_id)
+
+    # Bump updated_at and restart the thread TTL once the run is over
+    background_tasks.add_task(thread_crud.touch_thread, thread_id)
+
     # Generate run ID
     run_id = str(uuid.uuid4())
     
     # Prepare configuration
-    config = {
-        "configurable": {
-            "thread_id": thread_id #,
-#                "assistant_id": request.assistant_id,
-        }
-    }
-
-    # Get request headers for metadata
-    headers = dict(http_request.headers)
+    config = _run_config(thread_id, request)
+
+    # Run metadata sent with every message, serialized once per run
+    metadata_template = MetadataTemplate(
+        run_id=run_id,
+        thread_id=thread_id,
+        assistant_id=request.assistant_id,
+        headers=dict(http_request.headers)
+    )
         
-    async def event_generator():
-#            try:
-            # Send metadata event
-            # Yield metadata event first
-            metadata_event = {
-                "run_id": run_id,
-                "attempt": 1
-            }
-            yield f"event: metadata\ndata: {json.dumps(metadata_event)}\nid: 0\n\n"
-
-            # Get the compiled graph
-            graph = await get_compiled_graph(db, request.assistant_id, checkpointer)
-
+    async def produce(buffer: SseFrameBuffer):
+        # One trace per run: graph lookup/build, then a span per node, LLM call and tool call
+        with tracer.span("run.stream", {"run.id": run_id, "thread.id": thread_id,
+                                        "assistant.id": request.assistant_id}, root=True) as span:
+            started = time.perf_counter()
             event_id = 1
-            
-            # Handle different input types
-            input_data = request.input or {}
-            if request.command:
-                #input_data = {"command": request.command}
-                input_data = create_command_from_request(request.command)
-#            print(f">>> Input Data: {input_data}")
-
-            # Execute with streaming
-            async for event in graph.astream(
-                input_data,
-                config=config,
-                stream_mode=["values", "messages", "custom"]
-            ):
-#                print("STREAM EVENT--------")
-#                print(event_id)
-#                print(event)
-#                print("--------")
-
-                # Handle different stream modes
-                if "messages-tuple" in request.stream_mode and 'messages' in event:
-                    if isinstance(event, tuple) and len(event) == 2 :
-                        message_chunk = event[1]
-                        
-                        # Convert message to serializable format
-                        serialized_message = convert_message_to_serializable(message_chunk)
-                        
-                        # Create LangGraph-style metadata
-                        langgraph_metadata = create_metadata(
-                            run_id=run_id,
-                            thread_id=thread_id,
-                            assistant_id=request.assistant_id,
-                            headers=headers,
-                            message=serialized_message[1]
-                        )
-                        
-                        # For messages-tuple, we need to send both message and metadata
-                        messages_event = {
-                            "event": "messages",
-                            "data": [
-                                serialized_message[0],
-                                langgraph_metadata
-                            ]
+            usage = usage_recorder.track(run_id, thread_id, request.assistant_id)
+            status = "interrupted"
+            try:
+                # Get the compiled graph. Its own session: the run may wait in the queue,
+                # or go on after its response (on_disconnect="continue")
+                async with async_session() as db:
+                    graph = await get_compiled_graph(db, request.assistant_id, checkpointer)
+
+                full_metadata_sent = False
+                first_message = True
+                run_config = _with_callbacks(config, usage, TracingCallbackHandler(span) if tracer.enabled else None)
+
+                # Execute with streaming
+                events = graph.astream(
+                    _run_input(request),
+                    config=run_config,
+                    stream_mode=["values", "messages", "custom"]
+                )
+                async for event in coalesce_message_chunks(events, SSE_COALESCE_INTERVAL_MS / 1000):
+
+                    if event[0] == "messages":
+                        if first_message:
+                            first_message = False
+                            elapsed = time.perf_counter() - started
+                            run_first_token.observe(elapsed, request.assistant_id)
+                            span.set_attribute("run.time_to_first_token_ms", round(elapsed * 1000, 3))
+                            if usage is not None:
+                                usage.mark_first_token()
+                        record_message(request.assistant_id, *event[1])
+
+                    # Handle different stream modes
+                    if "messages-tuple" in request.stream_mode and 'messages' in event:
+                        if isinstance(event, tuple) and len(event) == 2 :
+                            message_chunk = event[1]
+
+                            # Convert message to serializable format
+                            serialized_message = convert_message_to_serializable(message_chunk)
+
+                            # Create LangGraph-style metadata
+                            if SSE_METADATA_FIRST_MESSAGE_ONLY and full_metadata_sent:
+                                langgraph_metadata = metadata_template.render_chunk(serialized_message[1])
+                            else:
+                                langgraph_metadata = metadata_template.render(serialized_message[1])
+                                full_metadata_sent = True
+
+                            # For messages-tuple, we need to send both message and metadata
+                            message_json = dumps(serialized_message[0])
+                            await buffer.put(f"event: messages\ndata: [{message_json}{separator}{langgraph_metadata}]\nid: {event_id}\n\n")
+                            event_id += 1
+
+
+                    # Handle values mode (complete state)
+                    if "values" in request.stream_mode and 'values' in event:
+                        values_event = {
+                            "event": "values",
+                            "data": event[1]
                         }
-                        yield f"event: {messages_event['event']}\ndata: {json.dumps(messages_event['data'], cls=LangChainMessageEncoder)}\nid: {event_id}\n\n"
+                        await buffer.put(f"event: {values_event['event']}\ndata: {dumps(values_event['data'])}\nid: {event_id}\n\n")
                         event_id += 1
+            except Exception as e:
+                status = "error"
+                buffer.close(e)
+                # The run manager records the run as failed (and the span the exception)
+                raise
+            except asyncio.CancelledError:
+                # Cancelled (endpoint or client disconnect): end the stream too
+                buffer.close()
+                raise
+            else:
+                status = "success"
+                buffer.close()
+            finally:
+                span.set_attribute("run.frames", event_id - 1)
+                usage_recorder.record(usage, status)
+
+    if request.stream_resumable:
+        # Replayable log: the run never waits on its client, which can join
+        # the stream again from its Last-Event-ID
+        buffer = run_streams.create(run_id, thread_id)
+    else:
+        # The run writes into a bounded buffer and is paused while a slow client
+        # catches up; the response drains it and sends keep-alives when idle
+        buffer = SseFrameBuffer()
+
+    # Metadata event first, also while the run waits for a slot
+    metadata_event = {
+        "run_id": run_id,
+        "attempt": 1
+    }
+    await buffer.put(f"event: metadata\ndata: {dumps(metadata_event)}\nid: 0\n\n")
 
+    run = Run(run_id, thread_id, request.assistant_id, request.metadata)
+    try:
+        run_manager.submit(run, lambda: produce(buffer))
+    except RunQueueFull as e:
+        buffer.close()
+        raise HTTPException(status_code=429, detail=str(e))
+    # Also ends the stream of a run cancelled while still queued
+    run.task.add_done_callback(lambda _: buffer.close())
+
+    async def event_generator():
+        # A resumable run goes on without its client
+        if request.stream_resumable:
+            async for data in buffer.stream(keepalive=SSE_KEEPALIVE_SECONDS):
+                yield data
+            return
+
+        watcher = asyncio.create_task(_watch_disconnect(http_request, run, buffer, request.on_disconnect))
+        try:
+            async for data in buffer.stream(keepalive=SSE_KEEPALIVE_SECONDS):
+                yield data
+        finally:
+            watcher.cancel()
+            # Response closed before the run finished
+            if not run.done:
+                await _on_disconnect(run, buffer, request.on_disconnect)
+
+    headers = {
+        "Cache-Control": "no-cache",
+        "Connection": "keep-alive",
+        "Access-Control-Allow-Origin": "*"
+    }
+    if request.stream_resumable:
+        headers["Content-Location"] = f"{router.prefix}/threads/{thread_id}/runs/{run_id}/stream"
 
-                # Handle values mode (complete state)
-                if "values" in request.stream_mode and 'values' in event:
-                    values_event = {
-                        "event": "values",
-                        "data": event[1]
-                    }
-                    yield f"event: {values_event['event']}\ndata: {json.dumps(values_event['data'], cls=LangChainMessageEncoder)}\nid: {event_id}\n\n"
-                    event_id += 1
-                
-                # Small delay to prevent overwhelming the client
-                await asyncio.sleep(0.01)
-
-    # Handle disconnection
-    if request.on_disconnect == "cancel":
-        background_tasks.add_task(cancel_run, run_id)
-    
     return StreamingResponse(
         event_generator(),
         media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "Access-Control-Allow-Origin": "*"
-        }
+        headers=headers
     )
     
 
@@ -409,6 +570,32 @@ async def get_compiled_graph(db: AsyncSession, assistant_id: str, checkpointer):
     return await get_agent(db, assistant_id, checkpointer)
 
 
+def _run_config(thread_id: str, request: RunCreateStateful) -> Dict[str, Any]:
+    config = {
+        "configurable": {
+            "thread_id": thread_id #,
+#                "assistant_id": request.assistant_id,
+        }
+    }
+    # Run metadata is saved with the run's checkpoints (e.g. the retention tag)
+    if request.metadata:
+        config["metadata"] = request.metadata
+    return config
+
+
+def _with_callbacks(config: Dict[str, Any], *handlers) -> Dict[str, Any]:
+    # Run callbacks (usage, tracing), left out when none is enabled
+    handlers = [handler for handler in handlers if handler is not None]
+    return {**config, "callbacks": handlers} if handlers else config
+
+
+def _run_input(request: RunCreateStateful):
+    # Handle different input types
+    if request.command:
+        return create_command_from_request(request.command)
+    return request.input or {}
+
+
 # Create Command object directly from the request command dict
 def create_command_from_request(command_dict: Dict[str, Any]) -> Command:
     """
@@ -419,9 +606,341 @@ def create_command_from_request(command_dict: Dict[str, Any]) -> Command:
     return Command(**command_dict)
 
 
-async def cancel_run(run_id: str):
+async def cancel_run(run_id: str, wait: bool = False) -> bool:
     """
     Cancel a running execution based on run_id.
     """
-    pass
+    return await run_manager.cancel(run_id, wait=wait)
+
+
+async def _on_disconnect(run: Run, buffer: SseFrameBuffer, on_disconnect: Optional[str]):
+    """Client gone: cancel the run, or let it finish without a reader ("continue")"""
+    if on_disconnect == "continue":
+        buffer.detach()
+    else:
+        await cancel_run(run.run_id)
+
+
+async def _watch_disconnect(http_request: Request, run: Run, buffer: SseFrameBuffer, on_disconnect: Optional[str]):
+    """Polls the connection while the run is active, so an idle stream notices a closed tab"""
+    while not run.done:
+        await asyncio.sleep(RUN_DISCONNECT_POLL_SECONDS)
+        if await http_request.is_disconnected():
+            logger.info("Client disconnected from run %s", run.run_id)
+            await _on_disconnect(run, buffer, on_disconnect)
+            return
+
+
+##################
+# Background runs
+##################
+
+class RunCreateStateless(RunCreateStateful):
+    # "delete" removes the temporary thread and its checkpoints after the run, "keep" keeps it
+    on_completion: Optional[str] = "delete"
+
+
+async def _start_background_run(thread_id: str, request: RunCreateStateful, checkpointer) -> Run:
+    """Queue a run of the thread on a background worker, with no client attached"""
+    thread = await thread_crud.get_thread(thread_id)
+    if not thread:
+        raise HTTPException(status_code=404, detail=f"Thread {thread_id} not found")
+
+    if not thread["assistant_id"]:
+        await _set_thread_assistant(thread_id, request.assistant_id)
+
+    run = Run(str(uuid.uuid4()), thread_id, request.assistant_id, request.metadata)
+    config = _run_config(thread_id, request)
+
+    async def execute():
+        usage = usage_recorder.track(run.run_id, thread_id, request.assistant_id)
+        status = "interrupted"
+        try:
+            # The session is only needed to build the graph, not held for the whole run
+            async with async_session() as db:
+                graph = await get_compiled_graph(db, request.assistant_id, checkpointer)
+            await graph.ainvoke(_run_input(request), config=_with_callbacks(config, usage))
+            status = "success"
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            usage_recorder.record(usage, status)
+            # Bump updated_at and restart the thread TTL once the run is over
+            await thread_crud.touch_thread(thread_id)
+
+    try:
+        run_manager.submit(run, execute, background=True)
+    except RunQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return run
+
+
+async def _run_output(run: Run, checkpointer) -> Response:
+    """Final state of the run's thread, read back from the checkpointer"""
+    if run.status == "error":
+        raise HTTPException(status_code=500, detail=f"Run {run.run_id} failed: {run.error}")
+    if run.status == "interrupted":
+        raise HTTPException(status_code=409, detail=f"Run {run.run_id} was cancelled")
+    if not run.done:
+        raise HTTPException(status_code=408, detail=f"Run {run.run_id} is still {run.status}")
+
+    async with async_session() as db:
+        graph = await get_compiled_graph(db, run.assistant_id, checkpointer)
+    state = await graph.aget_state({"configurable": {"thread_id": run.thread_id}})
+    return Response(content=dumps(state.values), media_type="application/json")
+
+
+def _get_thread_run(thread_id: str, run_id: str) -> Run:
+    run = run_manager.get(run_id)
+    if run is None or run.thread_id != thread_id:
+        raise HTTPException(status_code=404, detail=f"Run {run_id} not found")
+    return run
+
+
+@router.post("/threads/{thread_id}/runs")
+async def create_run(thread_id: str, request: RunCreateStateful, checkpointer = Depends(get_saver)):
+    """
+    Starts a background run of the thread and returns it right away (status
+    "pending"); poll GET /threads/{thread_id}/runs/{run_id} or join it for the result.
+    """
+    run = await _start_background_run(thread_id, request, checkpointer)
+    return run.to_dict()
+
+
+@router.post("/threads/{thread_id}/runs/wait")
+async def wait_run(thread_id: str, request: RunCreateStateful, checkpointer = Depends(get_saver)):
+    """
+    Runs the thread on a background worker and returns its final state values.
+    The run goes on if the client leaves before it is over.
+    """
+    run = await _start_background_run(thread_id, request, checkpointer)
+    await run_manager.wait(run.run_id)
+    return await _run_output(run, checkpointer)
+
+
+@router.post("/runs/wait")
+async def wait_stateless_run(request: RunCreateStateless, checkpointer = Depends(get_saver)):
+    """
+    Runs the assistant on a new thread and returns the final state values. The
+    thread is deleted afterwards unless on_completion is "keep".
+    """
+    thread = await thread_crud.create_thread({
+        "metadata_json": request.metadata or {},
+        "config_json": request.config or {},
+        "status": "idle",
+        "ttl_minutes": THREAD_DEFAULT_TTL_MINUTES or None
+    })
+    thread_id = thread["thread_id"]
+    try:
+        run = await _start_background_run(thread_id, request, checkpointer)
+        await run_manager.wait(run.run_id)
+        return await _run_output(run, checkpointer)
+    finally:
+        if request.on_completion != "keep":
+            # Also stops the run when the client left before it was over
+            await run_manager.cancel_thread(thread_id, wait=True)
+            await thread_crud.delete_thread(thread_id)
+            await checkpointer.adelete_thread(thread_id)
+
+
+@router.get("/threads/{thread_id}/runs")
+async def list_runs(thread_id: str, limit: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
+    """
+    Lists the runs of the thread known to this worker, active ones first, then
+    the most recently finished.
+    """
+    runs = run_manager.list(thread_id)
+    return [run.to_dict() for run in runs[offset:offset + limit]]
+
+
+@router.get("/threads/{thread_id}/runs/{run_id}")
+async def get_run(thread_id: str, run_id: str) -> Dict[str, Any]:
+    """
+    Returns the status of a run.
+    """
+    return _get_thread_run(thread_id, run_id).to_dict()
+
+
+@router.get("/threads/{thread_id}/runs/{run_id}/join")
+async def join_run(thread_id: str, run_id: str, timeout: Optional[float] = None,
+                   checkpointer = Depends(get_saver)):
+    """
+    Waits for the run to finish (up to timeout seconds) and returns the final
+    state values of its thread.
+    """
+    run = _get_thread_run(thread_id, run_id)
+    await run_manager.wait(run_id, timeout=timeout)
+    return await _run_output(run, checkpointer)
+
+
+##################
+# Batch runs
+##################
+
+class RunBatchRequest(BaseModel):
+    assistant_id: str
+    inputs: List[Any]
+    metadata: Optional[Dict[str, Any]] = None
+    # True: no thread and no checkpoints; False: every input runs on a new thread, kept
+    ephemeral: Optional[bool] = True
+    # Capped at BATCH_MAX_CONCURRENCY
+    max_concurrency: Optional[int] = None
+
+
+async def _run_batch_item(graph, index: int, input_data: Any, request: RunBatchRequest) -> Dict[str, Any]:
+    thread_id = None
+    usage = None
+    status = "interrupted"
+    try:
+        if request.ephemeral:
+            config = {}
+        else:
+            thread = await thread_crud.create_thread({
+                "metadata_json": request.metadata or {},
+                "config_json": {},
+                "status": "idle",
+                "ttl_minutes": THREAD_DEFAULT_TTL_MINUTES or None
+            })
+            thread_id = thread["thread_id"]
+            await thread_crud.set_thread_assistant(thread_id, request.assistant_id)
+            config = {"configurable": {"thread_id": thread_id}}
+        if request.metadata:
+            config["metadata"] = request.metadata
+
+        usage = usage_recorder.track(str(uuid.uuid4()), thread_id, request.assistant_id)
+        output = await graph.ainvoke(input_data or {}, config=_with_callbacks(config, usage))
+        status = "success"
+        return {"index": index, "thread_id": thread_id, "status": "success", "output": output}
+    except Exception as e:
+        status = "error"
+        return {"index": index, "thread_id": thread_id, "status": "error", "error": repr(e)}
+    finally:
+        usage_recorder.record(usage, status)
+
+
+@router.post("/runs/batch")
+async def batch_runs(request: RunBatchRequest, http_request: Request, checkpointer = Depends(get_saver)):
+    """
+    Runs one assistant over many inputs and streams one NDJSON line per input,
+    {"index", "thread_id", "status", "output" or "error"}, in completion order.
+    The graph is compiled once and up to max_concurrency inputs run at a time.
+    Leaving before the batch is over cancels it.
+    """
+    if len(request.inputs) > BATCH_MAX_INPUTS:
+        raise HTTPException(status_code=422, detail=f"A batch takes at most {BATCH_MAX_INPUTS} inputs")
+    concurrency = min(request.max_concurrency or BATCH_MAX_CONCURRENCY, BATCH_MAX_CONCURRENCY)
+    if concurrency < 1:
+        raise HTTPException(status_code=422, detail="max_concurrency must be positive")
+
+    async with async_session() as db:
+        graph = await get_compiled_graph(db, request.assistant_id, checkpointer)
+    if graph is None:
+        raise HTTPException(status_code=404, detail=f"Assistant {request.assistant_id} not found")
+    if request.ephemeral:
+        # Same compiled graph without its checkpointer: nothing is persisted
+        graph = graph.copy({"checkpointer": None})
+
+    async def produce(buffer: SseFrameBuffer):
+        items = iter(enumerate(request.inputs))
+
+        async def worker():
+            for index, input_data in items:
+                result = await _run_batch_item(graph, index, input_data, request)
+                await buffer.put(dumps(result) + "\n")
+
+        # A fixed set of workers rather than abatch: a cancelled batch stops every input
+        workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(request.inputs)))]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+            buffer.close()
+
+    # Lines are paused while a slow client catches up
+    buffer = SseFrameBuffer()
+
+    run = Run(str(uuid.uuid4()), None, request.assistant_id, request.metadata)
+    try:
+        run_manager.submit(run, lambda: produce(buffer))
+    except RunQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    run.task.add_done_callback(lambda _: buffer.close())
+
+    async def line_generator():
+        watcher = asyncio.create_task(_watch_disconnect(http_request, run, buffer, "cancel"))
+        try:
+            async for data in buffer.stream(keepalive=None):
+                yield data
+        finally:
+            watcher.cancel()
+            if not run.done:
+                await cancel_run(run.run_id)
+
+    return StreamingResponse(
+        line_generator(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+
+##################
+# Runs endpoint
+##################
+
+@router.post("/threads/{thread_id}/runs/{run_id}/cancel")
+async def cancel_thread_run(thread_id: str, run_id: str, wait: bool = False, action: str = "interrupt"):
+    """
+    Cancels an active run of the thread. With wait=true, returns once the run has stopped.
+    """
+    run = _get_thread_run(thread_id, run_id)
+    if action != "interrupt":
+        raise HTTPException(status_code=422, detail="Only the 'interrupt' action is supported")
+    await cancel_run(run_id, wait=wait)
+    return run.to_dict()
+
+
+@router.get("/threads/{thread_id}/runs/{run_id}/stream")
+async def join_run_stream(thread_id: str, run_id: str, last_event_id: Optional[str] = Header(None)):
+    """
+    Joins the stream of a resumable run (stream_resumable=true), active or recently
+    finished: replays the events after Last-Event-ID (all of them without it), then
+    follows the run until it ends. Leaving doesn't cancel the run.
+    """
+    log = run_streams.get(run_id, thread_id)
+    if log is None:
+        raise HTTPException(status_code=404, detail=f"Stream of run {run_id} not found")
+    try:
+        after = int(last_event_id) if last_event_id else -1
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Last-Event-ID must be an event id")
+
+    return StreamingResponse(
+        log.stream(after, keepalive=SSE_KEEPALIVE_SECONDS),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "Access-Control-Allow-Origin": "*"
+        }
+    )
+
+
+@router.post("/threads/{thread_id}/runs/cancel")
+async def cancel_thread_runs(thread_id: str, wait: bool = False):
+    """
+    Cancels every active run of the thread.
+    """
+    cancelled = await run_manager.cancel_thread(thread_id, wait=wait)
+    return {"thread_id": thread_id, "cancelled": cancelled}
+
+
+@router.get("/runs/stats")
+async def get_run_stats() -> Dict[str, Any]:
+    """
+    Returns run manager counters: running and queued runs, limits and totals,
+    and the resumable streams kept for joining, and the usage rows waiting to be written.
+    """
+    return {**run_manager.stats(), "streams": run_streams.stats(), "usage": usage_recorder.stats()}
 
@@ -11,6 +11,7 @@ from src.schemas.mcp_server import McpServerCreate, McpServerUpdate, McpServer
 from src.core.database import get_db
 from uuid import UUID
 from src.orchestrator.core.mcp_service import get_mcp_server_tools_info
+from src.orchestrator.core.mcp_pool import mcp_pool
 
 router = APIRouter(prefix="/mcp-servers", tags=["MCP Servers"])
 
@@ -25,6 +26,10 @@ async def create_new_mcp_server(
 async def read_all_mcp_servers(db: AsyncSession = Depends(get_db)):
     return await get_all_mcp_servers()
 
+@router.get("/pool", response_model=dict)
+async def read_mcp_session_pool():
+    return mcp_pool.stats()
+
 @router.get("/{server_id}", response_model=McpServer)
 async def read_mcp_server(server_id: UUID, db: AsyncSession = Depends(get_db)):
     server = await get_mcp_server(str(server_id))
@@ -1,3 +1,4 @@
+import logging
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.crud.orchestrator import (
@@ -11,6 +12,8 @@ from src.schemas.orchestrator import OrchestratorCreate, OrchestratorUpdate, Orc
 from src.core.database import get_db
 from uuid import UUID
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/orchestrators", tags=["Agents"])
 
 @router.post("/", response_model=OrchestratorResponse)
@@ -43,8 +46,8 @@ async def update_existing_orchestrator(
     orchestrator: OrchestratorUpdate,
     db: AsyncSession = Depends(get_db)
 ):
-    print(">>> Orchestrator Update Request:")
-    print(orchestrator.model_dump_json(indent=2))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Orchestrator %s update: %s", orchestrator_id, orchestrator.model_dump_json())
     updated = await update_orchestrator(db, str(orchestrator_id), orchestrator.dict())
     if not updated:
         raise HTTPException(status_code=404, detail="Orchestrator not found")
@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+from src.core.database import get_db
+from src.schemas.usage import ApiKeyUsage, AssistantUsage, DailyUsage, ThreadUsage
+from src.crud.usage import (
+    get_usage_by_api_key, get_usage_by_assistant, get_usage_by_day, get_thread_usage
+)
+
+# Token usage and run latency, from the rows the usage recorder writes every few
+# seconds. start/end default to the last 30 days.
+router = APIRouter(prefix="/usage", tags=["Usage"])
+
+@router.get("/api-keys", response_model=list[ApiKeyUsage])
+async def usage_by_api_key(start: Optional[datetime] = None, end: Optional[datetime] = None,
+                           db: AsyncSession = Depends(get_db)):
+    return await get_usage_by_api_key(db, start, end)
+
+@router.get("/assistants", response_model=list[AssistantUsage])
+async def usage_by_assistant(start: Optional[datetime] = None, end: Optional[datetime] = None,
+                             db: AsyncSession = Depends(get_db)):
+    return await get_usage_by_assistant(db, start, end)
+
+@router.get("/daily", response_model=list[DailyUsage])
+async def usage_by_day(start: Optional[datetime] = None, end: Optional[datetime] = None,
+                       api_key_id: Optional[UUID] = None, assistant_id: Optional[UUID] = None,
+                       db: AsyncSession = Depends(get_db)):
+    return await get_usage_by_day(db, start, end, api_key_id, assistant_id)
+
+@router.get("/threads/{thread_id}", response_model=ThreadUsage)
+async def usage_of_thread(thread_id: UUID, db: AsyncSession = Depends(get_db)):
+    usage = await get_thread_usage(db, thread_id)
+    if not usage:
+        raise HTTPException(status_code=404, detail="No usage recorded for this thread")
+    return usage
@@ -0,0 +1,167 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
+
+
+def _get_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+
+def _get_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+# Database engine (core.database)
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"
+DB_POOL_SIZE = _get_int("DB_POOL_SIZE", 10)
+DB_MAX_OVERFLOW = _get_int("DB_MAX_OVERFLOW", 20)
+# Seconds a request waits for a pooled connection before failing
+DB_POOL_TIMEOUT_SECONDS = _get_float("DB_POOL_TIMEOUT_SECONDS", 30)
+# Connections older than this are replaced on checkout (e.g. before a proxy or firewall drops them)
+DB_POOL_RECYCLE_SECONDS = _get_int("DB_POOL_RECYCLE_SECONDS", 1800)
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# asyncpg prepared statements cached per connection; 0 behind pgbouncer in transaction mode
+DB_STATEMENT_CACHE_SIZE = _get_int("DB_STATEMENT_CACHE_SIZE", 100)
+# Statements slower than this are counted and kept in the slow query list (GET /chat/database/stats)
+DB_SLOW_QUERY_MS = _get_float("DB_SLOW_QUERY_MS", 200)
+
+# Compiled graph cache (runtime_service)
+GRAPH_CACHE_MAX_ENTRIES = _get_int("GRAPH_CACHE_MAX_ENTRIES", 128)
+# Approximate memory bound; measuring a graph walks its object references on every put, so 0 (off) by default
+GRAPH_CACHE_MAX_BYTES = _get_int("GRAPH_CACHE_MAX_BYTES", 0)
+GRAPH_CACHE_TTL_SECONDS = _get_float("GRAPH_CACHE_TTL_SECONDS", 3600)
+# A cached graph is checked against the fingerprint of its assistant's current spec (one query) when it
+# was last checked longer ago than this, so changes made through another worker are picked up; 0 disables
+GRAPH_CACHE_REVALIDATE_SECONDS = _get_float("GRAPH_CACHE_REVALIDATE_SECONDS", 5)
+# TTL of graphs built without some of their tools (an MCP server down or timing out), so they are
+# rebuilt soon after it recovers; 0 does not cache them
+GRAPH_CACHE_DEGRADED_TTL_SECONDS = _get_float("GRAPH_CACHE_DEGRADED_TTL_SECONDS", 30)
+
+# Orchestrator builds (main_agent)
+# Sub agents of an orchestrator built at once (MCP discovery); 0 builds them all at once
+SUB_AGENT_BUILD_CONCURRENCY = _get_int("SUB_AGENT_BUILD_CONCURRENCY", 4)
+
+# MCP tool discovery (mcp_service)
+MCP_DISCOVERY_TIMEOUT_SECONDS = _get_float("MCP_DISCOVERY_TIMEOUT_SECONDS", 30)
+
+# MCP session pool (mcp_pool)
+MCP_SESSION_POOL_ENABLED = os.getenv("MCP_SESSION_POOL_ENABLED", "true").lower() == "true"
+MCP_MAX_CONCURRENT_CALLS = _get_int("MCP_MAX_CONCURRENT_CALLS", 8)
+MCP_HEALTH_CHECK_INTERVAL_SECONDS = _get_float("MCP_HEALTH_CHECK_INTERVAL_SECONDS", 30)
+
+# Shared LLM clients (llm_provider)
+LLM_CLIENT_POOL_ENABLED = os.getenv("LLM_CLIENT_POOL_ENABLED", "true").lower() == "true"
+LLM_HTTP_MAX_CONNECTIONS = _get_int("LLM_HTTP_MAX_CONNECTIONS", 100)
+LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS = _get_int("LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS", 20)
+LLM_HTTP_KEEPALIVE_EXPIRY_SECONDS = _get_float("LLM_HTTP_KEEPALIVE_EXPIRY_SECONDS", 30)
+# HTTP/2 requires the h2 package (pip install httpx[http2])
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "false").lower() == "true"
+# Ask OpenAI compatible endpoints for token usage on streamed responses (stream_options.include_usage)
+LLM_STREAM_USAGE = os.getenv("LLM_STREAM_USAGE", "true").lower() == "true"
+
+# SSE streaming (chat stream endpoint)
+# The run is paused once this many bytes are waiting for the client, and resumed below the low watermark
+SSE_HIGH_WATERMARK_BYTES = _get_int("SSE_HIGH_WATERMARK_BYTES", 256 * 1024)
+SSE_LOW_WATERMARK_BYTES = _get_int("SSE_LOW_WATERMARK_BYTES", 64 * 1024)
+SSE_MAX_WRITE_BYTES = _get_int("SSE_MAX_WRITE_BYTES", 64 * 1024)
+# Merge adjacent token chunks of one message for up to this long; 0 sends every chunk as it arrives
+SSE_COALESCE_INTERVAL_MS = _get_float("SSE_COALESCE_INTERVAL_MS", 0)
+# Comment frame sent when nothing was streamed for this long (e.g. during long tool calls); 0 disables
+SSE_KEEPALIVE_SECONDS = _get_float("SSE_KEEPALIVE_SECONDS", 15)
+# Send the run metadata (headers, ids, versions) with the first message only, later ones carry the per-chunk fields
+SSE_METADATA_FIRST_MESSAGE_ONLY = os.getenv("SSE_METADATA_FIRST_MESSAGE_ONLY", "false").lower() == "true"
+# Frame encoder: json (byte-identical to the previous output) or orjson (faster, needs the orjson extra;
+# not byte-compatible: compact separators, raw UTF-8, NaN and Infinity sent as null)
+SSE_SERIALIZER = os.getenv("SSE_SERIALIZER", "json").lower()
+
+# Run manager (run_manager); limits of 0 are unlimited
+# Runs over the limits wait in arrival order, at most RUN_MAX_QUEUED of them (then 429)
+RUN_MAX_CONCURRENT = _get_int("RUN_MAX_CONCURRENT", 64)
+RUN_MAX_CONCURRENT_PER_ASSISTANT = _get_int("RUN_MAX_CONCURRENT_PER_ASSISTANT", 16)
+RUN_MAX_QUEUED = _get_int("RUN_MAX_QUEUED", 256)
+# Finished runs kept for status lookups
+RUN_HISTORY_MAX_ENTRIES = _get_int("RUN_HISTORY_MAX_ENTRIES", 1000)
+# Background runs (POST /threads/{id}/runs, /runs/wait) first wait for one of
+# RUN_BACKGROUND_WORKERS workers, in a queue of their own
+RUN_BACKGROUND_WORKERS = _get_int("RUN_BACKGROUND_WORKERS", 16)
+RUN_BACKGROUND_MAX_QUEUED = _get_int("RUN_BACKGROUND_MAX_QUEUED", 10000)
+# How often a streaming run checks that its client is still connected
+RUN_DISCONNECT_POLL_SECONDS = _get_float("RUN_DISCONNECT_POLL_SECONDS", 1)
+
+# Batch runs (POST /runs/batch)
+# Inputs of one batch run at once at most, and inputs accepted per batch
+BATCH_MAX_CONCURRENCY = _get_int("BATCH_MAX_CONCURRENCY", 16)
+BATCH_MAX_INPUTS = _get_int("BATCH_MAX_INPUTS", 1000)
+
+# Resumable streams (run_streams)
+# Frames of a stream_resumable run kept in memory for replay; older ones are
+# written to RUN_STREAM_SPILL_DIR when set, and can't be replayed otherwise
+RUN_STREAM_BUFFER_BYTES = _get_int("RUN_STREAM_BUFFER_BYTES", 1024 * 1024)
+RUN_STREAM_SPILL_DIR = os.getenv("RUN_STREAM_SPILL_DIR", "")
+# How long the stream of a finished run can still be joined, and how many are kept
+RUN_STREAM_RETAIN_SECONDS = _get_float("RUN_STREAM_RETAIN_SECONDS", 300)
+RUN_STREAM_MAX_RUNS = _get_int("RUN_STREAM_MAX_RUNS", 1000)
+
+# Logging (core.log)
+# Records are written by a background thread, as one JSON object per line (json) or as plain text (text)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+# Per module levels, e.g. src.api.chat=DEBUG,sqlalchemy.engine=WARNING
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+
+# Tracing (tracing)
+# Spans of graph builds, MCP discovery and runs: none (off), log (one JSON line per span),
+# memory (last TRACING_MEMORY_MAX_SPANS spans, GET /chat/traces) or otel (OpenTelemetry API, needs opentelemetry-api)
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none").lower()
+TRACING_MEMORY_MAX_SPANS = _get_int("TRACING_MEMORY_MAX_SPANS", 5000)
+
+# Usage accounting (usage_recorder)
+# Token usage and latency of every run, written to agents.run_usage in bulk every
+# USAGE_FLUSH_INTERVAL_SECONDS (GET /usage/...); rows past USAGE_MAX_PENDING_ROWS are dropped, oldest first
+USAGE_RECORDING_ENABLED = os.getenv("USAGE_RECORDING_ENABLED", "true").lower() == "true"
+USAGE_FLUSH_INTERVAL_SECONDS = _get_float("USAGE_FLUSH_INTERVAL_SECONDS", 5)
+USAGE_FLUSH_BATCH_SIZE = _get_int("USAGE_FLUSH_BATCH_SIZE", 500)
+USAGE_MAX_PENDING_ROWS = _get_int("USAGE_MAX_PENDING_ROWS", 50000)
+
+# Thread registry (crud.thread)
+# Threads read in this worker are served from memory for up to THREAD_CACHE_TTL_SECONDS
+THREAD_CACHE_MAX_ENTRIES = _get_int("THREAD_CACHE_MAX_ENTRIES", 10000)
+THREAD_CACHE_TTL_SECONDS = _get_float("THREAD_CACHE_TTL_SECONDS", 30)
+# TTL for threads created without one; 0 keeps them until deleted
+THREAD_DEFAULT_TTL_MINUTES = _get_int("THREAD_DEFAULT_TTL_MINUTES", 0)
+THREAD_SWEEP_INTERVAL_SECONDS = _get_float("THREAD_SWEEP_INTERVAL_SECONDS", 300)
+
+# Checkpointer (orchestrator.core.checkpointer)
+# sqlite (data/checkpoints.sqlite) or postgres; scripts/migrate_checkpoints.py copies the SQLite history over
+CHECKPOINTER_BACKEND = os.getenv("CHECKPOINTER_BACKEND", "sqlite").lower()
+# sqlite profile: default (one connection, one commit per write) or tuned (synchronous=NORMAL,
+# read-only connection pool for state and history reads, group commit of writes)
+CHECKPOINT_SQLITE_PROFILE = os.getenv("CHECKPOINT_SQLITE_PROFILE", "default").lower()
+CHECKPOINT_SQLITE_READ_POOL_SIZE = _get_int("CHECKPOINT_SQLITE_READ_POOL_SIZE", 4)
+# postgres: defaults to the application database
+CHECKPOINT_PG_DSN = os.getenv("CHECKPOINT_PG_DSN") or (
+    f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}"
+    f"@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
+)
+CHECKPOINT_PG_SCHEMA = os.getenv("CHECKPOINT_PG_SCHEMA", "checkpoint")
+CHECKPOINT_PG_POOL_MIN_SIZE = _get_int("CHECKPOINT_PG_POOL_MIN_SIZE", 2)
+CHECKPOINT_PG_POOL_MAX_SIZE = _get_int("CHECKPOINT_PG_POOL_MAX_SIZE", 20)
+# postgres and tuned sqlite: checkpoint writes of concurrent runs are committed together, up to this many per transaction
+CHECKPOINT_WRITE_BATCH_MAX = _get_int("CHECKPOINT_WRITE_BATCH_MAX", 256)
+# Wait this long for more writes before committing; 0 commits as soon as a flush slot is free
+CHECKPOINT_WRITE_BATCH_WINDOW_MS = _get_float("CHECKPOINT_WRITE_BATCH_WINDOW_MS", 0)
+# Store each message of a thread once, checkpoints keep the list of message digests (delta_messages)
+CHECKPOINT_DELTA_MESSAGES = os.getenv("CHECKPOINT_DELTA_MESSAGES", "false").lower() == "true"
+CHECKPOINT_MESSAGE_CACHE_MAX_BYTES = _get_int("CHECKPOINT_MESSAGE_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+
+# Checkpoint retention (checkpoint_retention)
+# Keep the newest K checkpoints of every thread; 0 keeps them all (retention off)
+CHECKPOINT_RETENTION_KEEP_LAST = _get_int("CHECKPOINT_RETENTION_KEEP_LAST", 0)
+# Checkpoints of runs started with this metadata key set to true are never pruned
+CHECKPOINT_RETENTION_TAG = os.getenv("CHECKPOINT_RETENTION_TAG", "retain")
+CHECKPOINT_RETENTION_INTERVAL_SECONDS = _get_float("CHECKPOINT_RETENTION_INTERVAL_SECONDS", 600)
+CHECKPOINT_RETENTION_BATCH_SIZE = _get_int("CHECKPOINT_RETENTION_BATCH_SIZE", 500)
+# SQLite pages given back to the file system per run (incremental vacuum; convert a file created before
+# with scripts/sqlite_incremental_vacuum.py); on postgres any value > 0 runs VACUUM after pruning. 0 disables
+CHECKPOINT_RETENTION_VACUUM_PAGES = _get_int("CHECKPOINT_RETENTION_VACUUM_PAGES", 2000)
@@ -0,0 +1,128 @@
+import logging
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from src.core.config import DB_SLOW_QUERY_MS
+
+logger = logging.getLogger(__name__)
+
+
+def _percentile(samples, fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class DatabaseMetrics:
+    """
+    Pool checkout waits and statement timings of the application engine.
+    Percentiles are computed over the last `samples` checkouts; the slowest
+    statements over DB_SLOW_QUERY_MS are kept, the last `slow_samples` of them.
+    """
+
+    def __init__(self, slow_query_ms: float = DB_SLOW_QUERY_MS, samples: int = 1000, slow_samples: int = 20):
+        self.slow_query_ms = slow_query_ms
+        self._waits: deque[float] = deque(maxlen=samples)
+        self._slow: deque[Dict[str, Any]] = deque(maxlen=slow_samples)
+
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.checkout_wait_total = 0.0
+        self.checkout_wait_max = 0.0
+        self.queries = 0
+        self.query_errors = 0
+        self.query_time_total = 0.0
+        self.slow_queries = 0
+
+    def record_checkout(self, seconds: float, timed_out: bool = False):
+        self.checkouts += 1
+        self.checkout_timeouts += timed_out
+        self.checkout_wait_total += seconds
+        self.checkout_wait_max = max(self.checkout_wait_max, seconds)
+        self._waits.append(seconds)
+
+    def record_query(self, statement: str, seconds: float):
+        self.queries += 1
+        self.query_time_total += seconds
+        ms = seconds * 1000
+        if self.slow_query_ms and ms >= self.slow_query_ms:
+            self.slow_queries += 1
+            self._slow.append({
+                "statement": " ".join(statement.split())[:500],
+                "duration_ms": round(ms, 1),
+                "at": datetime.now(timezone.utc).isoformat(),
+            })
+            logger.warning("Slow query (%.0f ms): %s", ms, " ".join(statement.split())[:200], extra={"duration_ms": round(ms, 1)})
+
+    def attach(self, engine):
+        """Time every statement run on the engine"""
+        sync_engine = engine.sync_engine
+
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            started = conn.info["query_started"].pop()
+            self.record_query(statement, time.perf_counter() - started)
+
+        @event.listens_for(sync_engine, "handle_error")
+        def handle_error(context):
+            started = context.connection.info.get("query_started") if context.connection is not None else None
+            if started:
+                started.pop()
+            self.query_errors += 1
+
+    def stats(self, pool: Optional[Any] = None) -> Dict[str, Any]:
+        waits = list(self._waits)
+        result = {
+            "checkouts": self.checkouts,
+            "checkout_timeouts": self.checkout_timeouts,
+            "checkout_wait_ms": {
+                "avg": round(self.checkout_wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "p50": round(_percentile(waits, 0.50) * 1000, 3),
+                "p95": round(_percentile(waits, 0.95) * 1000, 3),
+                "p99": round(_percentile(waits, 0.99) * 1000, 3),
+                "max": round(self.checkout_wait_max * 1000, 3),
+            },
+            "queries": self.queries,
+            "query_errors": self.query_errors,
+            "query_ms_avg": round(self.query_time_total / self.queries * 1000, 3) if self.queries else 0.0,
+            "slow_query_ms": self.slow_query_ms,
+            "slow_queries": self.slow_queries,
+            "recent_slow_queries": list(self._slow),
+        }
+        if pool is not None:
+            result["pool"] = {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": pool.overflow(),
+            }
+        return result
+
+
+# Process-wide metrics of the application engine
+db_metrics = DatabaseMetrics()
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Async queue pool that records how long every checkout waited for a connection (or a new one)"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            db_metrics.record_checkout(time.perf_counter() - start, timed_out=True)
+            raise
+        db_metrics.record_checkout(time.perf_counter() - start)
+        return connection
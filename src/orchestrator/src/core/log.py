@@ -0,0 +1,188 @@
+import contextvars
+import copy
+import json
+import logging
+import queue
+import sys
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+from src.core.config import LOG_LEVEL, LOG_FORMAT, LOG_LEVELS
+
+
+# Ids of the request and run being handled, added to every record logged under them.
+# Tasks copy the context they are created in, so a run started by a request keeps its request_id
+_context: Dict[str, contextvars.ContextVar] = {
+    name: contextvars.ContextVar(name, default=None)
+    for name in ("request_id", "run_id", "thread_id", "assistant_id")
+}
+
+# Attributes every LogRecord has; anything else was passed in `extra` and is logged as a field
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"} | set(_context)
+
+
+@contextmanager
+def log_context(**ids):
+    """Bind ids (request_id, run_id, thread_id, assistant_id) to the records logged in this block"""
+    tokens = [(_context[name], _context[name].set(str(value) if value is not None else None))
+              for name, value in ids.items()]
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """Copies the bound ids onto the record, in the task that logs it"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for name, var in _context.items():
+            setattr(record, name, var.get())
+        return True
+
+
+class _QueueHandler(QueueHandler):
+    """
+    Puts records on the queue without formatting them, so the listener's
+    formatter still sees the `extra` fields. Arguments and tracebacks are
+    rendered here, while the objects they refer to are still current.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, bound ids and extra fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for name in _context:
+            value = getattr(record, name, None)
+            if value is not None:
+                entry[name] = value
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Plain lines for local runs, with the bound ids after the message"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        ids = " ".join(f"{name}={getattr(record, name)}" for name in _context if getattr(record, name, None))
+        if not ids:
+            return line
+        head, sep, rest = line.partition("\n")
+        return f"{head} [{ids}]{sep}{rest}"
+
+
+_listener: Optional[QueueListener] = None
+
+
+def _parse_levels(spec: str) -> Dict[str, str]:
+    """'src.api.chat=DEBUG,sqlalchemy.engine=WARNING' -> {logger: level}"""
+    levels = {}
+    for item in spec.split(","):
+        name, sep, level = item.strip().partition("=")
+        if sep and name.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT, levels: str = LOG_LEVELS):
+    """
+    Route all logging through a queue: callers only enqueue the record and a
+    listener thread formats and writes it to stdout, so a slow stdout never
+    blocks the event loop. uvicorn's loggers are routed the same way.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+    records = queue.SimpleQueue()
+    handler = _QueueHandler(records)
+    handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers.clear()
+        uvicorn_logger.propagate = True
+    for name, module_level in _parse_levels(levels).items():
+        logging.getLogger(name).setLevel(module_level)
+
+    _listener = QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Write out the queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class RequestContextMiddleware:
+    """
+    Binds a request_id to everything logged while handling the request: the
+    X-Request-ID header when the client sent one, a new id otherwise. The id is
+    returned in the X-Request-ID response header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for key, value in scope.get("headers") or ():
+            if key == b"x-request-id":
+                request_id = value.decode("latin-1")[:128]
+                break
+        request_id = request_id or uuid.uuid4().hex
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        with log_context(request_id=request_id):
+            await self.app(scope, receive, send_with_id)
@@ -4,6 +4,7 @@ from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 from sqlalchemy import delete, update
 from src.models.agent import Agent, AgentMcpServer
+from src.orchestrator.core.graph_cache import graph_cache
 
 async def create_agent(db: AsyncSession, agent_data: dict):
     # Extract MCP servers separately
@@ -15,10 +16,11 @@ async def create_agent(db: AsyncSession, agent_data: dict):
     await db.flush()  # Get the agent ID
     
     # Add MCP server associations
-    for mcp in mcp_servers:
+    for position, mcp in enumerate(mcp_servers):
         assoc = AgentMcpServer(
             agent_id=db_agent.id,
-            mcp_server_id=mcp['mcp_server_id']
+            mcp_server_id=mcp['mcp_server_id'],
+            position=position
         )
         db.add(assoc)
     
@@ -79,14 +81,16 @@ async def update_agent(db: AsyncSession, agent_id: str, agent_data: dict):
     # Update MCP servers
     if mcp_servers:
         # Add new associations
-        for mcp in mcp_servers:
+        for position, mcp in enumerate(mcp_servers):
             assoc = AgentMcpServer(
                 agent_id=agent_uuid,
-                mcp_server_id=mcp['mcp_server_id']
+                mcp_server_id=mcp['mcp_server_id'],
+                position=position
             )
             db.add(assoc)
 
     await db.commit()
+    graph_cache.invalidate(agent_uuid)
 
     # Re-fetch the agent with relationships loaded
     result = await db.execute(
@@ -104,4 +108,5 @@ async def delete_agent(db: AsyncSession, agent_id: str):
         delete(Agent).where(Agent.id == agent_id)
     )
     await db.commit()
+    graph_cache.invalidate(agent_id)
     return True
\ No newline at end of file
@@ -3,6 +3,8 @@ from sqlalchemy.future import select
 from sqlalchemy import update, delete
 from src.models.api_key import ApiKey
 from src.schemas.api_key import ApiKeyCreate, ApiKeyUpdate
+from src.orchestrator.core.graph_cache import graph_cache
+from src.orchestrator.core.llm_provider import invalidate_llms
 #from sqlalchemy.orm import selectinload
 
 async def get_api_keys(db: AsyncSession):
@@ -46,6 +48,8 @@ async def update_api_key(db: AsyncSession, key_id, api_key: ApiKeyUpdate):
         .returning(ApiKey)
     )
     await db.commit()
+    graph_cache.invalidate(key_id)
+    invalidate_llms(key_id)
 
     updated = result.scalar_one_or_none()
 
@@ -74,4 +78,6 @@ async def delete_api_key(db: AsyncSession, key_id):
     
     await db.delete(obj)
     await db.commit()
+    graph_cache.invalidate(key_id)
+    invalidate_llms(key_id)
     return obj
@@ -0,0 +1,67 @@
+from uuid import UUID
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.orchestrator.core.assistant_spec import AssistantSpec, spec_from_json
+
+# The whole definition of an assistant, orchestrator or sub agent, as one JSON
+# tree: api key, sub agents with their api keys and MCP servers. One statement,
+# so a graph build costs one round trip whatever kind the id turns out to be.
+# Sub agents and MCP servers keep the position of their association rows (the
+# order they were listed in, as the relationships load them), not id order.
+RESOLVE_ASSISTANT_SQL = text("""
+WITH api_keys AS NOT MATERIALIZED (
+    SELECT k.id, jsonb_build_object(
+        'id', k.id, 'provider_name', k.provider_name, 'model_name', k.model_name,
+        'base_url', k.base_url, 'secret_key', k.secret_key, 'modified_at', k.modified_at
+    ) AS spec
+    FROM config.api_key k
+),
+agent_specs AS NOT MATERIALIZED (
+    SELECT a.id, jsonb_build_object(
+        'id', a.id, 'name', a.name, 'description', a.description, 'role', a.role,
+        'task', a.task, 'instructions', a.instructions, 'modified_at', a.modified_at,
+        'api_key', k.spec,
+        'mcp_servers', coalesce((
+            SELECT jsonb_agg(jsonb_build_object(
+                'id', m.id, 'name', m.name, 'description', m.description, 'transport', m.transport,
+                'mode', m.mode, 'config_json', m.config_json, 'modified_at', m.modified_at
+            ) ORDER BY am.position, am.mcp_server_id)
+            FROM agents.agent_mcp_server am
+            JOIN config.mcp_server m ON m.id = am.mcp_server_id
+            WHERE am.agent_id = a.id
+        ), '[]'::jsonb)
+    ) AS spec
+    FROM agents.agent a
+    JOIN api_keys k ON k.id = a.api_key_id
+)
+SELECT 'orchestrator' AS kind, jsonb_build_object(
+    'id', o.id, 'name', o.name, 'description', o.description, 'instructions', o.instructions,
+    'modified_at', o.modified_at, 'api_key', k.spec,
+    'agents', coalesce((
+        SELECT jsonb_agg(s.spec ORDER BY osa.position, osa.agent_id)
+        FROM agents.orchestrator_sub_agent osa
+        JOIN agent_specs s ON s.id = osa.agent_id
+        WHERE osa.orchestrator_id = o.id
+    ), '[]'::jsonb)
+) AS spec
+FROM agents.orchestrator o
+JOIN api_keys k ON k.id = o.api_key_id
+WHERE o.id = :assistant_id
+UNION ALL
+SELECT 'agent', s.spec FROM agent_specs s WHERE s.id = :assistant_id
+LIMIT 1
+""")
+
+async def resolve_assistant(db: AsyncSession, assistant_id: str) -> Optional[AssistantSpec]:
+    """Load everything the graph of an assistant is built from, in one query."""
+    try:
+        key = UUID(str(assistant_id))
+    except ValueError:
+        return None
+
+    result = await db.execute(RESOLVE_ASSISTANT_SQL, {"assistant_id": key})
+    row = result.one_or_none()
+    if row is None:
+        return None
+    return spec_from_json(row.kind, row.spec)
@@ -2,6 +2,8 @@ from sqlalchemy.future import select
 from sqlalchemy import update, delete
 from src.models.mcp_server import McpServer
 from src.core.database import async_session
+from src.orchestrator.core.graph_cache import graph_cache
+from src.orchestrator.core.mcp_service import invalidate_server_tools
 
 async def create_mcp_server(mcp_server: dict):
     async with async_session() as session:
@@ -30,6 +32,8 @@ async def update_mcp_server(server_id: str, mcp_server: dict):
             .values(**mcp_server)
         )
         await session.commit()
+        graph_cache.invalidate(server_id)
+        await invalidate_server_tools(server_id)
         return await get_mcp_server(server_id)
 
 async def delete_mcp_server(server_id: str):
@@ -38,4 +42,6 @@ async def delete_mcp_server(server_id: str):
             delete(McpServer).where(McpServer.id == server_id)
         )
         await session.commit()
+        graph_cache.invalidate(server_id)
+        await invalidate_server_tools(server_id)
         return True
\ No newline at end of file
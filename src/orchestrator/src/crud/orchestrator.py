@@ -5,6 +5,7 @@ from sqlalchemy import delete, update
 from sqlalchemy.orm import selectinload, joinedload
 from src.models.orchestrator import Orchestrator, OrchestratorSubAgent
 from src.models.agent import Agent, AgentMcpServer
+from src.orchestrator.core.graph_cache import graph_cache
 
 async def create_orchestrator(session: AsyncSession, orchestrator_data: dict):
     agents_data = orchestrator_data.pop('agents', [])
@@ -12,10 +13,11 @@ async def create_orchestrator(session: AsyncSession, orchestrator_data: dict):
     session.add(db_orch)
     await session.flush()
     
-    for agent_data in agents_data:
+    for position, agent_data in enumerate(agents_data):
         assoc = OrchestratorSubAgent(
             agent_id = agent_data['agent_id'],
-            orchestrator_id = db_orch.id)
+            orchestrator_id = db_orch.id,
+            position = position)
         session.add(assoc)
     
     await session.commit()
@@ -72,13 +74,15 @@ async def update_orchestrator(session: AsyncSession, orchestrator_id: str, orche
     )
     await session.flush()
 
-    for agent_data in agents_data:
+    for position, agent_data in enumerate(agents_data):
         assoc = OrchestratorSubAgent(
             agent_id = agent_data['agent_id'],
-            orchestrator_id = orch_uuid)
+            orchestrator_id = orch_uuid,
+            position = position)
         session.add(assoc)
     
     await session.commit()
+    graph_cache.invalidate(orch_uuid)
     return await get_orchestrator(session, orchestrator_id)
 
 async def delete_orchestrator(session: AsyncSession, orchestrator_id: str):
@@ -86,4 +90,5 @@ async def delete_orchestrator(session: AsyncSession, orchestrator_id: str):
         delete(Orchestrator).where(Orchestrator.id == orchestrator_id)
     )
     await session.commit()
+    graph_cache.invalidate(orchestrator_id)
     return True
\ No newline at end of file
@@ -0,0 +1,177 @@
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from sqlalchemy.future import select
+from sqlalchemy import update, delete, func, literal_column
+from src.models.thread import Thread
+from src.core.database import async_session
+from src.core.config import THREAD_CACHE_MAX_ENTRIES, THREAD_CACHE_TTL_SECONDS
+
+
+class ThreadCache:
+    """
+    Small read-through LRU cache of thread rows (as response dicts) for this worker.
+    Entries expire after ttl seconds, so changes made by other workers show up
+    within that window.
+    """
+
+    def __init__(self, max_entries: int = THREAD_CACHE_MAX_ENTRIES, ttl: float = THREAD_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(thread_id)
+        if entry is None or entry[0] < time.monotonic():
+            self._entries.pop(thread_id, None)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(thread_id)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, thread_id: str, thread: Dict[str, Any]):
+        if self.max_entries <= 0 or self.ttl <= 0:
+            return
+        self._entries[thread_id] = (time.monotonic() + self.ttl, thread)
+        self._entries.move_to_end(thread_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def pop(self, thread_id: str):
+        self._entries.pop(thread_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses}
+
+
+# Process-wide thread cache
+thread_cache = ThreadCache()
+
+
+def thread_to_dict(thread: Thread) -> Dict[str, Any]:
+    return {
+        "thread_id": str(thread.id),
+        "created_at": thread.created_at.isoformat(),
+        "updated_at": thread.modified_at.isoformat(),
+        "metadata": thread.metadata_json or {},
+        "status": thread.status or "idle",
+        "config": thread.config_json or {},
+        "values": None,
+        "assistant_id": str(thread.assistant_id) if thread.assistant_id else None,
+        "ttl_minutes": thread.ttl_minutes,
+        "expires_at": thread.expires_at.isoformat() if thread.expires_at else None,
+    }
+
+
+def _parse_id(thread_id: str) -> Optional[uuid.UUID]:
+    try:
+        return uuid.UUID(str(thread_id))
+    except ValueError:
+        return None
+
+
+def _expires_at(ttl_minutes):
+    # NULL ttl gives a NULL expiry
+    return func.now() + ttl_minutes * literal_column("interval '1 minute'")
+
+
+async def create_thread(thread: dict) -> Dict[str, Any]:
+    async with async_session() as session:
+        db_thread = Thread(**thread)
+        if db_thread.ttl_minutes:
+            db_thread.expires_at = datetime.now(timezone.utc) + timedelta(minutes=db_thread.ttl_minutes)
+        session.add(db_thread)
+        await session.commit()
+        await session.refresh(db_thread)
+        result = thread_to_dict(db_thread)
+        thread_cache.put(result["thread_id"], result)
+        return result
+
+async def get_thread(thread_id: str) -> Optional[Dict[str, Any]]:
+    cached = thread_cache.get(thread_id)
+    if cached is not None:
+        return cached
+
+    key = _parse_id(thread_id)
+    if key is None:
+        return None
+
+    async with async_session() as session:
+        result = await session.execute(
+            select(Thread).filter(Thread.id == key))
+        db_thread = result.scalar_one_or_none()
+        if db_thread is None:
+            return None
+        thread = thread_to_dict(db_thread)
+        thread_cache.put(thread_id, thread)
+        return thread
+
+async def set_thread_assistant(thread_id: str, assistant_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Bind the thread to the assistant of its first run; later runs keep that assistant.
+    Raises ValueError when assistant_id is not a UUID.
+    """
+    assistant_key = _parse_id(assistant_id)
+    if assistant_key is None:
+        raise ValueError(f"Invalid assistant id: {assistant_id}")
+    async with async_session() as session:
+        await session.execute(
+            update(Thread)
+            .where(Thread.id == _parse_id(thread_id), Thread.assistant_id.is_(None))
+            .values(assistant_id=assistant_key)
+        )
+        await session.commit()
+    thread_cache.pop(thread_id)
+    return await get_thread(thread_id)
+
+async def touch_thread(thread_id: str):
+    """Mark a run on the thread: bumps updated_at and restarts its TTL."""
+    async with async_session() as session:
+        await session.execute(
+            update(Thread)
+            .where(Thread.id == _parse_id(thread_id))
+            .values(expires_at=_expires_at(Thread.ttl_minutes))
+        )
+        await session.commit()
+    thread_cache.pop(thread_id)
+
+async def delete_thread(thread_id: str) -> bool:
+    key = _parse_id(thread_id)
+    if key is None:
+        return False
+    async with async_session() as session:
+        result = await session.execute(
+            delete(Thread).where(Thread.id == key)
+        )
+        await session.commit()
+    thread_cache.pop(thread_id)
+    return result.rowcount > 0
+
+async def get_expired_thread_ids(limit: int = 500) -> List[str]:
+    """Ids of up to limit threads whose TTL ran out."""
+    async with async_session() as session:
+        result = await session.execute(
+            select(Thread.id)
+            .where(Thread.expires_at < func.now())
+            .limit(limit)
+        )
+        return [str(thread_id) for thread_id in result.scalars().all()]
+
+async def delete_threads(thread_ids: List[str]) -> int:
+    """Delete the given threads, e.g. expired ones once their checkpoints are gone."""
+    keys = [key for key in map(_parse_id, thread_ids) if key is not None]
+    if not keys:
+        return 0
+    async with async_session() as session:
+        result = await session.execute(
+            delete(Thread).where(Thread.id.in_(keys))
+        )
+        await session.commit()
+    for thread_id in thread_ids:
+        thread_cache.pop(thread_id)
+    return result.rowcount
@@ -0,0 +1,123 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from sqlalchemy import func, insert, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.models.run_usage import RunUsage
+from src.models.api_key import ApiKey
+from src.models.orchestrator import Orchestrator
+from src.models.agent import Agent
+from src.core.database import async_session
+
+
+async def insert_run_usage(rows: List[Dict[str, Any]]) -> None:
+    """Write usage rows in one multi-row INSERT (usage recorder flush)"""
+    async with async_session() as session:
+        await session.execute(insert(RunUsage), rows)
+        await session.commit()
+
+
+def _window(start: Optional[datetime], end: Optional[datetime]):
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(days=30)
+    return [RunUsage.started_at >= start, RunUsage.started_at < end]
+
+
+async def _summarize(db: AsyncSession, groups: Dict[str, Any], filters: list,
+                     order_by: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Usage totals per group, by most tokens first or by the `order_by` group.
+    Rows are first summed per run, so the run latency, repeated on every row
+    of a run, is averaged once per run.
+    """
+    per_run = (
+        select(
+            *[column.label(name) for name, column in groups.items()],
+            RunUsage.run_id,
+            func.sum(RunUsage.llm_calls).label("llm_calls"),
+            func.sum(RunUsage.input_tokens).label("input_tokens"),
+            func.sum(RunUsage.output_tokens).label("output_tokens"),
+            func.max(RunUsage.duration_ms).label("duration_ms"),
+            func.max(RunUsage.first_token_ms).label("first_token_ms"),
+        )
+        .where(*filters)
+        .group_by(*groups.values(), RunUsage.run_id)
+        .subquery()
+    )
+    group_columns = [per_run.c[name] for name in groups]
+    input_tokens = func.coalesce(func.sum(per_run.c.input_tokens), 0)
+    output_tokens = func.coalesce(func.sum(per_run.c.output_tokens), 0)
+    result = await db.execute(
+        select(
+            *group_columns,
+            func.count().label("runs"),
+            func.coalesce(func.sum(per_run.c.llm_calls), 0).label("llm_calls"),
+            input_tokens.label("input_tokens"),
+            output_tokens.label("output_tokens"),
+            func.avg(per_run.c.duration_ms).label("avg_duration_ms"),
+            func.avg(per_run.c.first_token_ms).label("avg_first_token_ms"),
+        )
+        .group_by(*group_columns)
+        .order_by(per_run.c[order_by] if order_by else (input_tokens + output_tokens).desc())
+    )
+    return [
+        {
+            **row,
+            "total_tokens": row["input_tokens"] + row["output_tokens"],
+            "avg_duration_ms": float(row["avg_duration_ms"]) if row["avg_duration_ms"] is not None else None,
+            "avg_first_token_ms": float(row["avg_first_token_ms"]) if row["avg_first_token_ms"] is not None else None,
+        }
+        for row in result.mappings().all()
+    ]
+
+
+async def get_usage_by_api_key(db: AsyncSession, start: Optional[datetime] = None, end: Optional[datetime] = None):
+    rows = await _summarize(
+        db,
+        {"api_key_id": RunUsage.api_key_id, "provider": RunUsage.provider, "model": RunUsage.model},
+        _window(start, end),
+    )
+    key_ids = {row["api_key_id"] for row in rows if row["api_key_id"] is not None}
+    names = {}
+    if key_ids:
+        result = await db.execute(select(ApiKey.id, ApiKey.name).where(ApiKey.id.in_(key_ids)))
+        names = dict(result.all())
+    return [{**row, "api_key_name": names.get(row["api_key_id"])} for row in rows]
+
+
+async def get_usage_by_assistant(db: AsyncSession, start: Optional[datetime] = None, end: Optional[datetime] = None):
+    rows = await _summarize(db, {"assistant_id": RunUsage.assistant_id}, _window(start, end))
+    assistant_ids = {row["assistant_id"] for row in rows if row["assistant_id"] is not None}
+    assistants = {}
+    if assistant_ids:
+        result = await db.execute(
+            select(Orchestrator.id, Orchestrator.name, literal_column("'orchestrator'"))
+            .where(Orchestrator.id.in_(assistant_ids))
+            .union_all(
+                select(Agent.id, Agent.name, literal_column("'agent'")).where(Agent.id.in_(assistant_ids))
+            )
+        )
+        assistants = {row[0]: (row[1], row[2]) for row in result.all()}
+    return [
+        {
+            **row,
+            "assistant_name": assistants.get(row["assistant_id"], (None, None))[0],
+            "assistant_type": assistants.get(row["assistant_id"], (None, None))[1],
+        }
+        for row in rows
+    ]
+
+
+async def get_usage_by_day(db: AsyncSession, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                           api_key_id=None, assistant_id=None):
+    filters = _window(start, end)
+    if api_key_id is not None:
+        filters.append(RunUsage.api_key_id == api_key_id)
+    if assistant_id is not None:
+        filters.append(RunUsage.assistant_id == assistant_id)
+    day = func.date(func.timezone("UTC", RunUsage.started_at))
+    return await _summarize(db, {"day": day}, filters, "day")
+
+
+async def get_thread_usage(db: AsyncSession, thread_id):
+    rows = await _summarize(db, {"thread_id": RunUsage.thread_id}, [RunUsage.thread_id == thread_id])
+    return rows[0] if rows else None
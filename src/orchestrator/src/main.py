@@ -1,18 +1,44 @@
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from src.api import version, api_key, mcp_server, agent, orchestrator, apps, chat
+from fastapi.responses import PlainTextResponse
+from src.core.log import setup_logging, shutdown_logging, RequestContextMiddleware
+from src.api import version, api_key, mcp_server, agent, orchestrator, apps, chat, usage
 
 # Async SQLite injection
 from contextlib import asynccontextmanager
-from src.orchestrator.core.lite_memory.sqlite_cp import DB_PATH, set_saver, clear_saver, get_saver#, saver, get_saver #init_saver, shutdown_saver
-from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from src.orchestrator.core.lite_memory.sqlite_cp import set_saver, clear_saver, get_saver#, saver, get_saver #init_saver, shutdown_saver
+from src.orchestrator.core.checkpointer import open_checkpointer
+from src.orchestrator.core.mcp_pool import mcp_pool
+from src.orchestrator.core.llm_provider import close_llm_clients
+from src.orchestrator.core.thread_sweeper import thread_sweeper
+from src.orchestrator.core.checkpoint_retention import checkpoint_retention
+from src.orchestrator.core.run_manager import run_manager
+from src.orchestrator.core.run_streams import run_streams
+from src.orchestrator.core.metrics import metrics, MetricsMiddleware
+from src.orchestrator.core.usage_recorder import usage_recorder
+
+# JSON lines written by a background thread (LOG_LEVEL, LOG_FORMAT, LOG_LEVELS)
+setup_logging()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    async with AsyncSqliteSaver.from_conn_string(DB_PATH) as cp:
+    async with open_checkpointer() as cp:  # CHECKPOINTER_BACKEND
         set_saver(cp)         # assign once
+        mcp_pool.start()      # MCP sessions health check
+        thread_sweeper.start(cp)  # expired threads and their checkpoints
+        checkpoint_retention.start(cp)  # old checkpoints of long threads
+        usage_recorder.start()    # token usage, written in batches
+        run_streams.start()       # event logs of finished resumable runs
         yield
+        await run_manager.close()       # cancel active runs before the checkpointer closes
+        await run_streams.close()
+        await usage_recorder.close()    # after the runs, so their usage is written
+        await checkpoint_retention.close()
+        await thread_sweeper.close()
+        await mcp_pool.close()
+        await close_llm_clients()
     clear_saver()             # reset on shutdown
+    shutdown_logging()        # write out queued records
 
 
 app = FastAPI(title="FustatAI - Orchestration Service", lifespan=lifespan)
@@ -32,6 +58,12 @@ app.add_middleware(
     allow_headers=["*"],         # includes Content-Type, Authorization, etc.
 )
 
+# Request counts and latencies by route, time to first event of streams (GET /metrics)
+app.add_middleware(MetricsMiddleware)
+
+# request_id of every record logged while handling a request (X-Request-ID)
+app.add_middleware(RequestContextMiddleware)
+
 url_prefix = "/api/v1"
 
 app.include_router(version.router)
@@ -41,7 +73,16 @@ app.include_router(agent.router, prefix=url_prefix)
 app.include_router(orchestrator.router, prefix=url_prefix)
 app.include_router(apps.router, prefix=url_prefix)
 app.include_router(chat.router, prefix=url_prefix)
+app.include_router(usage.router, prefix=url_prefix)
 
 @app.get("/")
 def health_check():
     return {"status": "healthy"}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Metrics of this worker in the Prometheus text format. Async, so render()
+    runs on the event loop: the metrics are only ever touched there, unlocked.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, Boolean, ForeignKey
+from sqlalchemy import Column, String, Text, Boolean, ForeignKey, Integer
 from sqlalchemy.orm import relationship
 from src.models.base import Base, BaseModel
 
@@ -22,6 +22,7 @@ class Agent(BaseModel):
     mcp_servers = relationship(
         "AgentMcpServer", 
         #back_populates="agent", 
+        order_by="AgentMcpServer.position",
         cascade="all, delete-orphan")
 
     orchestrator_associations = relationship(
@@ -36,6 +37,8 @@ class AgentMcpServer(Base):
     
     agent_id = Column(ForeignKey('agents.agent.id', ondelete='CASCADE'), primary_key=True)
     mcp_server_id = Column(ForeignKey('config.mcp_server.id', ondelete='RESTRICT'), primary_key=True)
+    # Order the servers were listed in
+    position = Column(Integer, nullable=False, default=0, server_default='0')
     
     agent = relationship("Agent")#, back_populates="mcp_server_associations")
     mcp_server = relationship("McpServer")
\ No newline at end of file
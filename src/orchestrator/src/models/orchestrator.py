@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, Boolean, ForeignKey
+from sqlalchemy import Column, String, Text, Boolean, ForeignKey, Integer
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.hybrid import hybrid_property
 from src.models.base import Base, BaseModel
@@ -21,6 +21,7 @@ class Orchestrator(BaseModel):
     agent_associations = relationship(
         "OrchestratorSubAgent",
         back_populates="orchestrator",
+        order_by="OrchestratorSubAgent.position",
         cascade="all, delete-orphan"
     )
 
@@ -34,6 +35,8 @@ class OrchestratorSubAgent(Base):
     
     orchestrator_id = Column(ForeignKey('agents.orchestrator.id', ondelete='CASCADE'), primary_key=True)
     agent_id = Column(ForeignKey('agents.agent.id', ondelete='RESTRICT'), primary_key=True)
+    # Order the sub agents were listed in
+    position = Column(Integer, nullable=False, default=0, server_default='0')
     
     orchestrator = relationship("Orchestrator", back_populates="agent_associations")
     agent = relationship("Agent", back_populates="orchestrator_associations")
\ No newline at end of file
@@ -4,3 +4,5 @@ from src.models.api_key import ApiKey
 from src.models.mcp_server import McpServer
 from src.models.agent import Agent, AgentMcpServer
 from src.models.orchestrator import Orchestrator, OrchestratorSubAgent
+from src.models.thread import Thread
+from src.models.run_usage import RunUsage
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, String, Integer, DateTime, Index
+from sqlalchemy.dialects.postgresql import UUID
+from src.models.base import BaseModel
+
+# LLM usage of one run: one row per api key and model the run called (one
+# row without a model when it called none), written in batches by the usage recorder
+class RunUsage(BaseModel):
+    __tablename__ = 'run_usage'
+    __table_args__ = (
+        Index('ix_run_usage_started_at', 'started_at'),
+        Index('ix_run_usage_api_key_id_started_at', 'api_key_id', 'started_at'),
+        Index('ix_run_usage_assistant_id_started_at', 'assistant_id', 'started_at'),
+        Index('ix_run_usage_thread_id', 'thread_id'),
+        {'schema': 'agents'},
+    )
+
+    run_id = Column(UUID(as_uuid=True), nullable=False)
+    # None for stateless batch runs
+    thread_id = Column(UUID(as_uuid=True), nullable=True)
+    # Orchestrator or agent id
+    assistant_id = Column(UUID(as_uuid=True), nullable=True)
+    api_key_id = Column(UUID(as_uuid=True), nullable=True)
+    provider = Column(String(100), nullable=True)
+    model = Column(String(100), nullable=True)
+    status = Column(String(20), nullable=False)
+    llm_calls = Column(Integer, nullable=False, default=0)
+    input_tokens = Column(Integer, nullable=False, default=0)
+    output_tokens = Column(Integer, nullable=False, default=0)
+    # Run latency, the same on every row of the run
+    duration_ms = Column(Integer, nullable=False)
+    first_token_ms = Column(Integer, nullable=True)
+    started_at = Column(DateTime(timezone=True), nullable=False)
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, String, Integer, DateTime, Index, text
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from src.models.base import BaseModel
+
+class Thread(BaseModel):
+    __tablename__ = 'thread'
+    __table_args__ = (
+        Index('ix_thread_assistant_id', 'assistant_id'),
+        Index('ix_thread_modified_at', 'modified_at'),
+        Index('ix_thread_expires_at', 'expires_at', postgresql_where=text('expires_at IS NOT NULL')),
+        {'schema': 'agents'},
+    )
+    
+    # Orchestrator or agent id, set by the first run on the thread
+    assistant_id = Column(UUID(as_uuid=True), nullable=True)
+    status = Column(String(50), default='idle')
+    metadata_json = Column('metadata', JSONB, nullable=False, default=dict)
+    config_json = Column('config', JSONB, nullable=False, default=dict)
+    # Thread TTL (strategy "delete"), counted from the last run
+    ttl_minutes = Column(Integer, nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,139 @@
+import hashlib
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple, Union
+from uuid import UUID
+
+
+@dataclass(frozen=True)
+class ApiKeySpec:
+    id: UUID
+    provider_name: str
+    model_name: str
+    base_url: Optional[str]
+    # Kept out of repr, so specs in logs, errors and span attributes don't leak it
+    secret_key: str = field(repr=False)
+    modified_at: datetime
+
+
+@dataclass(frozen=True)
+class McpServerSpec:
+    id: UUID
+    name: str
+    description: Optional[str]
+    transport: str
+    mode: str
+    # Canonical JSON, so the spec stays hashable
+    config: str
+    modified_at: datetime
+
+    @property
+    def config_json(self) -> Dict[str, Any]:
+        return json.loads(self.config)
+
+
+@dataclass(frozen=True)
+class AgentSpec:
+    id: UUID
+    name: str
+    description: Optional[str]
+    role: str
+    task: str
+    instructions: str
+    api_key: ApiKeySpec
+    mcp_servers: Tuple[McpServerSpec, ...]
+    modified_at: datetime
+
+
+@dataclass(frozen=True)
+class OrchestratorSpec:
+    id: UUID
+    name: str
+    description: Optional[str]
+    instructions: str
+    api_key: ApiKeySpec
+    agents: Tuple[AgentSpec, ...]
+    modified_at: datetime
+
+
+# Everything an assistant graph is built from, detached from the session
+AssistantSpec = Union[OrchestratorSpec, AgentSpec]
+
+
+def _api_key(data: Dict[str, Any]) -> ApiKeySpec:
+    return ApiKeySpec(
+        id=UUID(data["id"]),
+        provider_name=data["provider_name"],
+        model_name=data["model_name"],
+        base_url=data["base_url"],
+        secret_key=data["secret_key"],
+        modified_at=datetime.fromisoformat(data["modified_at"]),
+    )
+
+
+def _mcp_server(data: Dict[str, Any]) -> McpServerSpec:
+    return McpServerSpec(
+        id=UUID(data["id"]),
+        name=data["name"],
+        description=data["description"],
+        transport=data["transport"],
+        mode=data["mode"],
+        config=json.dumps(data["config_json"], sort_keys=True),
+        modified_at=datetime.fromisoformat(data["modified_at"]),
+    )
+
+
+def _agent(data: Dict[str, Any]) -> AgentSpec:
+    return AgentSpec(
+        id=UUID(data["id"]),
+        name=data["name"],
+        description=data["description"],
+        role=data["role"],
+        task=data["task"],
+        instructions=data["instructions"],
+        api_key=_api_key(data["api_key"]),
+        mcp_servers=tuple(_mcp_server(mcp) for mcp in data["mcp_servers"]),
+        modified_at=datetime.fromisoformat(data["modified_at"]),
+    )
+
+
+def _orchestrator(data: Dict[str, Any]) -> OrchestratorSpec:
+    return OrchestratorSpec(
+        id=UUID(data["id"]),
+        name=data["name"],
+        description=data["description"],
+        instructions=data["instructions"],
+        api_key=_api_key(data["api_key"]),
+        agents=tuple(_agent(agent) for agent in data["agents"]),
+        modified_at=datetime.fromisoformat(data["modified_at"]),
+    )
+
+
+def spec_from_json(kind: str, data: Dict[str, Any]) -> AssistantSpec:
+    """Spec from the JSON tree the assistant resolver returns"""
+    if kind == "orchestrator":
+        return _orchestrator(data)
+    return _agent(data)
+
+
+def spec_versions(spec: AssistantSpec) -> Dict[str, datetime]:
+    """Map every record the spec is built from to its modified_at."""
+    versions = {
+        str(spec.id): spec.modified_at,
+        str(spec.api_key.id): spec.api_key.modified_at,
+    }
+    if isinstance(spec, OrchestratorSpec):
+        for agent in spec.agents:
+            versions.update(spec_versions(agent))
+    else:
+        for mcp in spec.mcp_servers:
+            versions[str(mcp.id)] = mcp.modified_at
+    return versions
+
+
+def spec_fingerprint(spec: AssistantSpec) -> str:
+    """Stable digest of the spec (unlike hash(), the same in every worker)."""
+    versions = spec_versions(spec)
+    raw = "|".join(f"{key}:{versions[key]}" for key in sorted(versions))
+    return hashlib.sha1(raw.encode()).hexdigest()
@@ -0,0 +1,327 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from src.orchestrator.core.pg_memory.pg_cp import AsyncPostgresSaver
+from src.core.config import (
+    CHECKPOINT_RETENTION_KEEP_LAST,
+    CHECKPOINT_RETENTION_TAG,
+    CHECKPOINT_RETENTION_INTERVAL_SECONDS,
+    CHECKPOINT_RETENTION_BATCH_SIZE,
+    CHECKPOINT_RETENTION_VACUUM_PAGES,
+)
+
+logger = logging.getLogger(__name__)
+
+# Threads and namespaces with more than `keep_last` checkpoints, read from the primary key index
+SQLITE_OVERFULL_SQL = """
+SELECT thread_id, checkpoint_ns FROM checkpoints GROUP BY thread_id, checkpoint_ns HAVING count(*) > ?
+"""
+
+# Checkpoints of one thread and namespace past its newest `keep_last`, unless tagged
+SQLITE_PRUNE_CHECKPOINTS_SQL = """
+DELETE FROM checkpoints WHERE rowid IN (
+    SELECT rowid FROM checkpoints
+    WHERE thread_id = :thread_id AND checkpoint_ns = :checkpoint_ns AND checkpoint_id < (
+        SELECT checkpoint_id FROM checkpoints
+        WHERE thread_id = :thread_id AND checkpoint_ns = :checkpoint_ns
+        ORDER BY checkpoint_id DESC LIMIT 1 OFFSET :offset
+    )
+    AND NOT coalesce(json_extract(CAST(metadata AS TEXT), :tag), 0)
+    LIMIT :limit
+)
+RETURNING thread_id, coalesce(length(checkpoint), 0) + coalesce(length(metadata), 0)
+"""
+
+# Writes of checkpoints that are gone. Only older than the newest checkpoint of
+# the thread: writes of a checkpoint that is being saved can land before it.
+SQLITE_PRUNE_WRITES_SQL = """
+DELETE FROM writes WHERE rowid IN (
+    SELECT w.rowid FROM writes w
+    WHERE NOT EXISTS (
+        SELECT 1 FROM checkpoints c
+        WHERE c.thread_id = w.thread_id AND c.checkpoint_ns = w.checkpoint_ns AND c.checkpoint_id = w.checkpoint_id
+    )
+    AND w.checkpoint_id < (
+        SELECT max(c.checkpoint_id) FROM checkpoints c
+        WHERE c.thread_id = w.thread_id AND c.checkpoint_ns = w.checkpoint_ns
+    )
+    LIMIT ?
+)
+RETURNING coalesce(length(value), 0)
+"""
+
+PG_OVERFULL_SQL = """
+SELECT thread_id, checkpoint_ns FROM {schema}.checkpoints GROUP BY thread_id, checkpoint_ns HAVING count(*) > $1
+"""
+
+PG_PRUNE_CHECKPOINTS_SQL = """
+DELETE FROM {schema}.checkpoints WHERE ctid = ANY(ARRAY(
+    SELECT ctid FROM {schema}.checkpoints
+    WHERE thread_id = $1 AND checkpoint_ns = $2 AND checkpoint_id < (
+        SELECT checkpoint_id FROM {schema}.checkpoints
+        WHERE thread_id = $1 AND checkpoint_ns = $2
+        ORDER BY checkpoint_id DESC OFFSET $3 LIMIT 1
+    )
+    AND NOT metadata @> jsonb_build_object($4::text, true)
+    LIMIT $5
+))
+RETURNING thread_id, coalesce(octet_length(checkpoint), 0) + octet_length(metadata::text)
+"""
+
+PG_PRUNE_WRITES_SQL = """
+DELETE FROM {schema}.writes WHERE ctid = ANY(ARRAY(
+    SELECT w.ctid FROM {schema}.writes w
+    WHERE NOT EXISTS (
+        SELECT 1 FROM {schema}.checkpoints c
+        WHERE c.thread_id = w.thread_id AND c.checkpoint_ns = w.checkpoint_ns AND c.checkpoint_id = w.checkpoint_id
+    )
+    AND w.checkpoint_id < (
+        SELECT max(c.checkpoint_id) FROM {schema}.checkpoints c
+        WHERE c.thread_id = w.thread_id AND c.checkpoint_ns = w.checkpoint_ns
+    )
+    LIMIT $1
+))
+RETURNING coalesce(octet_length(value), 0)
+"""
+
+PG_SIZE_SQL = """
+SELECT pg_total_relation_size('{schema}.checkpoints') + pg_total_relation_size('{schema}.writes')
+"""
+
+
+class _SqliteStore:
+    """Retention statements on the saver's own connection, in short transactions under its lock"""
+
+    def __init__(self, checkpointer, vacuum_pages: int):
+        self.checkpointer = checkpointer
+        self.vacuum_pages = vacuum_pages
+        self.vacuum_skipped = False
+
+    async def _delete(self, sql: str, params) -> List[tuple]:
+        cp = self.checkpointer
+        async with cp.lock:
+            async with cp.conn.execute(sql, params) as cur:
+                rows = list(await cur.fetchall())
+            await cp.conn.commit()
+        return rows
+
+    async def overfull(self, keep_last: int) -> List[Tuple[str, str]]:
+        cp = self.checkpointer
+        async with cp.lock:
+            async with cp.conn.execute(SQLITE_OVERFULL_SQL, (keep_last,)) as cur:
+                return list(await cur.fetchall())
+
+    async def prune_checkpoints(self, thread_id: str, checkpoint_ns: str, keep_last: int, tag: str,
+                                limit: int) -> List[tuple]:
+        return await self._delete(SQLITE_PRUNE_CHECKPOINTS_SQL, {
+            "thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "offset": keep_last - 1,
+            "tag": f"$.{tag}", "limit": limit,
+        })
+
+    async def prune_writes(self, limit: int) -> List[tuple]:
+        return await self._delete(SQLITE_PRUNE_WRITES_SQL, (limit,))
+
+    async def _pragma(self, name: str) -> int:
+        async with self.checkpointer.conn.execute(f"PRAGMA {name}") as cur:
+            return (await cur.fetchone())[0]
+
+    async def size(self) -> int:
+        async with self.checkpointer.lock:
+            return await self._pragma("page_count") * await self._pragma("page_size")
+
+    async def reclaim(self) -> None:
+        if self.vacuum_pages <= 0:
+            return
+        cp = self.checkpointer
+        async with cp.lock:
+            if await self._pragma("auto_vacuum") != 2:
+                # Incremental vacuum needs auto_vacuum=INCREMENTAL, which an existing file only
+                # takes with one full VACUUM: too long to hold the connection while serving
+                if not self.vacuum_skipped:
+                    logger.warning("Checkpoint retention: the SQLite file is not in incremental vacuum mode, freed "
+                                   "pages are reused but not given back; run scripts/sqlite_incremental_vacuum.py")
+                    self.vacuum_skipped = True
+                return
+            # Free pages go back to the file system a chunk at a time
+            async with cp.conn.execute(f"PRAGMA incremental_vacuum({int(self.vacuum_pages)})") as cur:
+                await cur.fetchall()
+            await cp.conn.commit()
+
+
+class _PostgresStore:
+    """Retention statements on the saver's pool"""
+
+    def __init__(self, checkpointer, vacuum: bool):
+        self.checkpointer = checkpointer
+        self.vacuum = vacuum
+        self.schema = checkpointer.schema
+
+    async def _delete(self, sql: str, *params) -> List[tuple]:
+        async with self.checkpointer.pool.acquire() as conn:
+            rows = await conn.fetch(sql.format(schema=self.schema), *params)
+        return [tuple(row) for row in rows]
+
+    async def overfull(self, keep_last: int) -> List[Tuple[str, str]]:
+        async with self.checkpointer.pool.acquire() as conn:
+            rows = await conn.fetch(PG_OVERFULL_SQL.format(schema=self.schema), keep_last)
+        return [tuple(row) for row in rows]
+
+    async def prune_checkpoints(self, thread_id: str, checkpoint_ns: str, keep_last: int, tag: str,
+                                limit: int) -> List[tuple]:
+        return await self._delete(PG_PRUNE_CHECKPOINTS_SQL, thread_id, checkpoint_ns, keep_last - 1, tag, limit)
+
+    async def prune_writes(self, limit: int) -> List[tuple]:
+        return await self._delete(PG_PRUNE_WRITES_SQL, limit)
+
+    async def size(self) -> int:
+        async with self.checkpointer.pool.acquire() as conn:
+            return await conn.fetchval(PG_SIZE_SQL.format(schema=self.schema))
+
+    async def reclaim(self) -> None:
+        if not self.vacuum:
+            return
+        # Makes the space of deleted rows reusable and truncates empty pages at the end
+        async with self.checkpointer.pool.acquire() as conn:
+            await conn.execute(f"VACUUM (ANALYZE) {self.schema}.checkpoints, {self.schema}.writes")
+
+
+def _store_for(checkpointer: BaseCheckpointSaver, vacuum_pages: int):
+    # Retention works on the tables of the wrapped saver (DeltaMessageSaver)
+    checkpointer = getattr(checkpointer, "saver", checkpointer)
+    if isinstance(checkpointer, AsyncPostgresSaver):
+        return _PostgresStore(checkpointer, vacuum_pages > 0)
+    if isinstance(checkpointer, AsyncSqliteSaver):  # and TunedSqliteSaver
+        return _SqliteStore(checkpointer, vacuum_pages)
+    return None
+
+
+class CheckpointRetention:
+    """
+    Background task that keeps the last `keep_last` checkpoints of every thread
+    (and subgraph namespace), plus the ones tagged with `tag` in their metadata
+    (runs started with metadata {tag: true}), deletes the pending writes left
+    without a checkpoint and gives the freed space back, every `interval` seconds.
+    With DeltaMessageSaver, the message bodies the deleted checkpoints alone
+    referred to are deleted too.
+    """
+
+    def __init__(self, keep_last: int = CHECKPOINT_RETENTION_KEEP_LAST, tag: str = CHECKPOINT_RETENTION_TAG,
+                 interval: float = CHECKPOINT_RETENTION_INTERVAL_SECONDS,
+                 batch_size: int = CHECKPOINT_RETENTION_BATCH_SIZE,
+                 vacuum_pages: int = CHECKPOINT_RETENTION_VACUUM_PAGES):
+        self.keep_last = keep_last
+        self.tag = tag
+        self.interval = interval
+        self.batch_size = max(1, batch_size)
+        self.vacuum_pages = vacuum_pages
+        self.store = None
+        self.checkpointer: Optional[BaseCheckpointSaver] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.runs = 0
+        self.checkpoints_deleted = 0
+        self.writes_deleted = 0
+        self.messages_deleted = 0
+        self.bytes_deleted = 0
+        self.bytes_reclaimed = 0
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.keep_last > 0 and self.interval > 0
+
+    async def _prune(self, prune, *args) -> List[tuple]:
+        """Deleted rows, the size in bytes last"""
+        deleted = []
+        while True:
+            rows = await prune(*args, self.batch_size)
+            deleted.extend(rows)
+            if len(rows) < self.batch_size:
+                return deleted
+            await asyncio.sleep(0)  # let runs get at the connection between batches
+
+    async def run_once(self) -> Dict[str, Any]:
+        start = time.perf_counter()
+        size_before = await self.store.size()
+        # Only threads with more than keep_last checkpoints, each pruned through the primary key index
+        checkpoint_rows = []
+        for thread_id, checkpoint_ns in await self.store.overfull(self.keep_last):
+            checkpoint_rows += await self._prune(
+                self.store.prune_checkpoints, thread_id, checkpoint_ns, self.keep_last, self.tag,
+            )
+        write_rows = await self._prune(self.store.prune_writes)
+        checkpoints, writes = len(checkpoint_rows), len(write_rows)
+        messages, message_bytes = 0, 0
+        if checkpoint_rows and hasattr(self.checkpointer, "aprune_messages"):
+            messages, message_bytes = await self.checkpointer.aprune_messages({row[0] for row in checkpoint_rows})
+        if checkpoints or writes:
+            await self.store.reclaim()
+        size_after = await self.store.size()
+
+        result = {
+            "checkpoints_deleted": checkpoints,
+            "writes_deleted": writes,
+            "messages_deleted": messages,
+            "bytes_deleted": sum(row[-1] for row in checkpoint_rows + write_rows) + message_bytes,
+            "bytes_reclaimed": max(0, size_before - size_after),
+            "size_bytes": size_after,
+            "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+        }
+        self.runs += 1
+        self.checkpoints_deleted += checkpoints
+        self.writes_deleted += writes
+        self.messages_deleted += messages
+        self.bytes_deleted += result["bytes_deleted"]
+        self.bytes_reclaimed += result["bytes_reclaimed"]
+        self.last_run = result
+        return result
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                result = await self.run_once()
+                if result["checkpoints_deleted"] or result["writes_deleted"]:
+                    logger.info("Checkpoint retention: %s", result, extra={"retention": result})
+            except Exception as e:
+                logger.exception("Checkpoint retention failed: %r", e)
+
+    def start(self, checkpointer: BaseCheckpointSaver):
+        self.checkpointer = checkpointer
+        self.store = _store_for(checkpointer, self.vacuum_pages)
+        if self.store is None:
+            logger.warning("Checkpoint retention: %s is not supported, disabled", type(checkpointer).__name__)
+            return
+        if self._task is None and self.enabled:
+            self._task = asyncio.create_task(self._loop(), name="checkpoint-retention")
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.store = None
+        self.checkpointer = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled and self._task is not None,
+            "keep_last": self.keep_last,
+            "tag": self.tag,
+            "interval_seconds": self.interval,
+            "runs": self.runs,
+            "checkpoints_deleted": self.checkpoints_deleted,
+            "writes_deleted": self.writes_deleted,
+            "messages_deleted": self.messages_deleted,
+            "bytes_deleted": self.bytes_deleted,
+            "bytes_reclaimed": self.bytes_reclaimed,
+            "last_run": self.last_run,
+        }
+
+
+# Process-wide checkpoint retention task
+checkpoint_retention = CheckpointRetention()
@@ -0,0 +1,37 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from src.core.config import CHECKPOINTER_BACKEND, CHECKPOINT_PG_DSN, CHECKPOINT_SQLITE_PROFILE, CHECKPOINT_DELTA_MESSAGES
+from src.orchestrator.core.lite_memory.sqlite_cp import DB_PATH
+from src.orchestrator.core.lite_memory.sqlite_tuned import TunedSqliteSaver
+from src.orchestrator.core.delta_messages import DeltaMessageSaver
+from src.orchestrator.core.metrics import instrument_checkpointer
+
+
+@asynccontextmanager
+async def _open_backend(backend: str) -> AsyncIterator[BaseCheckpointSaver]:
+    if backend == "postgres":
+        from src.orchestrator.core.pg_memory.pg_cp import AsyncPostgresSaver
+
+        async with AsyncPostgresSaver.from_conn_string(CHECKPOINT_PG_DSN) as cp:
+            yield cp
+    elif backend == "sqlite":
+        saver_cls = TunedSqliteSaver if CHECKPOINT_SQLITE_PROFILE == "tuned" else AsyncSqliteSaver
+        async with saver_cls.from_conn_string(DB_PATH) as cp:
+            yield cp
+    else:
+        raise ValueError(f"Unsupported checkpointer backend: {backend}")
+
+
+@asynccontextmanager
+async def open_checkpointer(backend: str = CHECKPOINTER_BACKEND,
+                            delta_messages: bool = CHECKPOINT_DELTA_MESSAGES) -> AsyncIterator[BaseCheckpointSaver]:
+    """Checkpoint saver selected by CHECKPOINTER_BACKEND, open for the lifetime of the app"""
+    async with _open_backend(backend) as cp:
+        if delta_messages:
+            cp = DeltaMessageSaver(cp)
+            await cp.setup()
+        yield instrument_checkpointer(cp)
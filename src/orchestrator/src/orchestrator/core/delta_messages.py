@@ -0,0 +1,486 @@
+import asyncio
+import hashlib
+import json
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Iterator, Sequence
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+)
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from src.orchestrator.core.lite_memory.sqlite_tuned import TunedSqliteSaver
+from src.orchestrator.core.pg_memory.pg_cp import AsyncPostgresSaver
+from src.core.config import CHECKPOINT_MESSAGE_CACHE_MAX_BYTES
+
+# Marker a checkpoint stores in place of the message list
+REFS_KEY = "__message_refs__"
+
+# Digests remembered by message, so unchanged messages aren't serialized again at every step
+_DIGEST_CACHE_SIZE = 10000
+
+# Digests per DELETE statement
+_DELETE_CHUNK = 500
+
+SQLITE_INSERT_SQL = "INSERT OR IGNORE INTO checkpoint_messages (thread_id, digest, type, body) VALUES (?, ?, ?, ?)"
+
+PG_INSERT_SQL = """
+INSERT INTO {schema}.messages (thread_id, digest, type, body) VALUES ($1, $2, $3, $4)
+ON CONFLICT (thread_id, digest) DO NOTHING
+"""
+
+SQLITE_SETUP_SQL = """
+CREATE TABLE IF NOT EXISTS checkpoint_messages (
+    thread_id TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    type TEXT,
+    body BLOB,
+    PRIMARY KEY (thread_id, digest)
+);
+"""
+
+PG_SETUP_SQL = """
+CREATE TABLE IF NOT EXISTS {schema}.messages (
+    thread_id TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    type TEXT,
+    body BYTEA,
+    PRIMARY KEY (thread_id, digest)
+);
+"""
+
+
+class _SqliteMessages:
+    """Message bodies in the saver's SQLite file, on its connection"""
+
+    def __init__(self, checkpointer: AsyncSqliteSaver):
+        self.checkpointer = checkpointer
+
+    async def setup(self):
+        cp = self.checkpointer
+        await cp.setup()
+        async with cp.lock:
+            async with cp.conn.executescript(SQLITE_SETUP_SQL):
+                pass
+
+    async def put(self, thread_id: str, rows: List[Tuple[str, str, bytes]]):
+        cp = self.checkpointer
+        rows = [(thread_id, *row) for row in rows]
+        if isinstance(cp, TunedSqliteSaver):
+            # Committed together with the other writes queued at the same time
+            await cp.submit(SQLITE_INSERT_SQL, rows)
+            return
+        async with cp.lock:
+            async with cp.conn.executemany(SQLITE_INSERT_SQL, rows):
+                pass
+            await cp.conn.commit()
+
+    async def put_checkpoint(self, thread_id: str, rows: List[Tuple[str, str, bytes]], config: RunnableConfig,
+                             checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                             new_versions: ChannelVersions) -> RunnableConfig:
+        # Bodies first, a checkpoint never points at a message that isn't stored
+        if rows:
+            await self.put(thread_id, rows)
+        return await self.checkpointer.aput(config, checkpoint, metadata, new_versions)
+
+    async def get(self, thread_id: str, digests: List[str]) -> List[Tuple[str, str, bytes]]:
+        cp = self.checkpointer
+        placeholders = ", ".join("?" * len(digests))
+        async with cp.lock:
+            async with cp.conn.execute(
+                f"SELECT digest, type, body FROM checkpoint_messages WHERE thread_id = ? AND digest IN ({placeholders})",
+                (thread_id, *digests),
+            ) as cur:
+                return list(await cur.fetchall())
+
+    async def digests(self, thread_id: str) -> List[str]:
+        cp = self.checkpointer
+        async with cp.lock:
+            async with cp.conn.execute("SELECT digest FROM checkpoint_messages WHERE thread_id = ?", (thread_id,)) as cur:
+                return [digest for digest, in await cur.fetchall()]
+
+    async def delete(self, thread_id: str, digests: List[str]) -> Tuple[int, int]:
+        cp = self.checkpointer
+        sizes = []
+        for start in range(0, len(digests), _DELETE_CHUNK):
+            chunk = digests[start:start + _DELETE_CHUNK]
+            async with cp.lock:
+                async with cp.conn.execute(
+                    f"DELETE FROM checkpoint_messages WHERE thread_id = ? AND digest IN ({', '.join('?' * len(chunk))}) "
+                    "RETURNING coalesce(length(body), 0)",
+                    (thread_id, *chunk),
+                ) as cur:
+                    sizes.extend(size for size, in await cur.fetchall())
+                await cp.conn.commit()
+        return len(sizes), sum(sizes)
+
+    async def delete_thread(self, thread_id: str):
+        cp = self.checkpointer
+        async with cp.lock:
+            async with cp.conn.execute("DELETE FROM checkpoint_messages WHERE thread_id = ?", (thread_id,)):
+                pass
+            await cp.conn.commit()
+
+
+class _PostgresMessages:
+    """Message bodies next to the checkpoints, on the saver's pool"""
+
+    def __init__(self, checkpointer: AsyncPostgresSaver):
+        self.checkpointer = checkpointer
+        self.schema = checkpointer.schema
+        self._insert_sql = PG_INSERT_SQL.format(schema=self.schema)
+
+    async def setup(self):
+        await self.checkpointer.setup()
+        async with self.checkpointer.pool.acquire() as conn:
+            await conn.execute(PG_SETUP_SQL.format(schema=self.schema))
+
+    async def put_checkpoint(self, thread_id: str, rows: List[Tuple[str, str, bytes]], config: RunnableConfig,
+                             checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                             new_versions: ChannelVersions) -> RunnableConfig:
+        # Bodies are committed in the transaction of the checkpoint row (same group commit)
+        before = [(self._insert_sql, [(thread_id, *row) for row in rows])] if rows else ()
+        return await self.checkpointer.aput(config, checkpoint, metadata, new_versions, before=before)
+
+    async def get(self, thread_id: str, digests: List[str]) -> List[Tuple[str, str, bytes]]:
+        async with self.checkpointer.pool.acquire() as conn:
+            rows = await conn.fetch(
+                f"SELECT digest, type, body FROM {self.schema}.messages WHERE thread_id = $1 AND digest = ANY($2::text[])",
+                thread_id, digests,
+            )
+        return [tuple(row) for row in rows]
+
+    async def digests(self, thread_id: str) -> List[str]:
+        async with self.checkpointer.pool.acquire() as conn:
+            rows = await conn.fetch(f"SELECT digest FROM {self.schema}.messages WHERE thread_id = $1", thread_id)
+        return [row[0] for row in rows]
+
+    async def delete(self, thread_id: str, digests: List[str]) -> Tuple[int, int]:
+        sizes = []
+        for start in range(0, len(digests), _DELETE_CHUNK):
+            async with self.checkpointer.pool.acquire() as conn:
+                rows = await conn.fetch(
+                    f"DELETE FROM {self.schema}.messages WHERE thread_id = $1 AND digest = ANY($2::text[]) "
+                    "RETURNING coalesce(octet_length(body), 0)",
+                    thread_id, digests[start:start + _DELETE_CHUNK],
+                )
+            sizes.extend(row[0] for row in rows)
+        return len(sizes), sum(sizes)
+
+    async def delete_thread(self, thread_id: str):
+        async with self.checkpointer.pool.acquire() as conn:
+            await conn.execute(f"DELETE FROM {self.schema}.messages WHERE thread_id = $1", thread_id)
+
+
+def _store_for(checkpointer: BaseCheckpointSaver):
+    if isinstance(checkpointer, AsyncPostgresSaver):
+        return _PostgresMessages(checkpointer)
+    if isinstance(checkpointer, AsyncSqliteSaver):  # and TunedSqliteSaver
+        return _SqliteMessages(checkpointer)
+    raise ValueError(f"Message deduplication is not supported for {type(checkpointer).__name__}")
+
+
+class _BodyCache:
+    """LRU of serialized message bodies by (thread, digest), bounded by size"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: OrderedDict[Tuple[str, str], Tuple[str, bytes]] = OrderedDict()
+
+    def get(self, key: Tuple[str, str]) -> Optional[Tuple[str, bytes]]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: Tuple[str, str], entry: Tuple[str, bytes]):
+        if key in self._entries or len(entry[1]) > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self.size += len(entry[1])
+        while self.size > self.max_bytes:
+            _, (_, body) = self._entries.popitem(last=False)
+            self.size -= len(body)
+
+    def drop(self, key: Tuple[str, str]):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+    def drop_thread(self, thread_id: str):
+        for key in [key for key in self._entries if key[0] == thread_id]:
+            self.size -= len(self._entries.pop(key)[1])
+
+
+class DeltaMessageSaver(BaseCheckpointSaver[str]):
+    """
+    Checkpoint saver wrapper that stores every message of a thread once.
+
+    On write, the message list of a checkpoint is replaced by the digests of its
+    messages; bodies not stored for the thread yet are written next to the
+    checkpoints (checkpoint_messages table, or <schema>.messages on Postgres),
+    before the checkpoint row or, on Postgres, in the same transaction.
+    On read, the list is put back together from the digests. A step that adds
+    one message writes one body and a list of digests, not the whole history.
+
+    Each checkpoint keeps its full list of digests (not a diff against its
+    parent), so it can be read, or deleted by retention, on its own. After
+    retention, aprune_messages() deletes the bodies no checkpoint of the thread
+    refers to anymore.
+    """
+
+    def __init__(self, saver: BaseCheckpointSaver, *, channel: str = "messages",
+                 cache_max_bytes: int = CHECKPOINT_MESSAGE_CACHE_MAX_BYTES):
+        super().__init__(serde=saver.serde)
+        self.saver = saver
+        self.channel = channel
+        self.store = _store_for(saver)
+        self.loop = asyncio.get_running_loop()
+        self._bodies = _BodyCache(cache_max_bytes)
+        self._digests: OrderedDict[tuple, str] = OrderedDict()
+        # Writes in progress by thread, and the threads whose bodies are being pruned
+        self._writing: Dict[str, int] = {}
+        self._pruning: Dict[str, asyncio.Event] = {}
+        self._is_setup = False
+
+        self.bodies_written = 0
+        self.bytes_written = 0
+        self.refs_written = 0
+
+    @property
+    def config_specs(self):
+        return self.saver.config_specs
+
+    async def setup(self) -> None:
+        if not self._is_setup:
+            await self.store.setup()
+            self._is_setup = True
+
+    # Encoding
+
+    def _digest(self, type_: str, body: bytes) -> str:
+        return hashlib.blake2b(type_.encode() + b"\0" + body, digest_size=16).hexdigest()
+
+    @staticmethod
+    def _message_key(message: BaseMessage) -> Optional[tuple]:
+        """
+        Key of the digest cache: the message id with its content and tool calls.
+        A message replaced under the same id (an edited tool call, say) gets a
+        new key; other fields of a stored message are not changed in place.
+        """
+        if not message.id:
+            return None
+        content = message.content
+        if not isinstance(content, str):
+            content = json.dumps(content, sort_keys=True, default=str)
+        tool_calls = getattr(message, "tool_calls", None)
+        return (
+            message.type,
+            message.id,
+            hash(content),  # a str caches its hash, so this is free for the same message object
+            json.dumps(tool_calls, sort_keys=True, default=str) if tool_calls else None,
+        )
+
+    def _encode(self, thread_id: str, checkpoint: Checkpoint) -> Tuple[Checkpoint, List[Tuple[str, str, bytes]]]:
+        """The checkpoint with digests in place of its messages, and the bodies to store"""
+        messages = checkpoint["channel_values"].get(self.channel)
+        if not isinstance(messages, list) or not all(isinstance(m, BaseMessage) for m in messages):
+            return checkpoint, []
+
+        digests, new_rows = [], []
+        for message in messages:
+            key = self._message_key(message)
+            digest = self._digests.get(key) if key is not None else None
+            if digest is not None:
+                self._digests.move_to_end(key)
+                if self._bodies.get((thread_id, digest)) is not None:
+                    digests.append(digest)
+                    continue
+            type_, body = self.serde.dumps_typed(message)
+            digest = self._digest(type_, body)
+            if key is not None:
+                self._digests[key] = digest
+                if len(self._digests) > _DIGEST_CACHE_SIZE:
+                    self._digests.popitem(last=False)
+            digests.append(digest)
+            if self._bodies.get((thread_id, digest)) is None:
+                new_rows.append((digest, type_, body))
+
+        self.refs_written += len(digests)
+        refs = {**checkpoint, "channel_values": {**checkpoint["channel_values"], self.channel: {REFS_KEY: digests}}}
+        return refs, new_rows
+
+    async def _decode(self, item: Optional[CheckpointTuple]) -> Optional[CheckpointTuple]:
+        if item is None:
+            return None
+        refs = item.checkpoint["channel_values"].get(self.channel)
+        if not isinstance(refs, dict) or REFS_KEY not in refs:
+            return item
+
+        thread_id = str(item.config["configurable"]["thread_id"])
+        digests = refs[REFS_KEY]
+        bodies, missing = {}, []
+        for digest in dict.fromkeys(digests):
+            entry = self._bodies.get((thread_id, digest))
+            if entry is None:
+                missing.append(digest)
+            else:
+                bodies[digest] = entry
+        if missing:
+            for digest, type_, body in await self.store.get(thread_id, missing):
+                bodies[digest] = (type_, body)
+                self._bodies.put((thread_id, digest), (type_, body))
+            if lost := [digest for digest in missing if digest not in bodies]:
+                raise ValueError(f"Messages {lost} of thread {thread_id} are missing from the message store")
+
+        messages = [self.serde.loads_typed(bodies[digest]) for digest in digests]
+
+        checkpoint = {**item.checkpoint, "channel_values": {**item.checkpoint["channel_values"], self.channel: messages}}
+        return item._replace(checkpoint=checkpoint)
+
+    # Async API
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        await self.setup()
+        return await self._decode(await self.saver.aget_tuple(config))
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        await self.setup()
+        async for item in self.saver.alist(config, filter=filter, before=before, limit=limit):
+            yield await self._decode(item)
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        await self.setup()
+        thread_id = str(config["configurable"]["thread_id"])
+        while (pruning := self._pruning.get(thread_id)) is not None:
+            await pruning.wait()
+        self._writing[thread_id] = self._writing.get(thread_id, 0) + 1
+        try:
+            encoded, new_rows = self._encode(thread_id, checkpoint)
+            next_config = await self.store.put_checkpoint(thread_id, new_rows, config, encoded, metadata, new_versions)
+            # Cached once stored, a later step can only skip a body that is in the store
+            for digest, type_, body in new_rows:
+                self._bodies.put((thread_id, digest), (type_, body))
+            self.bodies_written += len(new_rows)
+            self.bytes_written += sum(len(body) for _, _, body in new_rows)
+            return next_config
+        finally:
+            self._writing[thread_id] -= 1
+            if not self._writing[thread_id]:
+                del self._writing[thread_id]
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        # Pending writes only hold the messages of one step, they stay as they are
+        await self.saver.aput_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await self.setup()
+        await self.saver.adelete_thread(thread_id)
+        await self.store.delete_thread(str(thread_id))
+        self._bodies.drop_thread(str(thread_id))
+
+    async def aprune_messages(self, thread_ids: Iterable[str]) -> Tuple[int, int]:
+        """
+        Delete the bodies of these threads that no checkpoint refers to anymore,
+        once retention deleted some of their checkpoints. Returns the number of
+        bodies and bytes deleted.
+        """
+        await self.setup()
+        deleted, size = 0, 0
+        for thread_id in thread_ids:
+            count, thread_size = await self._prune_thread(str(thread_id))
+            deleted += count
+            size += thread_size
+        return deleted, size
+
+    async def _prune_thread(self, thread_id: str) -> Tuple[int, int]:
+        # New writes of the thread wait, so none of them can refer to a body
+        # (found in the cache) while it is being deleted
+        done = self._pruning[thread_id] = asyncio.Event()
+        try:
+            while self._writing.get(thread_id):
+                await asyncio.sleep(0.01)
+            referenced: Set[str] = set()
+            async for item in self.saver.alist({"configurable": {"thread_id": thread_id}}):
+                refs = item.checkpoint["channel_values"].get(self.channel)
+                if isinstance(refs, dict) and REFS_KEY in refs:
+                    referenced.update(refs[REFS_KEY])
+            unreferenced = [digest for digest in await self.store.digests(thread_id) if digest not in referenced]
+            if not unreferenced:
+                return 0, 0
+            for digest in unreferenced:
+                self._bodies.drop((thread_id, digest))
+            return await self.store.delete(thread_id, unreferenced)
+        finally:
+            del self._pruning[thread_id]
+            done.set()
+
+    def get_next_version(self, current: str | None, channel: None) -> str:
+        return self.saver.get_next_version(current, channel)
+
+    # Sync API, for calls from other threads only
+
+    def _run_sync(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        return self._run_sync(self.aget_tuple(config))
+
+    def list(self, config: RunnableConfig | None, *, filter: dict[str, Any] | None = None,
+             before: RunnableConfig | None = None, limit: int | None = None) -> Iterator[CheckpointTuple]:
+        aiter_ = self.alist(config, filter=filter, before=before, limit=limit)
+        while True:
+            try:
+                yield self._run_sync(anext(aiter_))
+            except StopAsyncIteration:
+                break
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        return self._run_sync(self.aput(config, checkpoint, metadata, new_versions))
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[tuple[str, Any]], task_id: str,
+                   task_path: str = "") -> None:
+        return self._run_sync(self.aput_writes(config, writes, task_id, task_path))
+
+    def delete_thread(self, thread_id: str) -> None:
+        return self._run_sync(self.adelete_thread(thread_id))
+
+    def stats(self) -> Dict[str, Any]:
+        inner = self.saver.stats() if hasattr(self.saver, "stats") else {}
+        return {
+            **inner,
+            "delta_messages": {
+                "bodies_written": self.bodies_written,
+                "bytes_written": self.bytes_written,
+                "refs_written": self.refs_written,
+                "cache_bytes": self._bodies.size,
+            },
+        }
@@ -0,0 +1,332 @@
+import contextvars
+import gc
+import sys
+import time
+import types
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from src.core.config import (
+    GRAPH_CACHE_MAX_ENTRIES,
+    GRAPH_CACHE_MAX_BYTES,
+    GRAPH_CACHE_TTL_SECONDS,
+    GRAPH_CACHE_REVALIDATE_SECONDS,
+    GRAPH_CACHE_DEGRADED_TTL_SECONDS,
+)
+from src.orchestrator.core.metrics import metrics
+
+# Objects shared by every graph (modules, classes, code) are not counted
+# towards the size of a single cache entry.
+_SKIP_TYPES = (type, types.ModuleType, types.BuiltinFunctionType, types.CodeType)
+
+
+def estimate_size(obj: Any, max_objects: int = 50_000) -> int:
+    """Approximate the memory retained by obj by walking its references."""
+    seen = set()
+    stack = [obj]
+    total = 0
+
+    while stack and len(seen) < max_objects:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, _SKIP_TYPES):
+            continue
+        seen.add(id(current))
+        total += sys.getsizeof(current)
+
+        if isinstance(current, types.FunctionType):
+            # Follow closures (models, tools) but not module globals
+            for cell in current.__closure__ or ():
+                try:
+                    stack.append(cell.cell_contents)
+                except ValueError:
+                    pass
+            stack.extend(current.__defaults__ or ())
+        else:
+            stack.extend(gc.get_referents(current))
+
+    return total
+
+
+@dataclass
+class BuildReport:
+    """What went wrong while building one graph, without failing the build"""
+    issues: List[str] = field(default_factory=list)
+
+    @property
+    def degraded(self) -> bool:
+        return bool(self.issues)
+
+
+# Report of the graph build in progress; tasks started by the build copy the
+# context, so they all add to the same report
+_build_report: contextvars.ContextVar[Optional[BuildReport]] = contextvars.ContextVar("build_report", default=None)
+
+
+@contextmanager
+def build_report():
+    """Collect the issues reported while building a graph in this block"""
+    report = BuildReport()
+    token = _build_report.set(report)
+    try:
+        yield report
+    finally:
+        _build_report.reset(token)
+
+
+def report_degraded(issue: str):
+    """Note that the graph being built is missing part of its config (e.g. the tools of an MCP server)"""
+    report = _build_report.get()
+    if report is not None:
+        report.issues.append(issue)
+
+
+@dataclass
+class GraphCacheEntry:
+    key: str
+    graph: Any
+    version: str
+    dependencies: Set[str] = field(default_factory=set)
+    size: int = 0
+    created_at: float = field(default_factory=time.monotonic)
+    validated_at: float = field(default_factory=time.monotonic)
+    # Overrides the cache TTL (degraded graphs)
+    ttl_seconds: Optional[float] = None
+
+
+class GraphCache:
+    """
+    LRU cache of compiled graphs bounded by entry count, approximate memory
+    and time-to-live. Entries carry the config version they were built from
+    and the ids of the records they depend on, so CRUD writes can drop them.
+
+    invalidate() only reaches the cache of the worker that made the write;
+    other workers find out through validate(), which compares the version of
+    an entry with the fingerprint of the current spec once it is older than
+    `revalidate_seconds`. The size of a graph is only measured (an object
+    walk) when `max_bytes` is set.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = GRAPH_CACHE_MAX_ENTRIES,
+        max_bytes: int = GRAPH_CACHE_MAX_BYTES,
+        ttl_seconds: float = GRAPH_CACHE_TTL_SECONDS,
+        revalidate_seconds: float = GRAPH_CACHE_REVALIDATE_SECONDS,
+        degraded_ttl_seconds: float = GRAPH_CACHE_DEGRADED_TTL_SECONDS,
+        sizeof: Callable[[Any], int] = estimate_size,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.revalidate_seconds = revalidate_seconds
+        self.degraded_ttl_seconds = degraded_ttl_seconds
+        self._sizeof = sizeof
+        self._entries: "OrderedDict[str, GraphCacheEntry]" = OrderedDict()
+        self._dependents: Dict[str, Set[str]] = {}
+        self._bytes = 0
+        # Bumped by every invalidate(); record id -> generation it was last invalidated
+        # in, kept while a build started before that is in progress
+        self.generation = 0
+        self._invalidated: Dict[str, int] = {}
+        # Generation -> builds in progress started in it
+        self._builds: Dict[int, int] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale = 0
+        self.discarded = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        key = str(key)
+        entry = self._entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if self._is_expired(entry):
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.graph
+
+    def put(self, key: str, graph: Any, version: str = "", dependencies: Iterable[str] = (),
+            since: Optional[int] = None, degraded: bool = False) -> bool:
+        """
+        Cache a graph. `since` is the generation building() gave before its
+        spec was read: a graph built from records invalidated after that is
+        stale and is not cached (returns False). A `degraded` graph is kept for
+        degraded_ttl_seconds only, or not cached when that is 0.
+        """
+        key = str(key)
+        dependencies = {str(dep) for dep in dependencies} | {key}
+        if since is not None and any(self._invalidated.get(dep, 0) > since for dep in dependencies):
+            self.discarded += 1
+            return False
+        if degraded and not self.degraded_ttl_seconds:
+            self.discarded += 1
+            return False
+
+        if key in self._entries:
+            self._remove(key)
+
+        entry = GraphCacheEntry(
+            key=key,
+            graph=graph,
+            version=version,
+            dependencies=dependencies,
+            size=self._sizeof(graph) if self.max_bytes else 0,
+            ttl_seconds=self.degraded_ttl_seconds if degraded else None,
+        )
+
+        self._entries[key] = entry
+        self._bytes += entry.size
+        for dep in entry.dependencies:
+            self._dependents.setdefault(dep, set()).add(key)
+
+        self._evict()
+        return True
+
+    @contextmanager
+    def building(self):
+        """Yield the generation to put() a graph built in this block with (`since`)"""
+        generation = self.generation
+        self._builds[generation] = self._builds.get(generation, 0) + 1
+        try:
+            yield generation
+        finally:
+            self._builds[generation] -= 1
+            if not self._builds[generation]:
+                del self._builds[generation]
+            self._prune_invalidated()
+
+    def needs_validation(self, key: str) -> bool:
+        """True when the entry was last checked against its spec longer than revalidate_seconds ago"""
+        entry = self._entries.get(str(key))
+        return (
+            entry is not None
+            and bool(self.revalidate_seconds)
+            and time.monotonic() - entry.validated_at > self.revalidate_seconds
+        )
+
+    def validate(self, key: str, version: Optional[str]) -> bool:
+        """Keep the entry if it was built from `version` (the current spec fingerprint), drop it otherwise"""
+        key = str(key)
+        entry = self._entries.get(key)
+        if entry is None:
+            return False
+        if entry.version != version:
+            self._remove(key)
+            self.stale += 1
+            return False
+        entry.validated_at = time.monotonic()
+        return True
+
+    def invalidate(self, *ids) -> int:
+        """Drop every entry built from any of the given record ids."""
+        removed = 0
+        self.generation += 1
+        for record_id in ids:
+            if self._builds:  # no build in progress can be made stale otherwise
+                self._invalidated[str(record_id)] = self.generation
+            for key in list(self._dependents.get(str(record_id), ())):
+                if key in self._entries:
+                    self._remove(key)
+                    removed += 1
+
+        self.invalidations += removed
+        return removed
+
+    def clear(self):
+        self._entries.clear()
+        self._dependents.clear()
+        self._invalidated.clear()
+        self._bytes = 0
+
+    def _prune_invalidated(self):
+        # Builds compare with generations after their own only, the oldest one in progress bounds them all
+        oldest = min(self._builds, default=self.generation)
+        for record_id in [r for r, generation in self._invalidated.items() if generation <= oldest]:
+            del self._invalidated[record_id]
+
+    def __contains__(self, key) -> bool:
+        entry = self._entries.get(str(key))
+        return entry is not None and not self._is_expired(entry)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "revalidate_seconds": self.revalidate_seconds,
+            "degraded_ttl_seconds": self.degraded_ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "stale": self.stale,
+            "discarded": self.discarded,
+            "graphs": [
+                {"id": entry.key, "version": entry.version, "bytes": entry.size,
+                 "degraded": entry.ttl_seconds is not None}
+                for entry in self._entries.values()
+            ],
+        }
+
+    def _is_expired(self, entry: GraphCacheEntry) -> bool:
+        ttl = entry.ttl_seconds if entry.ttl_seconds is not None else self.ttl_seconds
+        return bool(ttl) and time.monotonic() - entry.created_at > ttl
+
+    def _evict(self):
+        for key in [k for k, e in self._entries.items() if self._is_expired(e)]:
+            self._remove(key)
+            self.expirations += 1
+
+        # Always keep the most recent entry, even if it alone exceeds max_bytes
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries
+            or (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        for dep in entry.dependencies:
+            dependents = self._dependents.get(dep)
+            if dependents is not None:
+                dependents.discard(key)
+                if not dependents:
+                    del self._dependents[dep]
+
+
+# Process-wide cache of compiled graphs
+graph_cache = GraphCache()
+
+metrics.collected(
+    "graph_cache_lookups_total", "Compiled graph cache lookups by result", "counter", ("result",),
+    lambda: [(("hit",), graph_cache.hits), (("miss",), graph_cache.misses)],
+)
+metrics.collected(
+    "graph_cache_entries", "Compiled graphs in the cache", "gauge", (),
+    lambda: [((), len(graph_cache._entries))],
+)
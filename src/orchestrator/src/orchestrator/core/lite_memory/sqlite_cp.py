@@ -1,10 +1,10 @@
 # sqlite_cp.py
-from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from langgraph.checkpoint.base import BaseCheckpointSaver
 
 DB_PATH = "data/checkpoints.sqlite"
-saver: AsyncSqliteSaver | None = None  # global reference
+saver: BaseCheckpointSaver | None = None  # global reference (sqlite or postgres, see core.checkpointer)
 
-def set_saver(instance: AsyncSqliteSaver):
+def set_saver(instance: BaseCheckpointSaver):
     """Assign the saver once during lifespan startup."""
     global saver
     saver = instance
@@ -14,7 +14,7 @@ def clear_saver():
     global saver
     saver = None
 
-def get_saver() -> AsyncSqliteSaver:
+def get_saver() -> BaseCheckpointSaver:
     """FastAPI dependency to inject saver."""
     if saver is None:
         raise RuntimeError("Checkpointer not initialized")
@@ -0,0 +1,376 @@
+# sqlite_tuned.py
+import asyncio
+import sqlite3
+import threading
+from collections.abc import AsyncIterator, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, cast
+
+import aiosqlite
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    SerializerProtocol,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from langgraph.checkpoint.sqlite.utils import search_where
+
+from src.core.config import (
+    CHECKPOINT_SQLITE_READ_POOL_SIZE,
+    CHECKPOINT_WRITE_BATCH_MAX,
+    CHECKPOINT_WRITE_BATCH_WINDOW_MS,
+)
+
+# Writer connection. WAL is already enabled by AsyncSqliteSaver.setup();
+# in WAL mode synchronous=NORMAL only syncs at checkpoints, a commit survives a
+# crash of the process but the last commits can be lost on power failure.
+WRITER_PRAGMAS = """
+PRAGMA synchronous=NORMAL;
+PRAGMA busy_timeout=5000;
+PRAGMA cache_size=-65536;
+PRAGMA temp_store=MEMORY;
+PRAGMA mmap_size=268435456;
+"""
+
+# Read-only connections, they never take the write lock
+READER_PRAGMAS = """
+PRAGMA busy_timeout=5000;
+PRAGMA cache_size=-16384;
+PRAGMA mmap_size=268435456;
+"""
+
+_LIST_PAGE_SIZE = 100
+
+SELECT_CHECKPOINTS_SQL = (
+    "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata FROM checkpoints "
+)
+SELECT_WRITES_SQL = (
+    "SELECT task_id, channel, type, value FROM writes "
+    "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx"
+)
+
+UPSERT_CHECKPOINT_SQL = (
+    "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+UPSERT_WRITES_SQL = (
+    "INSERT OR REPLACE INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+INSERT_WRITES_SQL = (
+    "INSERT OR IGNORE INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+class TunedSqliteSaver(AsyncSqliteSaver):
+    """
+    AsyncSqliteSaver for single-node deployments under concurrent load.
+
+    - the writer runs with synchronous=NORMAL and a larger page cache
+    - aget_tuple() and alist() (aget_state, aget_state_history and the start of
+      every run) run on a pool of threads with read-only connections, so reads
+      run concurrently and don't wait behind writes; each read is one hop to a
+      thread (rows and pending writes together) instead of one per statement
+    - checkpoints and pending writes (and the message bodies of
+      DeltaMessageSaver, through submit()) are queued and committed together:
+      the writes of all tasks of a superstep, and of concurrent runs, share one
+      transaction instead of one commit (and fsync) each
+
+    Same tables as AsyncSqliteSaver, the file can be switched between the two.
+    """
+
+    def __init__(self, conn: aiosqlite.Connection, *, path: Optional[str] = None,
+                 read_pool_size: int = CHECKPOINT_SQLITE_READ_POOL_SIZE,
+                 max_batch: int = CHECKPOINT_WRITE_BATCH_MAX,
+                 window: float = CHECKPOINT_WRITE_BATCH_WINDOW_MS / 1000,
+                 serde: SerializerProtocol | None = None):
+        super().__init__(conn, serde=serde)
+        self.path = path
+        # An in-memory database can't be opened a second time
+        self.read_pool_size = read_pool_size if path and path != ":memory:" else 0
+        self.max_batch = max(1, max_batch)
+        self.window = window
+
+        self._tuned = False
+        self._read_uri: Optional[str] = None
+        self._read_executor: Optional[ThreadPoolExecutor] = None
+        self._read_local = threading.local()
+        self._reader_conns: List[sqlite3.Connection] = []
+        self._pending: List[Tuple[str, list, asyncio.Future]] = []
+        self._wakeup = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+        self._closing = False
+
+        self.commits = 0
+        self.statements = 0
+
+    @classmethod
+    @asynccontextmanager
+    async def from_conn_string(cls, conn_string: str, **kwargs) -> AsyncIterator["TunedSqliteSaver"]:
+        async with aiosqlite.connect(conn_string) as conn:
+            saver = cls(conn, path=conn_string, **kwargs)
+            try:
+                await saver.setup()
+                yield saver
+            finally:
+                await saver.aclose()
+
+    async def setup(self) -> None:
+        if self._tuned:
+            return
+        # Only takes on a new file, before its first table: checkpoint retention gives
+        # freed pages back with incremental vacuum. scripts/sqlite_incremental_vacuum.py
+        # converts an existing file.
+        async with self.conn.execute("PRAGMA auto_vacuum=INCREMENTAL"):
+            pass
+        await super().setup()
+        async with self.lock:
+            if self._tuned:
+                return
+            async with self.conn.executescript(WRITER_PRAGMAS):
+                pass
+            if self.read_pool_size:
+                self._read_uri = Path(self.path).resolve().as_uri() + "?mode=ro"
+                self._read_executor = ThreadPoolExecutor(self.read_pool_size, thread_name_prefix="sqlite-checkpoint-read")
+            self._tuned = True
+
+    async def aclose(self):
+        # The flusher commits what is queued, the batch in progress included, then returns
+        self._closing = True
+        if self._flusher is not None:
+            self._wakeup.set()
+            await self._flusher
+            self._flusher = None
+        if self._read_executor is not None:
+            self._read_executor.shutdown(wait=True)
+            self._read_executor = None
+        for conn in self._reader_conns:
+            conn.close()
+        self._reader_conns.clear()
+
+    # Reads
+
+    def _read_conn(self) -> sqlite3.Connection:
+        # One read-only connection per pool thread
+        conn = getattr(self._read_local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._read_uri, uri=True, check_same_thread=False)
+            conn.executescript(READER_PRAGMAS)
+            self._read_local.conn = conn
+            self._reader_conns.append(conn)
+        return conn
+
+    def _select(self, query: str, params: Sequence[Any]) -> list:
+        """Checkpoint rows with their pending writes, run on a pool thread"""
+        conn = self._read_conn()
+        return [
+            (row, conn.execute(SELECT_WRITES_SQL, row[:3]).fetchall())
+            for row in conn.execute(query, params).fetchall()
+        ]
+
+    async def _read(self, query: str, params: Sequence[Any]) -> List[CheckpointTuple]:
+        rows = await asyncio.get_running_loop().run_in_executor(self._read_executor, self._select, query, params)
+        return [self._row_to_tuple(row, writes) for row, writes in rows]
+
+    def _row_to_tuple(self, row: tuple, writes: list) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type_, checkpoint, metadata = row
+        return CheckpointTuple(
+            {
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            self.serde.loads_typed((type_, checkpoint)),
+            cast(CheckpointMetadata, self.jsonplus_serde.loads(metadata) if metadata is not None else {}),
+            (
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+            [
+                (task_id, channel, self.serde.loads_typed((type_, value)))
+                for task_id, channel, type_, value in writes
+            ],
+        )
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        await self.setup()
+        if not self.read_pool_size:
+            return await super().aget_tuple(config)
+        thread_id = str(config["configurable"]["thread_id"])
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        if checkpoint_id := get_checkpoint_id(config):
+            items = await self._read(
+                SELECT_CHECKPOINTS_SQL + "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                (thread_id, checkpoint_ns, checkpoint_id),
+            )
+        else:
+            items = await self._read(
+                SELECT_CHECKPOINTS_SQL + "WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1",
+                (thread_id, checkpoint_ns),
+            )
+        return items[0] if items else None
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        await self.setup()
+        if not self.read_pool_size:
+            async for item in super().alist(config, filter=filter, before=before, limit=limit):
+                yield item
+            return
+        remaining = limit or None
+        # Keyset pagination, one page per read, so large histories are read lazily
+        while remaining is None or remaining > 0:
+            page_size = min(remaining, _LIST_PAGE_SIZE) if remaining is not None else _LIST_PAGE_SIZE
+            where, params = search_where(config, filter, before)
+            items = await self._read(
+                SELECT_CHECKPOINTS_SQL + f"{where} ORDER BY checkpoint_id DESC LIMIT {page_size}",
+                params,
+            )
+            for item in items:
+                yield item
+            if len(items) < page_size:
+                return
+            before = items[-1].config
+            if remaining is not None:
+                remaining -= len(items)
+
+    # Writes
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        await self.setup()
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        type_, serialized_checkpoint = self.serde.dumps_typed(checkpoint)
+        serialized_metadata = self.jsonplus_serde.dumps(get_checkpoint_metadata(config, metadata))
+        await self.submit(UPSERT_CHECKPOINT_SQL, [(
+            str(thread_id),
+            checkpoint_ns,
+            checkpoint["id"],
+            config["configurable"].get("checkpoint_id"),
+            type_,
+            serialized_checkpoint,
+            serialized_metadata,
+        )])
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await self.setup()
+        sql = UPSERT_WRITES_SQL if all(w[0] in WRITES_IDX_MAP for w in writes) else INSERT_WRITES_SQL
+        await self.submit(sql, [
+            (
+                str(config["configurable"]["thread_id"]),
+                str(config["configurable"]["checkpoint_ns"]),
+                str(config["configurable"]["checkpoint_id"]),
+                task_id,
+                WRITES_IDX_MAP.get(channel, idx),
+                channel,
+                *self.serde.dumps_typed(value),
+            )
+            for idx, (channel, value) in enumerate(writes)
+        ])
+
+    async def submit(self, sql: str, rows: list):
+        """Run `sql` for `rows` in the next group commit, returns once it is committed"""
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_loop(), name="sqlite-checkpoint-group-commit")
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((sql, rows, future))
+        self._wakeup.set()
+        await future
+
+    async def _flush_loop(self):
+        # One writer: whatever is queued while a commit runs goes into the next one
+        while True:
+            await self._wakeup.wait()
+            if self.window > 0 and not self._closing:
+                await asyncio.sleep(self.window)
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            if not self._pending:
+                self._wakeup.clear()
+            if batch:
+                await self._commit(batch)
+            if self._closing and not self._pending:
+                return
+
+    async def _commit(self, batch: List[Tuple[str, list, asyncio.Future]]):
+        grouped: Dict[str, list] = {}
+        for sql, rows, _ in batch:
+            grouped.setdefault(sql, []).extend(rows)
+        try:
+            async with self.lock:
+                try:
+                    for sql, rows in grouped.items():
+                        async with self.conn.executemany(sql, rows):
+                            pass
+                    await self.conn.commit()
+                except Exception:
+                    await self.conn.rollback()
+                    raise
+        except Exception as e:
+            if len(batch) > 1:
+                # One bad write must not fail the others, retry them one by one
+                for item in batch:
+                    await self._commit([item])
+                return
+            if not batch[0][2].done():
+                batch[0][2].set_exception(e)
+            return
+
+        self.commits += 1
+        self.statements += len(batch)
+        for _, _, future in batch:
+            if not future.done():
+                future.set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "sqlite",
+            "profile": "tuned",
+            "read_pool_size": self.read_pool_size,
+            "read_connections": len(self._reader_conns),
+            "commits": self.commits,
+            "statements": self.statements,
+            "pending": len(self._pending),
+        }
@@ -1,3 +1,7 @@
+import hashlib
+import httpx
+from typing import Optional
+from urllib.parse import urlparse
 from langchain_openai import ChatOpenAI
 from langchain_anthropic import ChatAnthropic
 from langchain_google_genai import ChatGoogleGenerativeAI
@@ -6,6 +10,20 @@ from langchain_ollama import ChatOllama
 from langgraph.prebuilt import create_react_agent
 # from langchain.schema import SystemMessage
 from langchain.prompts import ChatPromptTemplate
+from src.core.config import (
+    LLM_CLIENT_POOL_ENABLED,
+    LLM_HTTP_MAX_CONNECTIONS,
+    LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    LLM_HTTP_KEEPALIVE_EXPIRY_SECONDS,
+    LLM_HTTP2,
+    LLM_STREAM_USAGE,
+)
+
+# Chat models shared by every agent that uses the same key, model and endpoint.
+# Models are stateless (tools are bound per agent), so one instance and its
+# HTTP connection pool can serve all of them.
+_llm_registry: dict[tuple, object] = {}
+_http_async_client: Optional[httpx.AsyncClient] = None
 
 
 def create_agent(provider: str, api_key: str, model: str, agent_name: str, system_prompt: str):
@@ -30,20 +48,123 @@ def create_agent(provider: str, api_key: str, model: str, agent_name: str, syste
     return agent
 
 
-def get_llm(provider: str, api_key: str, model: str):
+def get_llm(provider: str, api_key: str, model: str, base_url: Optional[str] = None, api_key_id: Optional[str] = None):
     """
-    Returns an LLM instance for the given provider.
+    Returns an LLM instance for the given provider, shared with every other
+    caller using the same provider, model, api key and base url.
     """
+    if not LLM_CLIENT_POOL_ENABLED:
+        return _tag_api_key(create_llm(provider, api_key, model, base_url), api_key_id)
+
+    secret_digest = hashlib.sha256((api_key or "").encode()).hexdigest()
+    key = (provider, model, str(api_key_id) if api_key_id else None, base_url or None, secret_digest)
+
+    llm = _llm_registry.get(key)
+    if llm is None:
+        llm = _tag_api_key(create_llm(provider, api_key, model, base_url, get_http_async_client()), api_key_id)
+        _llm_registry[key] = llm
+
+    return llm
+
+
+def _tag_api_key(llm, api_key_id):
+    # Callback metadata of every call, so usage is accounted to the api key
+    if api_key_id:
+        llm.metadata = {**(llm.metadata or {}), "api_key_id": str(api_key_id)}
+    return llm
+
+
+def create_llm(provider: str, api_key: str, model: str, base_url: Optional[str] = None,
+               http_async_client: Optional[httpx.AsyncClient] = None):
+    """
+    Returns a new LLM instance for the given provider.
+    """
+    base_url = _normalize_base_url(provider, base_url)
+
     if provider == "openai":
-        return ChatOpenAI(api_key=api_key, model=model, streaming=True)
+        return ChatOpenAI(api_key=api_key, model=model, streaming=True, base_url=base_url,
+                          http_async_client=http_async_client, stream_usage=LLM_STREAM_USAGE)
     elif provider == "anthropic":
-        return ChatAnthropic(api_key=api_key, model=model, streaming=True)
+        return ChatAnthropic(api_key=api_key, model=model, streaming=True, base_url=base_url)
     elif provider == "gemini" or provider == "google":
-        return ChatGoogleGenerativeAI(api_key=api_key, model=model, streaming=True)
+        client_options = {"api_endpoint": base_url} if base_url else None
+        return ChatGoogleGenerativeAI(api_key=api_key, model=model, streaming=True, client_options=client_options)
     elif provider == "groq":
-        return ChatGroq(api_key=api_key, model=model, streaming=True)
-    elif provider == "ollama":
+        return ChatGroq(api_key=api_key, model=model, streaming=True, base_url=base_url,
+                        http_async_client=http_async_client)
+    elif provider == "ollama" or provider == "ollama_chat":
         # For Ollama, assume local setup, API key not needed
-        return ChatOllama(model=model, streaming=True)
+        return ChatOllama(model=model, streaming=True, base_url=base_url,
+                          async_client_kwargs={"limits": _http_limits()})
     else:
         raise ValueError(f"Unsupported provider: {provider}")
+
+
+def invalidate_llms(api_key_id) -> int:
+    """Drop shared LLM instances created for the given api key."""
+    keys = [key for key in _llm_registry if key[2] == str(api_key_id)]
+    for key in keys:
+        del _llm_registry[key]
+    return len(keys)
+
+
+def get_http_async_client() -> httpx.AsyncClient:
+    """Process-wide HTTP client (and connection pool) for OpenAI compatible providers."""
+    global _http_async_client
+    if _http_async_client is None or _http_async_client.is_closed:
+        _http_async_client = httpx.AsyncClient(
+            limits=_http_limits(),
+            http2=LLM_HTTP2,
+            timeout=httpx.Timeout(600.0, connect=10.0),
+            follow_redirects=True,
+        )
+    return _http_async_client
+
+
+async def close_llm_clients():
+    global _http_async_client
+    _llm_registry.clear()
+    if _http_async_client is not None:
+        await _http_async_client.aclose()
+        _http_async_client = None
+
+
+def get_llm_pool_stats():
+    return {
+        "models": len(_llm_registry),
+        "providers": sorted({key[0] for key in _llm_registry}),
+        "max_connections": LLM_HTTP_MAX_CONNECTIONS,
+        "max_keepalive_connections": LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        "http2": LLM_HTTP2,
+    }
+
+
+def _http_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=LLM_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=LLM_HTTP_KEEPALIVE_EXPIRY_SECONDS,
+    )
+
+
+def _normalize_base_url(provider: str, base_url: Optional[str]) -> Optional[str]:
+    """
+    Adapt the base url stored on the api key to what each client expects.
+    Studio stores OpenAI-style urls, e.g. https://api.groq.com/openai/v1
+    """
+    if not base_url:
+        return None
+
+    base_url = base_url.strip()
+
+    if provider == "groq":
+        # Groq SDK appends /openai/v1 itself
+        return base_url.rstrip("/").removesuffix("/openai/v1") or None
+    if provider == "ollama" or provider == "ollama_chat":
+        # Ollama native API lives at the root, not the OpenAI compatible /v1
+        return base_url.rstrip("/").removesuffix("/v1") or None
+    if provider == "gemini" or provider == "google":
+        # Google client expects a host name
+        return urlparse(base_url).netloc or base_url
+
+    return base_url
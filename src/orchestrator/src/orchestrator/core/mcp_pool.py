@@ -0,0 +1,276 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional, Set
+
+from mcp import ClientSession
+from langchain_mcp_adapters.sessions import create_session
+from langchain_mcp_adapters.tools import convert_mcp_tool_to_langchain_tool
+
+from src.models.mcp_server import McpServer
+from src.core.config import (
+    MCP_MAX_CONCURRENT_CALLS,
+    MCP_HEALTH_CHECK_INTERVAL_SECONDS,
+    MCP_DISCOVERY_TIMEOUT_SECONDS,
+)
+from src.orchestrator.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class McpServerSession:
+    """
+    A long-lived, initialized MCP session to one server.
+
+    The session (and for stdio, the server process) is owned by a background
+    task, because the transport has to be entered and exited in the same task.
+    Tool calls from any task are sent through it, bounded by a semaphore.
+    """
+
+    def __init__(self, server_id: str, name: str, version: str, connection: dict,
+                 max_concurrent_calls: int = MCP_MAX_CONCURRENT_CALLS):
+        self.server_id = server_id
+        self.name = name
+        self.version = version
+        self.connection = connection
+        self.semaphore = asyncio.Semaphore(max_concurrent_calls)
+        self.max_concurrent_calls = max_concurrent_calls
+
+        self._session: Optional[ClientSession] = None
+        self._runner: Optional[asyncio.Task] = None
+        self._ready = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._error: Optional[BaseException] = None
+
+        self.started_at: Optional[float] = None
+        self.restarts = 0
+        self.calls = 0
+        self.active_calls = 0
+
+    @property
+    def alive(self) -> bool:
+        return self._session is not None and self._runner is not None and not self._runner.done()
+
+    async def get_session(self, timeout: Optional[float] = MCP_DISCOVERY_TIMEOUT_SECONDS) -> ClientSession:
+        if self.alive:
+            return self._session
+
+        async with self._lock:
+            if self.alive:
+                return self._session
+
+            if self._runner is not None:
+                await self._shutdown()
+            if self.started_at is not None:
+                self.restarts += 1
+
+            self._ready = asyncio.Event()
+            self._stop = asyncio.Event()
+            self._error = None
+            self._runner = asyncio.create_task(self._run(), name=f"mcp-session-{self.name}")
+
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                await self._shutdown()
+                raise
+
+            if self._session is None:
+                raise self._error or RuntimeError(f"MCP server {self.name} session closed")
+
+            self.started_at = time.monotonic()
+            return self._session
+
+    async def _run(self):
+        try:
+            async with create_session(self.connection) as session:
+                await session.initialize()
+                self._session = session
+                self._ready.set()
+                await self._stop.wait()
+        except Exception as e:
+            self._error = e
+            logger.warning("MCP server %s session ended: %r", self.name, e)
+        finally:
+            self._session = None
+            self._ready.set()
+
+    async def _shutdown(self):
+        self._stop.set()
+        runner, self._runner = self._runner, None
+        if runner is not None and not runner.done():
+            try:
+                await asyncio.wait_for(runner, 5)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                pass
+        self._session = None
+
+    async def list_tools(self) -> list:
+        session = await self.get_session()
+        tools = []
+        cursor = None
+        while True:
+            page = await session.list_tools(cursor=cursor)
+            tools.extend(page.tools)
+            cursor = page.nextCursor
+            if not cursor:
+                return tools
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any] | None = None):
+        async with self.semaphore:
+            session = await self.get_session()
+            self.calls += 1
+            self.active_calls += 1
+            try:
+                return await session.call_tool(name, arguments)
+            finally:
+                self.active_calls -= 1
+
+    async def health_check(self, timeout: float = 10) -> bool:
+        """Ping a started session; a dead or unresponsive one is restarted."""
+        if self.started_at is None:
+            return True  # never used, nothing to keep warm
+
+        try:
+            session = await self.get_session()
+            await asyncio.wait_for(session.send_ping(), timeout)
+            return True
+        except Exception as e:
+            logger.warning("MCP server %s failed health check: %r", self.name, e)
+
+        async with self._lock:
+            await self._shutdown()
+        try:
+            await self.get_session()
+        except Exception as e:
+            logger.warning("MCP server %s restart failed: %r", self.name, e)
+        return False
+
+    async def close(self):
+        async with self._lock:
+            await self._shutdown()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "server_id": self.server_id,
+            "name": self.name,
+            "transport": self.connection.get("transport"),
+            "alive": self.alive,
+            "uptime_seconds": time.monotonic() - self.started_at if self.alive and self.started_at else 0,
+            "restarts": self.restarts,
+            "calls": self.calls,
+            "active_calls": self.active_calls,
+            "max_concurrent_calls": self.max_concurrent_calls,
+        }
+
+
+class _PooledToolSession:
+    """Routes tool calls to whichever session the pool currently holds for a server."""
+
+    def __init__(self, pool: "McpSessionPool", server_id: str):
+        self._pool = pool
+        self._server_id = server_id
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any] | None = None):
+        server_session = self._pool.sessions.get(self._server_id)
+        if server_session is None:
+            raise RuntimeError(f"MCP server {self._server_id} is no longer available")
+        return await server_session.call_tool(name, arguments)
+
+
+class McpSessionPool:
+    """Warm MCP sessions keyed by McpServer id, shared by every agent that uses the server."""
+
+    def __init__(self, max_concurrent_calls: int = MCP_MAX_CONCURRENT_CALLS):
+        self.max_concurrent_calls = max_concurrent_calls
+        self.sessions: Dict[str, McpServerSession] = {}
+        self._health_task: Optional[asyncio.Task] = None
+        # Replaced sessions still closing, awaited on close()
+        self._closing: Set[asyncio.Task] = set()
+
+    def get(self, mcp: McpServer) -> McpServerSession:
+        key = str(mcp.id)
+        version = str(mcp.modified_at)
+
+        server_session = self.sessions.get(key)
+        if server_session is not None and server_session.version == version:
+            return server_session
+
+        if server_session is not None:
+            # Server config changed, the old session is replaced
+            task = asyncio.create_task(self._close_replaced(server_session), name=f"mcp-session-close-{mcp.name}")
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+
+        server_session = McpServerSession(
+            server_id=key,
+            name=mcp.name,
+            version=version,
+            connection={**mcp.config_json, "transport": mcp.transport},
+            max_concurrent_calls=self.max_concurrent_calls,
+        )
+        self.sessions[key] = server_session
+        return server_session
+
+    async def _close_replaced(self, server_session: McpServerSession):
+        try:
+            await server_session.close()
+        except Exception:
+            logger.exception("Closing the replaced session of MCP server %s failed", server_session.name)
+
+    async def get_tools(self, mcp: McpServer) -> list:
+        server_session = self.get(mcp)
+        mcp_tools = await server_session.list_tools()
+        proxy = _PooledToolSession(self, server_session.server_id)
+        return [convert_mcp_tool_to_langchain_tool(proxy, tool) for tool in mcp_tools]
+
+    async def remove(self, server_id) -> None:
+        server_session = self.sessions.pop(str(server_id), None)
+        if server_session is not None:
+            await server_session.close()
+
+    async def health_check(self):
+        await asyncio.gather(
+            *[s.health_check() for s in list(self.sessions.values())],
+            return_exceptions=True
+        )
+
+    async def _health_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            await self.health_check()
+
+    def start(self, interval: float = MCP_HEALTH_CHECK_INTERVAL_SECONDS):
+        if self._health_task is None and interval > 0:
+            self._health_task = asyncio.create_task(self._health_loop(interval), name="mcp-health-check")
+
+    async def close(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        sessions, self.sessions = list(self.sessions.values()), {}
+        await asyncio.gather(*[s.close() for s in sessions], *self._closing, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self.sessions),
+            "alive": sum(1 for s in self.sessions.values() if s.alive),
+            "servers": [s.stats() for s in self.sessions.values()],
+        }
+
+
+# Process-wide MCP session pool
+mcp_pool = McpSessionPool()
+
+metrics.collected(
+    "mcp_sessions_open", "Pooled MCP sessions by state", "gauge", ("state",),
+    lambda: [
+        (("alive",), sum(1 for s in mcp_pool.sessions.values() if s.alive)),
+        (("down",), sum(1 for s in mcp_pool.sessions.values() if not s.alive)),
+    ],
+)
+metrics.collected(
+    "mcp_tool_calls_in_flight", "MCP tool calls in progress on pooled sessions", "gauge", (),
+    lambda: [((), sum(s.active_calls for s in mcp_pool.sessions.values()))],
+)
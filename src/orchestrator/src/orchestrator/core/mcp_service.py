@@ -1,29 +1,46 @@
+import asyncio
+import logging
 from src.models.mcp_server import McpServer
-#from fastapi import HTTPException
-from typing import List, Optional
+from src.orchestrator.core.assistant_spec import McpServerSpec
+from fastapi import HTTPException
+from typing import List, Optional, Union
 from src.orchestrator.helpers.hitl import add_human_in_the_loop
+from src.orchestrator.core.mcp_pool import mcp_pool
+from src.orchestrator.core.graph_cache import report_degraded
+from src.orchestrator.core.tracing import tracer
+from src.core.config import MCP_DISCOVERY_TIMEOUT_SECONDS, MCP_SESSION_POOL_ENABLED
 
 from langchain_mcp_adapters.client import MultiServerMCPClient
 
+logger = logging.getLogger(__name__)
 
-async def get_mcp_servers_tools(mcps: List[McpServer]):
 
-    hitl_tools = []
+# Discovered tools per McpServer id, tagged with the modified_at they were loaded for.
+# Tools call through the session pool (or open their own session per call when the
+# pool is disabled), so they can be shared between graphs.
+tools_cache: dict[str, tuple[str, list]] = {}
 
-    for mcp in mcps:
-        mcp_json = {
-            mcp.mcp_server.name: {
-                **mcp.mcp_server.config_json,
-                "transport": mcp.mcp_server.transport
-            }
-        }
 
-        client = MultiServerMCPClient(mcp_json)
+async def get_mcp_servers_tools(servers: List[McpServerSpec]):
 
-        tools = await client.get_tools()
+    with tracer.span("mcp.discover", {"mcp.servers": len(servers)}) as span:
+        results = await asyncio.gather(
+            *[get_server_tools(server) for server in servers],
+            return_exceptions=True
+        )
+        span.set_attribute("mcp.servers.failed", sum(isinstance(tools, BaseException) for tools in results))
+
+    hitl_tools = []
+
+    for server, tools in zip(servers, results):
+        if isinstance(tools, BaseException):
+            logger.warning("MCP server %s skipped: %r", server.name, tools)
+            # The graph is built without its tools: cached briefly, so it is rebuilt once the server is back
+            report_degraded(f"MCP server {server.name}: {tools!r}")
+            continue
 
         for tool in tools:
-            if mcp.mcp_server.mode == 'supervised':
+            if server.mode == 'supervised':
                 hitl_tool = add_human_in_the_loop(tool)
                 hitl_tools.append(hitl_tool)
             else:
@@ -32,22 +49,54 @@ async def get_mcp_servers_tools(mcps: List[McpServer]):
     return hitl_tools
 
 
+async def get_server_tools(mcp: Union[McpServer, McpServerSpec], timeout: Optional[float] = MCP_DISCOVERY_TIMEOUT_SECONDS):
+    """
+    Returns the tools exposed by an MCP server, discovering them only when the
+    server config changed since the last discovery.
+    """
+    key = str(mcp.id)
+    version = str(mcp.modified_at)
+
+    cached = tools_cache.get(key)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    with tracer.span("mcp.list_tools", {"mcp.server.id": key, "mcp.server.name": mcp.name,
+                                        "mcp.transport": mcp.transport}) as span:
+        if MCP_SESSION_POOL_ENABLED:
+            tools = await asyncio.wait_for(mcp_pool.get_tools(mcp), timeout)
+        else:
+            mcp_json = {
+                mcp.name: {
+                    **mcp.config_json,
+                    "transport": mcp.transport
+                }
+            }
+
+            client = MultiServerMCPClient(mcp_json)
+
+            tools = await asyncio.wait_for(client.get_tools(), timeout)
+        span.set_attribute("mcp.tools", len(tools))
+
+    tools_cache[key] = (version, tools)
+
+    return tools
+
+
+async def invalidate_server_tools(server_id) -> None:
+    tools_cache.pop(str(server_id), None)
+    await mcp_pool.remove(server_id)
+
+
 async def get_mcp_server_tools_info(mcp: McpServer):
 
     if not mcp:
         raise HTTPException(status_code=404, detail="McpServer not found")
-    
-    # Construct the new JSON structure
-    result_json = {
-        mcp.name: {
-            **mcp.config_json,  # Unpacks existing keys (command and args)
-            "transport": "stdio"  # Adds the required transport field
-        }
-    }
-
-    client = MultiServerMCPClient(result_json)
 
-    tools = await client.get_tools()
+    try:
+        tools = await get_server_tools(mcp)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"McpServer {mcp.name} did not respond in time")
 
     result = await get_tools_info(tools)
 
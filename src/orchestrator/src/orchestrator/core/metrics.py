@@ -0,0 +1,252 @@
+import logging
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds, from a cached graph lookup to a long agent run
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[Any], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    Monotonic count per label values. Updated from the event loop only, so a
+    dict lookup and an add, no lock.
+    """
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram:
+    """
+    Distribution of observed values per label values, in fixed buckets. Each
+    observation bumps one bucket; the cumulative counts are computed at scrape time.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label values: one count per bucket plus +Inf, then sum
+        self._series: Dict[Labels, List[float]] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def samples(self) -> Iterable[str]:
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            label_text = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_text} {_format_value(series[-1])}"
+            yield f"{self.name}_count{label_text} {cumulative}"
+
+
+class Collected:
+    """Gauge or counter read from another component's stats at scrape time (no hot path cost)"""
+
+    def __init__(self, name: str, documentation: str, type: str, labelnames: Sequence[str],
+                 collect: Callable[[], Iterable[Tuple[Labels, float]]]):
+        self.name = name
+        self.documentation = documentation
+        self.type = type
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in self.collect():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class MetricsRegistry:
+    """Metrics of this worker, rendered in the Prometheus text format (GET /metrics)"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def collected(self, name: str, documentation: str, type: str, labelnames: Sequence[str],
+                  collect: Callable[[], Iterable[Tuple[Labels, float]]]) -> Collected:
+        return self._register(Collected(name, documentation, type, labelnames, collect))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            try:
+                samples = list(metric.samples())
+            except Exception as e:
+                # A failing collector must not hide the other metrics
+                logger.warning("Metric %s not collected: %r", metric.name, e)
+                continue
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide metrics registry
+metrics = MetricsRegistry()
+
+http_requests = metrics.counter(
+    "http_requests_total", "HTTP requests by route template and status", ("method", "route", "status"))
+http_request_duration = metrics.histogram(
+    "http_request_duration_seconds", "Time until the response is fully sent", ("method", "route"))
+stream_first_event = metrics.histogram(
+    "chat_stream_first_event_seconds", "Time until the first body chunk of a streaming response", ("route",))
+stream_duration = metrics.histogram(
+    "chat_stream_duration_seconds", "Total duration of streaming responses", ("route",))
+
+runs = metrics.counter(
+    "chat_runs_total", "Finished runs by assistant and status", ("assistant_id", "status"))
+run_queue_delay = metrics.histogram(
+    "chat_run_queue_seconds", "Time runs waited for a slot before starting", ("background",))
+run_first_token = metrics.histogram(
+    "chat_run_first_token_seconds", "Time from run start to the first streamed message", ("assistant_id",))
+stream_messages = metrics.counter(
+    "chat_stream_messages_total", "Message chunks streamed to clients", ("assistant_id",))
+llm_chunks = metrics.counter(
+    "llm_stream_chunks_total", "LLM message chunks streamed, by provider and model", ("provider", "model"))
+llm_tokens = metrics.counter(
+    "llm_tokens_total", "LLM tokens reported in usage metadata, by provider and model",
+    ("provider", "model", "type"))
+
+checkpoint_writes = metrics.histogram(
+    "checkpoint_write_seconds", "Checkpointer write latency", ("operation",),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+
+
+def record_message(assistant_id: str, message: Any, metadata: Optional[Dict[str, Any]]):
+    """Counts one streamed message chunk, and the tokens of the chunk carrying usage"""
+    stream_messages.inc(assistant_id)
+    if metadata is None:
+        return
+    provider = metadata.get("ls_provider") or "unknown"
+    model = metadata.get("ls_model_name") or "unknown"
+    llm_chunks.inc(provider, model)
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        llm_tokens.inc(provider, model, "input", amount=usage.get("input_tokens", 0))
+        llm_tokens.inc(provider, model, "output", amount=usage.get("output_tokens", 0))
+
+
+def instrument_checkpointer(checkpointer):
+    """Time the writes of a checkpoint saver (checkpoint_write_seconds)"""
+    for operation in ("aput", "aput_writes"):
+        write = getattr(checkpointer, operation)
+
+        async def timed(*args, _write=write, _operation=operation, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await _write(*args, **kwargs)
+            finally:
+                checkpoint_writes.observe(time.perf_counter() - start, _operation)
+
+        setattr(checkpointer, operation, timed)
+    return checkpointer
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording HTTP request counts and durations by route template.
+    Streaming responses (SSE, NDJSON) also get their time to first body chunk
+    and total duration. Plain ASGI, so response bodies are passed through as is.
+    """
+
+    STREAMING_TYPES = (b"text/event-stream", b"application/x-ndjson")
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        state = {"status": 500, "streaming": False, "first": None}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+                for key, value in message.get("headers", ()):
+                    if key == b"content-type" and value.startswith(self.STREAMING_TYPES):
+                        state["streaming"] = True
+            elif message["type"] == "http.response.body" and state["first"] is None and message.get("body"):
+                state["first"] = time.perf_counter()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            http_requests.inc(scope["method"], path, str(state["status"]))
+            http_request_duration.observe(elapsed, scope["method"], path)
+            if state["streaming"]:
+                stream_duration.observe(elapsed, path)
+                if state["first"] is not None:
+                    stream_first_event.observe(state["first"] - start, path)
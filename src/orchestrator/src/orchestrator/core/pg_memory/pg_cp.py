@@ -0,0 +1,469 @@
+# pg_cp.py
+import asyncio
+import json
+import random
+from collections.abc import AsyncIterator, Iterator, Sequence
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Tuple, cast
+
+import asyncpg
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    SerializerProtocol,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from src.core.config import (
+    CHECKPOINT_PG_SCHEMA,
+    CHECKPOINT_PG_POOL_MIN_SIZE,
+    CHECKPOINT_PG_POOL_MAX_SIZE,
+    CHECKPOINT_WRITE_BATCH_MAX,
+    CHECKPOINT_WRITE_BATCH_WINDOW_MS,
+)
+
+# Rows per round trip when alist() has no limit
+_LIST_PAGE_SIZE = 100
+
+SETUP_SQL = """
+CREATE SCHEMA IF NOT EXISTS {schema};
+CREATE TABLE IF NOT EXISTS {schema}.checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BYTEA,
+    metadata JSONB NOT NULL DEFAULT '{{}}',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS {schema}.writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BYTEA,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+
+# Checkpoint rows with their pending writes aggregated, in one round trip
+SELECT_SQL = """
+SELECT c.thread_id, c.checkpoint_ns, c.checkpoint_id, c.parent_checkpoint_id, c.type, c.checkpoint, c.metadata,
+       w.task_ids, w.channels, w.types, w.write_values
+FROM {schema}.checkpoints c
+LEFT JOIN LATERAL (
+    SELECT array_agg(task_id ORDER BY task_id, idx) AS task_ids,
+           array_agg(channel ORDER BY task_id, idx) AS channels,
+           array_agg(type ORDER BY task_id, idx) AS types,
+           array_agg(value ORDER BY task_id, idx) AS write_values
+    FROM {schema}.writes
+    WHERE thread_id = c.thread_id AND checkpoint_ns = c.checkpoint_ns AND checkpoint_id = c.checkpoint_id
+) w ON true
+"""
+
+UPSERT_CHECKPOINT_SQL = """
+INSERT INTO {schema}.checkpoints (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata)
+VALUES ($1, $2, $3, $4, $5, $6, $7::jsonb)
+ON CONFLICT (thread_id, checkpoint_ns, checkpoint_id)
+DO UPDATE SET parent_checkpoint_id = EXCLUDED.parent_checkpoint_id, type = EXCLUDED.type,
+              checkpoint = EXCLUDED.checkpoint, metadata = EXCLUDED.metadata
+"""
+
+UPSERT_WRITES_SQL = """
+INSERT INTO {schema}.writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value)
+VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+ON CONFLICT (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+DO UPDATE SET channel = EXCLUDED.channel, type = EXCLUDED.type, value = EXCLUDED.value
+"""
+
+INSERT_WRITES_SQL = """
+INSERT INTO {schema}.writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value)
+VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+ON CONFLICT (thread_id, checkpoint_ns, checkpoint_id, task_id, idx) DO NOTHING
+"""
+
+
+class WriteBatcher:
+    """
+    Group commit for checkpoint writes.
+
+    Callers queue their rows and wait; a flusher writes everything queued so far
+    in one transaction (one executemany per statement) and wakes them up. Under
+    load many runs share one commit, when idle a write is flushed right away.
+    Statements queued by one submit() are always committed together.
+    """
+
+    def __init__(self, pool: asyncpg.Pool, max_batch: int = CHECKPOINT_WRITE_BATCH_MAX,
+                 window: float = CHECKPOINT_WRITE_BATCH_WINDOW_MS / 1000, max_inflight: int = 4):
+        self.pool = pool
+        self.max_batch = max(1, max_batch)
+        self.window = window
+        self._pending: List[Tuple[List[Tuple[str, list]], asyncio.Future]] = []
+        self._wakeup = asyncio.Event()
+        self._inflight = asyncio.Semaphore(max_inflight)
+        self._flushes: set[asyncio.Task] = set()
+        self._task: Optional[asyncio.Task] = None
+
+        self.batches = 0
+        self.statements = 0
+
+    async def submit(self, sql: str, rows: list, *, before: Sequence[Tuple[str, list]] = ()):
+        """Queue rows of a statement, after the `before` statements, and wait for their commit"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="checkpoint-write-batcher")
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(([*before, (sql, rows)], future))
+        self._wakeup.set()
+        await future
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            if self.window > 0:
+                await asyncio.sleep(self.window)  # let concurrent runs join the batch
+            await self._inflight.acquire()
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            if not self._pending:
+                self._wakeup.clear()
+            if not batch:
+                self._inflight.release()
+                continue
+            task = asyncio.create_task(self._flush(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: List[Tuple[List[Tuple[str, list]], asyncio.Future]]):
+        try:
+            await self._write(batch)
+        finally:
+            self._inflight.release()
+
+    async def _write(self, batch: List[Tuple[List[Tuple[str, list]], asyncio.Future]]):
+        # Rows of the same statement share one executemany, statements run in the order first queued
+        grouped: Dict[str, list] = {}
+        for statements, _ in batch:
+            for sql, rows in statements:
+                grouped.setdefault(sql, []).extend(rows)
+        try:
+            async with self.pool.acquire() as conn, conn.transaction():
+                for sql, rows in grouped.items():
+                    await conn.executemany(sql, rows)
+        except Exception as e:
+            if len(batch) > 1:
+                # One bad write must not fail the others, retry them one by one
+                for item in batch:
+                    await self._write([item])
+                return
+            if not batch[0][1].done():
+                batch[0][1].set_exception(e)
+            return
+
+        self.batches += 1
+        self.statements += len(batch)
+        for _, future in batch:
+            if not future.done():
+                future.set_result(None)
+
+    async def close(self):
+        while self._pending or self._flushes:
+            await asyncio.sleep(0.01)
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"batches": self.batches, "statements": self.statements, "pending": len(self._pending)}
+
+
+class AsyncPostgresSaver(BaseCheckpointSaver[str]):
+    """
+    Checkpoint saver on a pooled asyncpg connection to Postgres.
+
+    Uses the table layout of AsyncSqliteSaver (with metadata as JSONB), so the
+    SQLite file can be copied over as is (scripts/migrate_checkpoints.py).
+    Reads take a pooled connection each and run concurrently; checkpoint and
+    pending writes go through a WriteBatcher (group commit). aput() can commit
+    other rows in the transaction of the checkpoint row (the message bodies of
+    DeltaMessageSaver).
+    """
+
+    def __init__(self, pool: asyncpg.Pool, *, schema: str = CHECKPOINT_PG_SCHEMA,
+                 serde: SerializerProtocol | None = None):
+        super().__init__(serde=serde)
+        self.jsonplus_serde = JsonPlusSerializer()
+        self.pool = pool
+        self.schema = schema
+        self.batcher = WriteBatcher(pool)
+        self.loop = asyncio.get_running_loop()
+        self.lock = asyncio.Lock()
+        self.is_setup = False
+
+        self._select_sql = SELECT_SQL.format(schema=schema)
+        self._upsert_checkpoint_sql = UPSERT_CHECKPOINT_SQL.format(schema=schema)
+        self._upsert_writes_sql = UPSERT_WRITES_SQL.format(schema=schema)
+        self._insert_writes_sql = INSERT_WRITES_SQL.format(schema=schema)
+
+    @classmethod
+    @asynccontextmanager
+    async def from_conn_string(cls, conn_string: str, **kwargs) -> AsyncIterator["AsyncPostgresSaver"]:
+        pool = await asyncpg.create_pool(
+            conn_string,
+            min_size=CHECKPOINT_PG_POOL_MIN_SIZE,
+            max_size=CHECKPOINT_PG_POOL_MAX_SIZE,
+        )
+        saver = cls(pool, **kwargs)
+        try:
+            await saver.setup()
+            yield saver
+        finally:
+            await saver.batcher.close()
+            await pool.close()
+
+    async def setup(self) -> None:
+        async with self.lock:
+            if self.is_setup:
+                return
+            async with self.pool.acquire() as conn, conn.transaction():
+                # Serialize concurrent setups from several workers
+                await conn.execute("SELECT pg_advisory_xact_lock(hashtext('fustatai_checkpoints_setup'))")
+                await conn.execute(SETUP_SQL.format(schema=self.schema))
+            self.is_setup = True
+
+    # Reads
+
+    def _row_to_tuple(self, row) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id = row["thread_id"], row["checkpoint_ns"], row["checkpoint_id"]
+        # array_agg over no pending writes is NULL
+        writes = zip(row["task_ids"], row["channels"], row["types"], row["write_values"]) if row["task_ids"] else ()
+        return CheckpointTuple(
+            {
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            self.serde.loads_typed((row["type"], row["checkpoint"])),
+            cast(CheckpointMetadata, self.jsonplus_serde.loads(row["metadata"].encode()) if row["metadata"] else {}),
+            (
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": row["parent_checkpoint_id"],
+                    }
+                }
+                if row["parent_checkpoint_id"]
+                else None
+            ),
+            [
+                (task_id, channel, self.serde.loads_typed((type_, value)))
+                for task_id, channel, type_, value in writes
+            ],
+        )
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        thread_id = str(config["configurable"]["thread_id"])
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        async with self.pool.acquire() as conn:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = await conn.fetchrow(
+                    self._select_sql + "WHERE c.thread_id = $1 AND c.checkpoint_ns = $2 AND c.checkpoint_id = $3",
+                    thread_id, checkpoint_ns, checkpoint_id,
+                )
+            else:
+                row = await conn.fetchrow(
+                    self._select_sql + "WHERE c.thread_id = $1 AND c.checkpoint_ns = $2 ORDER BY c.checkpoint_id DESC LIMIT 1",
+                    thread_id, checkpoint_ns,
+                )
+        return self._row_to_tuple(row) if row else None
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        conditions, params = [], []
+        if config:
+            params.append(str(config["configurable"]["thread_id"]))
+            conditions.append(f"c.thread_id = ${len(params)}")
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                params.append(checkpoint_ns)
+                conditions.append(f"c.checkpoint_ns = ${len(params)}")
+            if checkpoint_id := get_checkpoint_id(config):
+                params.append(checkpoint_id)
+                conditions.append(f"c.checkpoint_id = ${len(params)}")
+        if filter:
+            params.append(json.dumps(filter))
+            conditions.append(f"c.metadata @> ${len(params)}::jsonb")
+
+        before_id = get_checkpoint_id(before) if before else None
+        remaining = limit
+        # Keyset pagination, one page per round trip, so large histories are read lazily
+        while remaining is None or remaining > 0:
+            page_size = min(remaining, _LIST_PAGE_SIZE) if remaining is not None else _LIST_PAGE_SIZE
+            page_conditions, page_params = list(conditions), list(params)
+            if before_id:
+                page_params.append(before_id)
+                page_conditions.append(f"c.checkpoint_id < ${len(page_params)}")
+            where = f"WHERE {' AND '.join(page_conditions)} " if page_conditions else ""
+            async with self.pool.acquire() as conn:
+                rows = await conn.fetch(
+                    self._select_sql + where + f"ORDER BY c.checkpoint_id DESC LIMIT {page_size}",
+                    *page_params,
+                )
+            for row in rows:
+                yield self._row_to_tuple(row)
+            if len(rows) < page_size:
+                return
+            before_id = rows[-1]["checkpoint_id"]
+            if remaining is not None:
+                remaining -= len(rows)
+
+    # Writes
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+        *,
+        before: Sequence[Tuple[str, list]] = (),
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        type_, serialized_checkpoint = self.serde.dumps_typed(checkpoint)
+        serialized_metadata = self.jsonplus_serde.dumps(strip_nul(get_checkpoint_metadata(config, metadata)))
+        # `before` statements are committed with the checkpoint row, or neither is
+        await self.batcher.submit(self._upsert_checkpoint_sql, [(
+            str(thread_id),
+            checkpoint_ns,
+            checkpoint["id"],
+            config["configurable"].get("checkpoint_id"),
+            type_,
+            serialized_checkpoint,
+            serialized_metadata.decode(),
+        )], before=before)
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        sql = (
+            self._upsert_writes_sql
+            if all(w[0] in WRITES_IDX_MAP for w in writes)
+            else self._insert_writes_sql
+        )
+        await self.batcher.submit(sql, [
+            (
+                str(config["configurable"]["thread_id"]),
+                str(config["configurable"]["checkpoint_ns"]),
+                str(config["configurable"]["checkpoint_id"]),
+                task_id,
+                WRITES_IDX_MAP.get(channel, idx),
+                channel,
+                *self.serde.dumps_typed(value),
+            )
+            for idx, (channel, value) in enumerate(writes)
+        ])
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        async with self.pool.acquire() as conn, conn.transaction():
+            await conn.execute(f"DELETE FROM {self.schema}.checkpoints WHERE thread_id = $1", str(thread_id))
+            await conn.execute(f"DELETE FROM {self.schema}.writes WHERE thread_id = $1", str(thread_id))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "postgres",
+            "pool_size": self.pool.get_size(),
+            "pool_idle": self.pool.get_idle_size(),
+            **self.batcher.stats(),
+        }
+
+    def get_next_version(self, current: str | None, channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        next_v = current_v + 1
+        next_h = random.random()
+        return f"{next_v:032}.{next_h:016}"
+
+    # Sync API, for calls from other threads only
+
+    def _run_sync(self, coro):
+        try:
+            if asyncio.get_running_loop() is self.loop:
+                raise asyncio.InvalidStateError(
+                    "Synchronous calls to AsyncPostgresSaver are only allowed from a different thread. "
+                    "From the main thread, use the async interface."
+                )
+        except RuntimeError:
+            pass
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        return self._run_sync(self.aget_tuple(config))
+
+    def list(self, config: RunnableConfig | None, *, filter: dict[str, Any] | None = None,
+             before: RunnableConfig | None = None, limit: int | None = None) -> Iterator[CheckpointTuple]:
+        aiter_ = self.alist(config, filter=filter, before=before, limit=limit)
+        while True:
+            try:
+                yield self._run_sync(anext(aiter_))
+            except StopAsyncIteration:
+                break
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        return self._run_sync(self.aput(config, checkpoint, metadata, new_versions))
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[tuple[str, Any]], task_id: str,
+                   task_path: str = "") -> None:
+        return self._run_sync(self.aput_writes(config, writes, task_id, task_path))
+
+    def delete_thread(self, thread_id: str) -> None:
+        return self._run_sync(self.adelete_thread(thread_id))
+
+
+def strip_nul(value: Any) -> Any:
+    """
+    Drop NUL characters from the strings (keys included) of a JSON-like value.
+    Postgres jsonb can't hold them, so they go before the value is encoded.
+    """
+    if isinstance(value, str):
+        return value.replace("\x00", "")
+    if isinstance(value, dict):
+        return {strip_nul(key): strip_nul(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [strip_nul(item) for item in value]
+    if type(value) is tuple:
+        return tuple(strip_nul(item) for item in value)
+    return value
@@ -0,0 +1,273 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from src.core.config import (
+    RUN_MAX_CONCURRENT,
+    RUN_MAX_CONCURRENT_PER_ASSISTANT,
+    RUN_MAX_QUEUED,
+    RUN_HISTORY_MAX_ENTRIES,
+    RUN_BACKGROUND_WORKERS,
+    RUN_BACKGROUND_MAX_QUEUED,
+)
+from src.core.log import log_context
+from src.orchestrator.core.metrics import metrics, runs, run_queue_delay
+
+logger = logging.getLogger(__name__)
+
+
+class RunQueueFull(Exception):
+    """Raised when a run can't be queued because its queue is full"""
+
+
+class Run:
+    """One graph run, from queued to done"""
+
+    def __init__(self, run_id: str, thread_id: Optional[str], assistant_id: str,
+                 metadata: Optional[Dict[str, Any]] = None):
+        self.run_id = run_id
+        self.thread_id = thread_id
+        self.assistant_id = assistant_id
+        self.metadata = metadata or {}
+        self.status = "pending"
+        self.error: Optional[str] = None
+        self.created_at = datetime.now(timezone.utc)
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.background = False
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("success", "error", "interrupted")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "run_id": self.run_id,
+            "thread_id": self.thread_id,
+            "assistant_id": self.assistant_id,
+            "status": self.status,
+            "background": self.background,
+            "error": self.error,
+            "metadata": self.metadata,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class RunManager:
+    """
+    Registry of the runs of this worker, each executed as an asyncio task.
+
+    A run waits (status "pending") for a slot of its assistant and then a global
+    slot, in arrival order; at most `max_queued` runs wait at a time. Background
+    runs (no client attached) first wait for one of `background_workers` worker
+    slots, in a queue of their own of up to `max_background_queued` runs, so
+    offline jobs can't take all the slots of interactive streams. Runs can be
+    cancelled by id or by thread. Finished runs are kept for status lookups, up
+    to `history` of them. Limits of 0 mean unlimited.
+    """
+
+    def __init__(self, max_concurrent: int = RUN_MAX_CONCURRENT,
+                 max_per_assistant: int = RUN_MAX_CONCURRENT_PER_ASSISTANT,
+                 max_queued: int = RUN_MAX_QUEUED, history: int = RUN_HISTORY_MAX_ENTRIES,
+                 background_workers: int = RUN_BACKGROUND_WORKERS,
+                 max_background_queued: int = RUN_BACKGROUND_MAX_QUEUED):
+        self.max_concurrent = max_concurrent
+        self.max_per_assistant = max_per_assistant
+        self.max_queued = max_queued
+        self.history = history
+        self.background_workers = background_workers
+        self.max_background_queued = max_background_queued
+
+        self._slots = asyncio.Semaphore(max_concurrent) if max_concurrent > 0 else None
+        self._workers = asyncio.Semaphore(background_workers) if background_workers > 0 else None
+        # Only for assistants with runs holding or waiting for a slot
+        self._assistant_slots: Dict[str, asyncio.Semaphore] = {}
+        self._assistant_runs: Dict[str, int] = {}
+        self.active: Dict[str, Run] = {}
+        self._finished: OrderedDict[str, Run] = OrderedDict()
+        self.queued = 0
+        self.background_queued = 0
+
+        self.started = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.rejected = 0
+
+    @asynccontextmanager
+    async def _admit(self, assistant_id: str):
+        # Assistant slot first, so a run waiting on its assistant doesn't hold a global slot
+        assistant_slots = None
+        if self.max_per_assistant > 0:
+            assistant_slots = self._assistant_slots.setdefault(
+                assistant_id, asyncio.Semaphore(self.max_per_assistant)
+            )
+            self._assistant_runs[assistant_id] = self._assistant_runs.get(assistant_id, 0) + 1
+        try:
+            if assistant_slots is not None:
+                await assistant_slots.acquire()
+            try:
+                if self._slots is not None:
+                    await self._slots.acquire()
+                try:
+                    yield
+                finally:
+                    if self._slots is not None:
+                        self._slots.release()
+            finally:
+                if assistant_slots is not None:
+                    assistant_slots.release()
+        finally:
+            if assistant_slots is not None:
+                self._leave_assistant(assistant_id)
+
+    def _leave_assistant(self, assistant_id: str):
+        # The last run of the assistant is over: its semaphore is idle, drop it
+        self._assistant_runs[assistant_id] -= 1
+        if not self._assistant_runs[assistant_id]:
+            del self._assistant_runs[assistant_id]
+            del self._assistant_slots[assistant_id]
+
+    @asynccontextmanager
+    async def _worker(self, background: bool):
+        if not background or self._workers is None:
+            yield
+            return
+        async with self._workers:
+            yield
+
+    def submit(self, run: Run, fn: Callable[[], Awaitable[Any]], background: bool = False) -> Run:
+        """Queue `fn` as the body of `run`; raises RunQueueFull when the queue is full"""
+        if background:
+            if self.max_background_queued > 0 and self.background_queued >= self.max_background_queued:
+                self.rejected += 1
+                raise RunQueueFull(f"{self.background_queued} background runs are already waiting for a worker")
+            self.background_queued += 1
+        else:
+            if self.max_queued > 0 and self.queued >= self.max_queued:
+                self.rejected += 1
+                raise RunQueueFull(f"{self.queued} runs are already waiting for a slot")
+            self.queued += 1
+        run.background = background
+        self.active[run.run_id] = run
+        # The task copies the context: everything the run logs carries its ids
+        with log_context(run_id=run.run_id, thread_id=run.thread_id, assistant_id=run.assistant_id):
+            run.task = asyncio.create_task(self._execute(run, fn), name=f"run-{run.run_id}")
+        return run
+
+    def _dequeue(self, run: Run):
+        if run.background:
+            self.background_queued -= 1
+        else:
+            self.queued -= 1
+
+    async def _execute(self, run: Run, fn: Callable[[], Awaitable[Any]]):
+        waiting = True
+        try:
+            async with self._worker(run.background), self._admit(run.assistant_id):
+                self._dequeue(run)
+                waiting = False
+                run.status = "running"
+                run.started_at = datetime.now(timezone.utc)
+                self.started += 1
+                run_queue_delay.observe((run.started_at - run.created_at).total_seconds(), str(run.background).lower())
+                await fn()
+            run.status = "success"
+            self.succeeded += 1
+        except asyncio.CancelledError:
+            run.status = "interrupted"
+            self.cancelled += 1
+            raise
+        except Exception as e:
+            run.status = "error"
+            run.error = repr(e)
+            self.failed += 1
+            logger.exception("Run %s failed: %r", run.run_id, e)
+        finally:
+            if waiting:
+                self._dequeue(run)
+            run.finished_at = datetime.now(timezone.utc)
+            runs.inc(run.assistant_id, run.status)
+            self.active.pop(run.run_id, None)
+            self._finished[run.run_id] = run
+            while len(self._finished) > self.history:
+                self._finished.popitem(last=False)
+
+    def get(self, run_id: str) -> Optional[Run]:
+        return self.active.get(run_id) or self._finished.get(run_id)
+
+    def list(self, thread_id: Optional[str] = None) -> List[Run]:
+        runs = list(self.active.values()) + list(reversed(self._finished.values()))
+        return [run for run in runs if thread_id is None or run.thread_id == thread_id]
+
+    async def cancel(self, run_id: str, wait: bool = False) -> bool:
+        """Cancel an active run; with wait, return once it has stopped"""
+        run = self.active.get(run_id)
+        if run is None or run.task is None:
+            return False
+        run.task.cancel()
+        if wait:
+            await asyncio.wait([run.task])
+        return True
+
+    async def wait(self, run_id: str, timeout: Optional[float] = None) -> Optional[Run]:
+        """Wait until the run is done (or timeout); None if the run is unknown"""
+        run = self.get(run_id)
+        if run is not None and run.task is not None and not run.task.done():
+            await asyncio.wait([run.task], timeout=timeout)
+        return run
+
+    async def cancel_thread(self, thread_id: str, wait: bool = False) -> int:
+        runs = [run for run in self.active.values() if run.thread_id == thread_id]
+        for run in runs:
+            await self.cancel(run.run_id, wait=wait)
+        return len(runs)
+
+    async def close(self):
+        """Cancel every active run (shutdown)"""
+        tasks = [run.task for run in self.active.values() if run.task is not None]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks)
+
+    def stats(self) -> Dict[str, Any]:
+        running: Dict[str, int] = {}
+        for run in self.active.values():
+            if run.status == "running":
+                running[run.assistant_id] = running.get(run.assistant_id, 0) + 1
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_per_assistant": self.max_per_assistant,
+            "max_queued": self.max_queued,
+            "background_workers": self.background_workers,
+            "max_background_queued": self.max_background_queued,
+            "running": sum(running.values()),
+            "queued": self.queued,
+            "background_queued": self.background_queued,
+            "running_per_assistant": running,
+            "started": self.started,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "rejected": self.rejected,
+        }
+
+
+# Process-wide run registry
+run_manager = RunManager()
+
+metrics.collected(
+    "chat_runs_in_flight", "Runs running or waiting for a slot", "gauge", ("state",),
+    lambda: [
+        (("running",), sum(1 for run in run_manager.active.values() if run.status == "running")),
+        (("queued",), run_manager.queued),
+        (("background_queued",), run_manager.background_queued),
+    ],
+)
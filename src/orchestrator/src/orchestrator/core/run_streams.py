@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from src.orchestrator.helpers.streaming import RunEventLog
+from src.core.config import (
+    RUN_STREAM_BUFFER_BYTES,
+    RUN_STREAM_SPILL_DIR,
+    RUN_STREAM_RETAIN_SECONDS,
+    RUN_STREAM_MAX_RUNS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class RunStreamRegistry:
+    """
+    Event logs of the resumable runs of this worker, by run id.
+
+    A log can be joined while its run is active and for `retain` seconds after
+    it ended. At most `max_runs` logs are kept; past that, the finished runs
+    that ended first are dropped. Expired logs are dropped when a run starts or
+    is joined, and by a background task while the worker is idle.
+    """
+
+    def __init__(self, buffer_bytes: int = RUN_STREAM_BUFFER_BYTES, spill_dir: str = RUN_STREAM_SPILL_DIR,
+                 retain: float = RUN_STREAM_RETAIN_SECONDS, max_runs: int = RUN_STREAM_MAX_RUNS):
+        self.buffer_bytes = buffer_bytes
+        self.spill_dir = spill_dir or None
+        self.retain = retain
+        self.max_runs = max_runs
+        self.prune_interval = min(max(retain, 1), 60)
+        self._logs: OrderedDict[str, Tuple[str, RunEventLog]] = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+
+        self.created = 0
+        self.joined = 0
+        self.expired = 0
+
+    def create(self, run_id: str, thread_id: str) -> RunEventLog:
+        self._prune()
+        spill_path = None
+        if self.spill_dir:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            spill_path = os.path.join(self.spill_dir, f"{run_id}.sse")
+        log = RunEventLog(self.buffer_bytes, spill_path)
+        self._logs[run_id] = (thread_id, log)
+        self.created += 1
+        return log
+
+    def get(self, run_id: str, thread_id: str) -> Optional[RunEventLog]:
+        self._prune()
+        entry = self._logs.get(run_id)
+        if entry is None or entry[0] != thread_id:
+            return None
+        self.joined += 1
+        return entry[1]
+
+    def _drop(self, run_id: str):
+        _, log = self._logs.pop(run_id)
+        log.discard()
+        self.expired += 1
+
+    def _prune(self):
+        now = time.monotonic()
+        finished = [(run_id, log.closed_at) for run_id, (_, log) in self._logs.items() if log.closed]
+        for run_id, closed_at in finished:
+            if now - closed_at >= self.retain:
+                self._drop(run_id)
+        if self.max_runs > 0 and len(self._logs) >= self.max_runs:
+            finished = [item for item in finished if item[0] in self._logs]
+            finished.sort(key=lambda item: item[1])
+            for run_id, _ in finished[:len(self._logs) - self.max_runs + 1]:
+                self._drop(run_id)
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.prune_interval)
+            try:
+                self._prune()
+            except Exception as e:
+                logger.exception("Run stream pruning failed: %r", e)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(), name="run-stream-prune")
+
+    async def close(self):
+        """Close every log and delete the spill files (shutdown)"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        logs = [log for _, log in self._logs.values()]
+        for run_id in list(self._logs):
+            self._drop(run_id)
+        for log in logs:
+            await log.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        logs = [log for _, log in self._logs.values()]
+        return {
+            "runs": len(logs),
+            "active": sum(1 for log in logs if not log.closed),
+            "bytes_in_memory": sum(log.stats()["bytes_in_memory"] for log in logs),
+            "spill_dir": self.spill_dir,
+            "created": self.created,
+            "joined": self.joined,
+            "expired": self.expired,
+        }
+
+
+# Process-wide resumable stream registry
+run_streams = RunStreamRegistry()
@@ -0,0 +1,70 @@
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+from src.crud.thread import get_expired_thread_ids, delete_threads
+from src.core.config import THREAD_SWEEP_INTERVAL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class ThreadSweeper:
+    """
+    Background task that deletes threads whose TTL ran out, together with their
+    checkpoints, every `interval` seconds. The checkpoints go first: a thread
+    row is only deleted once nothing is left that only it could find, so a
+    failed or cancelled sweep is picked up again by the next one.
+    """
+
+    def __init__(self, interval: float = THREAD_SWEEP_INTERVAL_SECONDS, batch_size: int = 500):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.checkpointer = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.sweeps = 0
+        self.deleted = 0
+
+    async def sweep(self) -> int:
+        deleted = 0
+        while True:
+            thread_ids = await get_expired_thread_ids(self.batch_size)
+            for thread_id in thread_ids:
+                if self.checkpointer is not None:
+                    await self.checkpointer.adelete_thread(thread_id)
+            await delete_threads(thread_ids)
+            deleted += len(thread_ids)
+            if len(thread_ids) < self.batch_size:
+                break
+
+        self.sweeps += 1
+        self.deleted += deleted
+        return deleted
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                deleted = await self.sweep()
+                if deleted:
+                    logger.info("Thread sweeper deleted %d expired threads", deleted)
+            except Exception as e:
+                logger.exception("Thread sweeper failed: %r", e)
+
+    def start(self, checkpointer=None):
+        self.checkpointer = checkpointer
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._loop(), name="thread-sweeper")
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.checkpointer = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"interval_seconds": self.interval, "sweeps": self.sweeps, "deleted": self.deleted}
+
+
+# Process-wide thread TTL sweeper
+thread_sweeper = ThreadSweeper()
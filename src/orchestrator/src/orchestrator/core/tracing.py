@@ -0,0 +1,323 @@
+import asyncio
+import contextvars
+import logging
+import random
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langgraph.errors import GraphBubbleUp
+
+from src.core.config import TRACING_EXPORTER, TRACING_MEMORY_MAX_SPANS
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # opentelemetry is optional, only the otel exporter needs it
+    otel_trace = None
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    """
+    One timed operation, with the fields of an OpenTelemetry span: trace and
+    span ids, parent, start and end time (ns since the epoch), attributes,
+    events and status.
+    """
+
+    __slots__ = ("tracer", "name", "trace_id", "span_id", "parent_id", "start_time", "end_time",
+                 "attributes", "events", "status", "status_description", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, parent: Optional["Span"] = None,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent is not None else None
+        self.start_time = time.time_ns()
+        self.end_time: Optional[int] = None
+        self.attributes = dict(attributes) if attributes else {}
+        self.events: List[Dict[str, Any]] = []
+        self.status = "UNSET"
+        self.status_description: Optional[str] = None
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]):
+        self.attributes.update(attributes)
+
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        self.events.append({"name": name, "timestamp": time.time_ns(), "attributes": attributes or {}})
+
+    def record_exception(self, error: BaseException):
+        if isinstance(error, (GraphBubbleUp, asyncio.CancelledError)):
+            # Interrupts, Command handoffs and cancellations are control flow, not failures
+            self.add_event("interrupt" if isinstance(error, GraphBubbleUp) else "cancelled",
+                           {"type": type(error).__name__})
+            return
+        self.add_event("exception", {"exception.type": type(error).__name__, "exception.message": str(error)})
+        self.status = "ERROR"
+        self.status_description = repr(error)
+
+    def end(self):
+        if self.end_time is not None:
+            return
+        self.end_time = time.time_ns()
+        if self.status == "UNSET":
+            self.status = "OK"
+        self.tracer._export(self)
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        if self.end_time is None:
+            return None
+        return (self.end_time - self.start_time) / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "context": {"trace_id": self.trace_id, "span_id": self.span_id},
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "duration_ms": round(self.duration_ms, 3) if self.end_time is not None else None,
+            "attributes": self.attributes,
+            "events": self.events,
+            "status": {"status_code": self.status, "description": self.status_description},
+        }
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.record_exception(exc)
+        _current_span.reset(self._token)
+        self.end()
+        return False
+
+
+class _NoopSpan:
+    """Span and context manager that does nothing, returned while tracing is off"""
+
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, attributes: Dict[str, Any]):
+        pass
+
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        pass
+
+    def record_exception(self, error: BaseException):
+        pass
+
+    def end(self):
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+class _OtelSpan:
+    """Context manager over an OpenTelemetry span, made current while open"""
+
+    __slots__ = ("span", "_scope")
+
+    def __init__(self, span):
+        self.span = span
+        self._scope = None
+
+    def __getattr__(self, name):
+        return getattr(self.span, name)
+
+    def record_exception(self, error: BaseException):
+        if isinstance(error, (GraphBubbleUp, asyncio.CancelledError)):
+            self.span.add_event("interrupt" if isinstance(error, GraphBubbleUp) else "cancelled",
+                                {"type": type(error).__name__})
+            return
+        self.span.record_exception(error)
+        self.span.set_status(otel_trace.Status(otel_trace.StatusCode.ERROR, repr(error)))
+
+    def __enter__(self) -> "_OtelSpan":
+        self._scope = otel_trace.use_span(self.span, end_on_exit=False)
+        self._scope.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.record_exception(exc)
+        self._scope.__exit__(None, None, None)
+        self.span.end()
+        return False
+
+
+class Tracer:
+    """
+    Spans of the orchestration pipeline. The exporter is one of:
+      none   - tracing off, span() returns a shared no-op span
+      log    - one JSON line per finished span
+      memory - the last `max_spans` finished spans, read through recent()
+      otel   - spans of the OpenTelemetry API; the SDK installed with it exports them
+    """
+
+    def __init__(self, exporter: str = TRACING_EXPORTER, max_spans: int = TRACING_MEMORY_MAX_SPANS):
+        if exporter == "otel" and otel_trace is None:
+            logger.warning("Tracing: opentelemetry is not installed, tracing disabled")
+            exporter = "none"
+        self.exporter = exporter
+        self.enabled = exporter != "none"
+        self._spans: deque[Span] = deque(maxlen=max_spans)
+        self._otel = otel_trace.get_tracer("fustatai.orchestrator") if exporter == "otel" else None
+
+    def span(self, name: str, attributes: Optional[Dict[str, Any]] = None, parent: Any = None, root: bool = False):
+        """
+        Context manager of a span, child of the current span (or of `parent`;
+        `root` starts a new trace). A no-op when tracing is off.
+        """
+        if not self.enabled:
+            return NOOP_SPAN
+        return self.start_span(name, attributes, parent, root)
+
+    def start_span(self, name: str, attributes: Optional[Dict[str, Any]] = None, parent: Any = None,
+                   root: bool = False):
+        """Span ended by an explicit end(), for operations that start and end in callbacks"""
+        if not self.enabled:
+            return NOOP_SPAN
+        if self._otel is not None:
+            if root:
+                context = otel_trace.set_span_in_context(otel_trace.INVALID_SPAN)
+            elif parent is not None:
+                context = otel_trace.set_span_in_context(parent.span)
+            else:
+                context = None
+            return _OtelSpan(self._otel.start_span(name, context=context, attributes=attributes))
+        if parent is None and not root:
+            parent = _current_span.get()
+        return Span(self, name, parent, attributes)
+
+    def _export(self, span: Span):
+        if self.exporter == "log":
+            logger.info("Span %s", span.name, extra={"span": span.to_dict()})
+        elif self.exporter == "memory":
+            self._spans.append(span)
+
+    def recent(self, limit: int = 100, trace_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """The last finished spans (memory exporter), newest first"""
+        spans = [span for span in reversed(self._spans) if trace_id is None or span.trace_id == trace_id]
+        return [span.to_dict() for span in spans[:limit]]
+
+
+# Process-wide tracer
+tracer = Tracer()
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """
+    Spans of one graph run from LangChain callbacks, children of `root`: one per
+    graph node, LLM call (with time to first token and token usage) and tool call.
+    """
+
+    # Called on the event loop, not in an executor
+    run_inline = True
+
+    def __init__(self, root: Any):
+        self.root = root
+        self._spans: Dict[UUID, Any] = {}
+        self._parents: Dict[UUID, Optional[UUID]] = {}
+        # Start of the LLM calls still waiting for their first token
+        self._llm_started: Dict[UUID, int] = {}
+
+    def _parent_span(self, parent_run_id: Optional[UUID]):
+        # Nearest traced ancestor; runnables in between (sequences, channel writes) have no span
+        while parent_run_id is not None:
+            span = self._spans.get(parent_run_id)
+            if span is not None:
+                return span
+            parent_run_id = self._parents.get(parent_run_id)
+        return self.root
+
+    def _start(self, name: str, run_id: UUID, parent_run_id: Optional[UUID], attributes: Dict[str, Any]):
+        self._spans[run_id] = tracer.start_span(name, attributes, parent=self._parent_span(parent_run_id))
+
+    def _end(self, run_id: UUID, error: Optional[BaseException] = None, attributes: Optional[Dict[str, Any]] = None):
+        self._parents.pop(run_id, None)
+        self._llm_started.pop(run_id, None)
+        span = self._spans.pop(run_id, None)
+        if span is None:
+            return
+        if attributes:
+            span.set_attributes(attributes)
+        if error is not None:
+            span.record_exception(error)
+        span.end()
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        if node is not None and kwargs.get("name") == node:
+            self._start(f"node {node}", run_id, parent_run_id, {
+                "langgraph.node": node,
+                "langgraph.step": metadata.get("langgraph_step"),
+                "langgraph.checkpoint_ns": metadata.get("checkpoint_ns", ""),
+            })
+        else:
+            self._parents[run_id] = parent_run_id
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        params = kwargs.get("invocation_params") or {}
+        self._llm_started[run_id] = time.time_ns()
+        self._start("llm", run_id, parent_run_id, {
+            "gen_ai.request.model": (metadata or {}).get("ls_model_name") or params.get("model") or params.get("model_name"),
+            "gen_ai.system": (metadata or {}).get("ls_provider"),
+        })
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        started = self._llm_started.pop(run_id, None)
+        span = self._spans.get(run_id)
+        if started is not None and span is not None:
+            span.set_attribute("gen_ai.time_to_first_token_ms", round((time.time_ns() - started) / 1e6, 3))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        attributes = {}
+        for generations in response.generations or []:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    attributes["gen_ai.usage.input_tokens"] = usage.get("input_tokens")
+                    attributes["gen_ai.usage.output_tokens"] = usage.get("output_tokens")
+        self._end(run_id, attributes=attributes)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name")
+        self._start(f"tool {name}", run_id, parent_run_id, {"tool.name": name})
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
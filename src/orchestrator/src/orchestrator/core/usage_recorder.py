@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from src.crud.usage import insert_run_usage
+from src.core.config import (
+    USAGE_RECORDING_ENABLED,
+    USAGE_FLUSH_INTERVAL_SECONDS,
+    USAGE_FLUSH_BATCH_SIZE,
+    USAGE_MAX_PENDING_ROWS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _uuid(value) -> Optional[UUID]:
+    if value is None or isinstance(value, UUID):
+        return value
+    try:
+        return UUID(str(value))
+    except ValueError:
+        return None
+
+
+class RunUsageTracker(BaseCallbackHandler):
+    """
+    Tokens and LLM calls of one run per api key and model, summed from the
+    chat model callbacks (the usage_metadata of each response). Only LLM
+    events reach it, not the chain events of every graph step.
+    """
+
+    run_inline = True
+    ignore_chain = True
+    ignore_agent = True
+    ignore_retriever = True
+    ignore_retry = True
+    ignore_custom_event = True
+
+    def __init__(self, run_id: str, thread_id: Optional[str], assistant_id: Optional[str]):
+        self.run_id = run_id
+        self.thread_id = thread_id
+        self.assistant_id = assistant_id
+        self.started_at = datetime.now(timezone.utc)
+        self._started = time.perf_counter()
+        self.first_token_ms: Optional[int] = None
+        # LLM call id -> (api_key_id, provider, model)
+        self._calls: Dict[UUID, Tuple[Optional[str], Optional[str], Optional[str]]] = {}
+        # (api_key_id, provider, model) -> [calls, input tokens, output tokens]
+        self.usage: Dict[Tuple[Optional[str], Optional[str], Optional[str]], List[int]] = {}
+
+    def mark_first_token(self):
+        if self.first_token_ms is None:
+            self.first_token_ms = round((time.perf_counter() - self._started) * 1000)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        metadata = metadata or {}
+        self._calls[run_id] = (metadata.get("api_key_id"), metadata.get("ls_provider"), metadata.get("ls_model_name"))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        totals = self.usage.setdefault(self._calls.pop(run_id, (None, None, None)), [0, 0, 0])
+        totals[0] += 1
+        for generations in response.generations or []:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    totals[1] += usage.get("input_tokens", 0)
+                    totals[2] += usage.get("output_tokens", 0)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self.usage.setdefault(self._calls.pop(run_id, (None, None, None)), [0, 0, 0])[0] += 1
+
+    def rows(self, status: str) -> List[Dict[str, Any]]:
+        run = {
+            "run_id": _uuid(self.run_id),
+            "thread_id": _uuid(self.thread_id),
+            "assistant_id": _uuid(self.assistant_id),
+            "status": status,
+            "duration_ms": round((time.perf_counter() - self._started) * 1000),
+            "first_token_ms": self.first_token_ms,
+            "started_at": self.started_at,
+        }
+        usage = self.usage or {(None, None, None): [0, 0, 0]}
+        return [
+            {
+                **run,
+                "api_key_id": _uuid(api_key_id),
+                "provider": provider,
+                "model": model,
+                "llm_calls": calls,
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+            }
+            for (api_key_id, provider, model), (calls, input_tokens, output_tokens) in usage.items()
+        ]
+
+
+class UsageRecorder:
+    """
+    Collects the usage rows of finished runs in memory and writes them to the
+    run_usage table in bulk every `interval` seconds, `batch_size` rows per
+    INSERT, so runs never wait on the database. At most `max_pending` rows are
+    held (e.g. while the database is down); past that the oldest are dropped.
+    """
+
+    def __init__(self, enabled: bool = USAGE_RECORDING_ENABLED, interval: float = USAGE_FLUSH_INTERVAL_SECONDS,
+                 batch_size: int = USAGE_FLUSH_BATCH_SIZE, max_pending: int = USAGE_MAX_PENDING_ROWS):
+        self.enabled = enabled
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self._pending: List[Dict[str, Any]] = []
+        self._task: Optional[asyncio.Task] = None
+
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.failures = 0
+
+    def track(self, run_id: str, thread_id: Optional[str], assistant_id: Optional[str]) -> Optional[RunUsageTracker]:
+        """Tracker to add to the run's callbacks; None when recording is off"""
+        if not self.enabled:
+            return None
+        return RunUsageTracker(run_id, thread_id, assistant_id)
+
+    def record(self, tracker: Optional[RunUsageTracker], status: str):
+        """Queue the rows of a finished run for the next flush"""
+        if tracker is None:
+            return
+        rows = tracker.rows(status)
+        self._pending.extend(rows)
+        self.recorded += len(rows)
+        overflow = len(self._pending) - self.max_pending
+        if self.max_pending > 0 and overflow > 0:
+            del self._pending[:overflow]
+            self.dropped += overflow
+
+    async def flush(self) -> int:
+        written = 0
+        while self._pending:
+            batch = self._pending[:self.batch_size]
+            del self._pending[:len(batch)]
+            try:
+                await insert_run_usage(batch)
+            except BaseException:
+                # Failed or cancelled: the rows go back to the front for the next flush
+                self.failures += 1
+                self._pending[:0] = batch
+                raise
+            written += len(batch)
+        self.written += written
+        self.flushes += 1
+        return written
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning("Usage recorder flush failed, %d rows kept: %r", len(self._pending), e)
+
+    def start(self):
+        if self._task is None and self.enabled and self.interval > 0:
+            self._task = asyncio.create_task(self._loop(), name="usage-recorder")
+
+    async def close(self):
+        """Stop the flush loop and write what is left (shutdown)"""
+        if self._task is not None:
+            self._task.cancel()
+            # A write cut short puts its rows back before the last flush
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error("Usage recorder lost %d rows on shutdown: %r", len(self._pending), e)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "interval_seconds": self.interval,
+            "pending": len(self._pending),
+            "recorded": self.recorded,
+            "written": self.written,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "failures": self.failures,
+        }
+
+
+# Process-wide usage recorder
+usage_recorder = UsageRecorder()
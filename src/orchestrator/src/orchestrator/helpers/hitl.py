@@ -1,8 +1,12 @@
+import logging
 from typing import Callable
 from langchain_core.tools import BaseTool, tool as create_tool
 from langchain_core.runnables import RunnableConfig
 from langgraph.types import interrupt
 from langgraph.prebuilt.interrupt import HumanInterruptConfig, HumanInterrupt
+from src.orchestrator.core.tracing import tracer
+
+logger = logging.getLogger(__name__)
 
 # tools
 
@@ -45,8 +49,10 @@ def add_human_in_the_loop(
                 "config": interrupt_config,
                 "description": "Please review the tool call"
             }
-            response = interrupt([request])[0]  
-            print(response)
+            with tracer.span("hitl.review", {"tool.name": tool.name}) as span:
+                response = interrupt([request])[0]  
+                span.set_attribute("hitl.decision", response["type"])
+            logger.debug("Review of tool %s: %s", tool.name, response["type"])
             # approve the tool call
             if response["type"] == "accept":
                 tool_response = await tool.ainvoke(tool_input, config)
@@ -81,8 +87,10 @@ def add_human_in_the_loop(
                 "config": interrupt_config,
                 "description": "Please review the tool call"
             }
-            response = interrupt([request])[0]  
-            print(response)
+            with tracer.span("hitl.review", {"tool.name": tool.name}) as span:
+                response = interrupt([request])[0]  
+                span.set_attribute("hitl.decision", response["type"])
+            logger.debug("Review of tool %s: %s", tool.name, response["type"])
             # approve the tool call
             if response["type"] == "accept":
                 tool_response = tool.invoke(tool_input, config)
@@ -0,0 +1,110 @@
+import json
+import logging
+from operator import attrgetter
+from typing import Any, Callable, Dict, Tuple
+
+from langchain_core.messages import BaseMessage, AIMessageChunk, ToolMessage, HumanMessage, AIMessage
+
+from src.core.config import SSE_SERIALIZER
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the json backend is always available
+    orjson = None
+
+
+# Fields written for every message, then the ones a message type has
+# (same names and order as LangChainMessageEncoder always wrote them)
+_BASE_FIELDS = ("content", "additional_kwargs", "response_metadata", "type", "name", "id", "example")
+_OPTIONAL_FIELDS = ("tool_calls", "invalid_tool_calls", "usage_metadata", "tool_call_id", "artifact", "status")
+_EXAMPLE_INDEX = _BASE_FIELDS.index("example")
+
+# Per message class: (keys, getter for the attributes it has, whether it has `example`)
+_message_plans: Dict[type, Tuple[Tuple[str, ...], Callable, bool]] = {}
+
+
+def _compile_plan(message: BaseMessage):
+    has_example = hasattr(message, "example")
+    keys = _BASE_FIELDS + tuple(f for f in _OPTIONAL_FIELDS if hasattr(message, f))
+    attributes = [key for key in keys if key != "example" or has_example]
+    plan = (keys, attrgetter(*attributes), has_example)
+    _message_plans[type(message)] = plan
+    return plan
+
+
+def message_to_dict(message: BaseMessage) -> Dict[str, Any]:
+    """Message fields as a dict, read with one precompiled getter per message class"""
+    keys, getter, has_example = _message_plans.get(type(message)) or _compile_plan(message)
+    values = getter(message)
+    if not has_example:
+        values = values[:_EXAMPLE_INDEX] + (False,) + values[_EXAMPLE_INDEX:]
+    return dict(zip(keys, values))
+
+
+def default(obj: Any) -> Any:
+    """Fallback for objects json can't encode: messages become dicts, anything else str()"""
+    if isinstance(obj, BaseMessage):
+        return message_to_dict(obj)
+    return str(obj)
+
+
+class JsonSerializer:
+    """The standard library encoder; output is byte-identical to json.dumps(obj, cls=LangChainMessageEncoder)"""
+
+    name = "json"
+    # Between the items of a JSON array or object, for frames put together from encoded parts
+    separator = ", "
+
+    def __init__(self):
+        self._encoder = json.JSONEncoder(default=default)
+
+    def dumps(self, obj: Any) -> str:
+        return self._encoder.encode(obj)
+
+
+class OrjsonSerializer:
+    """
+    orjson encoder, opt-in (pip install .[orjson]). Not byte-compatible with the
+    json backend: frames are written compactly (no spaces after separators)
+    and as UTF-8 instead of \\u escapes, and NaN and Infinity become null.
+    Other values decode the same. Integers wider than 64 bits, which orjson
+    can't encode, are written by the json encoder in the same compact style.
+    """
+
+    name = "orjson"
+    separator = ","
+
+    _options = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS) if orjson else 0
+
+    def __init__(self):
+        self._fallback = json.JSONEncoder(default=default, separators=(",", ":"), ensure_ascii=False)
+
+    def dumps(self, obj: Any) -> str:
+        try:
+            return orjson.dumps(obj, default=default, option=self._options).decode()
+        except orjson.JSONEncodeError:
+            return self._fallback.encode(obj)
+
+
+def get_serializer(name: str = SSE_SERIALIZER):
+    if name == "orjson":
+        if orjson is not None:
+            return OrjsonSerializer()
+        logger.warning("SSE_SERIALIZER=orjson but orjson is not installed, using json")
+    elif name != "json":
+        raise ValueError(f"Unsupported serializer: {name}")
+    return JsonSerializer()
+
+
+# Message classes seen on every stream, compiled up front
+for _message in (AIMessageChunk(content=""), AIMessage(content=""), HumanMessage(content=""),
+                 ToolMessage(content="", tool_call_id="")):
+    _compile_plan(_message)
+
+
+# Serializer for the streaming endpoints, selected by SSE_SERIALIZER
+serializer = get_serializer()
+dumps = serializer.dumps
+separator = serializer.separator
@@ -0,0 +1,414 @@
+import asyncio
+import itertools
+import os
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from langchain_core.messages import AIMessageChunk
+
+from src.core.config import (
+    SSE_HIGH_WATERMARK_BYTES,
+    SSE_LOW_WATERMARK_BYTES,
+    SSE_MAX_WRITE_BYTES,
+    SSE_KEEPALIVE_SECONDS,
+    RUN_STREAM_BUFFER_BYTES,
+)
+
+KEEPALIVE_FRAME = ": keep-alive\n\n"
+
+_END = object()
+
+
+class SseFrameBuffer:
+    """
+    Byte-bounded buffer of SSE frames between a graph run and the HTTP response.
+
+    The producer is paused once the buffered frames reach the high watermark and
+    resumed when the client has drained them below the low watermark, so a slow
+    client slows the run down instead of growing memory without limit.
+    """
+
+    def __init__(
+        self,
+        high_watermark: int = SSE_HIGH_WATERMARK_BYTES,
+        low_watermark: int = SSE_LOW_WATERMARK_BYTES,
+        max_write_bytes: int = SSE_MAX_WRITE_BYTES,
+    ):
+        self.high_watermark = high_watermark
+        self.low_watermark = min(low_watermark, high_watermark)
+        self.max_write_bytes = max_write_bytes
+
+        self._frames: deque[str] = deque()
+        self._size = 0
+        self._readable = asyncio.Event()
+        self._writable = asyncio.Event()
+        self._writable.set()
+        self._closed = False
+        self._detached = False
+        self._error: Optional[BaseException] = None
+
+        self.pauses = 0
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    async def put(self, frame: str):
+        await self._writable.wait()
+        if self._closed or self._detached:
+            return
+
+        self._frames.append(frame)
+        self._size += len(frame)
+        self._readable.set()
+
+        if self._size >= self.high_watermark:
+            self._writable.clear()
+            self.pauses += 1
+
+    def detach(self):
+        """The client is gone: drop buffered and further frames, the producer never pauses again."""
+        self._detached = True
+        self._frames.clear()
+        self._size = 0
+        self._writable.set()
+
+    def close(self, error: Optional[BaseException] = None):
+        if self._closed:
+            return
+        self._closed = True
+        self._error = error
+        self._readable.set()
+        self._writable.set()
+
+    async def read(self, timeout: Optional[float] = None) -> Optional[str]:
+        """
+        Returns buffered frames joined into one write (up to max_write_bytes),
+        an empty string if nothing arrived within timeout, or None once the
+        buffer is closed and drained.
+        """
+        if not self._frames and not self._closed:
+            try:
+                await asyncio.wait_for(self._readable.wait(), timeout)
+            except asyncio.TimeoutError:
+                return ""
+
+        if not self._frames:
+            if self._error is not None:
+                raise self._error
+            return None
+
+        chunks = [self._frames.popleft()]
+        written = len(chunks[0])
+        while self._frames and written + len(self._frames[0]) <= self.max_write_bytes:
+            frame = self._frames.popleft()
+            chunks.append(frame)
+            written += len(frame)
+
+        self._size -= written
+        if not self._frames and not self._closed:
+            self._readable.clear()
+        if self._size <= self.low_watermark:
+            self._writable.set()
+
+        return "".join(chunks)
+
+    async def stream(self, keepalive: Optional[float] = SSE_KEEPALIVE_SECONDS) -> AsyncIterator[str]:
+        """Yield writes until closed, with keep-alive comments while the run is quiet."""
+        while True:
+            data = await self.read(keepalive or None)
+            if data is None:
+                return
+            yield data or KEEPALIVE_FRAME
+
+
+class RunEventLog:
+    """
+    Replayable log of the SSE frames of one run, for resumable streams.
+
+    Frame n of the log is the frame sent with `id: n`. The newest frames are
+    kept in memory up to `max_bytes`; older ones are appended to a file in
+    `spill_dir` when set, and dropped otherwise. The producer never waits on
+    readers: every reader follows the log from its own position, so a slow or
+    reconnecting client catches up without slowing the run down. Nor does it
+    wait on the disk: evicted frames are written by a background task, in one
+    write per batch, and read from memory until they are.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = RUN_STREAM_BUFFER_BYTES,
+        spill_path: Optional[str] = None,
+        max_write_bytes: int = SSE_MAX_WRITE_BYTES,
+    ):
+        self.max_bytes = max_bytes
+        self.max_write_bytes = max_write_bytes
+        self.spill_path = spill_path
+
+        self._frames: deque[str] = deque()
+        self._size = 0
+        self._next_id = 0
+        self._changed = asyncio.Event()
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        self.closed_at: Optional[float] = None
+
+        # Byte offsets of the spilled frames, frame n starts at _offsets[n]. The
+        # first _spill_written of them are in the file, the others in _spill_pending
+        self._spill = None
+        self._offsets: list[int] = []
+        self._spill_size = 0
+        self._spill_pending: list[bytes] = []
+        self._spill_written = 0
+        self._spill_written_size = 0
+        self._spill_task: Optional[asyncio.Task] = None
+        self._discarded = False
+        self.dropped = 0
+
+    @property
+    def first_id(self) -> int:
+        """Id of the oldest frame still in memory"""
+        return self._next_id - len(self._frames)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def put(self, frame: str):
+        if self._closed:
+            return
+        self._frames.append(frame)
+        self._size += len(frame)
+        self._next_id += 1
+
+        # Keep at least the newest frame in memory
+        while self._size > self.max_bytes and len(self._frames) > 1:
+            evicted = self._frames.popleft()
+            self._size -= len(evicted)
+            self._evict(evicted)
+        self._notify()
+
+    def _evict(self, frame: str):
+        if self.spill_path is None:
+            self.dropped += 1
+            return
+        data = frame.encode()
+        self._offsets.append(self._spill_size)
+        self._spill_size += len(data)
+        self._spill_pending.append(data)
+        if self._spill_task is None:
+            self._spill_task = asyncio.create_task(self._write_spill(), name="run-stream-spill")
+
+    async def _write_spill(self):
+        # Frames evicted while a write runs go into the next one
+        try:
+            while self._spill_pending and not self._discarded:
+                count = len(self._spill_pending)
+                data = b"".join(self._spill_pending[:count])
+                await asyncio.to_thread(self._append_spill, data)
+                del self._spill_pending[:count]
+                self._spill_written += count
+                self._spill_written_size += len(data)
+        finally:
+            self._spill_task = None
+            if self._discarded:
+                self._remove_spill()
+
+    def _append_spill(self, data: bytes):
+        if self._spill is None:
+            self._spill = open(self.spill_path, "a+b", buffering=0)
+        self._spill.write(data)
+
+    async def flush(self):
+        """Wait until the evicted frames are in the spill file (or the file is removed, once discarded)"""
+        while self._spill_task is not None:
+            await asyncio.shield(self._spill_task)
+
+    def close(self, error: Optional[BaseException] = None):
+        if self._closed:
+            return
+        self._closed = True
+        self._error = error
+        self.closed_at = time.monotonic()
+        self._notify()
+
+    def discard(self):
+        """Close the log and delete its spill file, after the write in progress if any"""
+        self.close()
+        self._discarded = True
+        self._spill_pending.clear()
+        if self._spill_task is None:
+            self._remove_spill()
+
+    def _remove_spill(self):
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+        if self.spill_path is not None and os.path.exists(self.spill_path):
+            os.remove(self.spill_path)
+
+    def _read_spilled(self, start: int, count: int, size: int) -> Tuple[str, int]:
+        """Spilled frames from `start` (of the first `count`, `size` bytes), joined up to max_write_bytes"""
+        begin = self._offsets[start]
+        end = begin
+        stop = start
+        while stop < count:
+            frame_end = self._offsets[stop + 1] if stop + 1 < count else size
+            if stop > start and frame_end - begin > self.max_write_bytes:
+                break
+            end = frame_end
+            stop += 1
+        return os.pread(self._spill.fileno(), end - begin, begin).decode(), stop
+
+    def _read_pending(self, start: int) -> Tuple[str, int]:
+        """Spilled frames not written yet from `start`, joined up to max_write_bytes"""
+        chunks = []
+        written = 0
+        stop = start
+        for data in itertools.islice(self._spill_pending, start - self._spill_written, None):
+            if chunks and written + len(data) > self.max_write_bytes:
+                break
+            chunks.append(data)
+            written += len(data)
+            stop += 1
+        return b"".join(chunks).decode(), stop
+
+    def _read_memory(self, start: int) -> Tuple[str, int]:
+        """In-memory frames from `start`, joined up to max_write_bytes"""
+        chunks = []
+        written = 0
+        stop = start
+        for frame in itertools.islice(self._frames, start - self.first_id, None):
+            if chunks and written + len(frame) > self.max_write_bytes:
+                break
+            chunks.append(frame)
+            written += len(frame)
+            stop += 1
+        return "".join(chunks), stop
+
+    async def stream(self, after: int = -1, keepalive: Optional[float] = SSE_KEEPALIVE_SECONDS) -> AsyncIterator[str]:
+        """
+        Yield the frames after id `after` (all of them with -1) and then the new
+        ones as the run emits them, until the log is closed. Frames that were
+        dropped from memory without a spill file are skipped.
+        """
+        position = max(0, after + 1)
+        while not self._discarded:
+            changed = self._changed
+            if position < self._next_id:
+                if position < self._spill_written:
+                    # Runs in a thread while the producer spills more frames
+                    data, position = await asyncio.to_thread(
+                        self._read_spilled, position, self._spill_written, self._spill_written_size
+                    )
+                elif position < self.first_id and position < len(self._offsets):
+                    data, position = self._read_pending(position)
+                else:
+                    data, position = self._read_memory(max(position, self.first_id))
+                yield data
+                continue
+
+            if self._closed:
+                if self._error is not None:
+                    raise self._error
+                return
+
+            try:
+                await asyncio.wait_for(changed.wait(), keepalive or None)
+            except asyncio.TimeoutError:
+                yield KEEPALIVE_FRAME
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "frames": self._next_id,
+            "frames_in_memory": len(self._frames),
+            "bytes_in_memory": self._size,
+            "frames_spilled": len(self._offsets),
+            "frames_spill_pending": len(self._spill_pending),
+            "frames_dropped": self.dropped,
+            "closed": self._closed,
+        }
+
+
+async def coalesce_message_chunks(events: AsyncIterator[Any], interval: float) -> AsyncIterator[Any]:
+    """
+    Merge adjacent ("messages", (AIMessageChunk, metadata)) stream events of the
+    same message into one event, holding a chunk at most `interval` seconds.
+    Other events pass through unchanged and in order.
+    """
+    if not interval or interval <= 0:
+        async for event in events:
+            yield event
+        return
+
+    queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+
+    async def pump():
+        try:
+            async for event in events:
+                await queue.put(event)
+            await queue.put(_END)
+        except Exception as e:
+            await queue.put(e)
+
+    pump_task = asyncio.create_task(pump())
+    loop = asyncio.get_running_loop()
+    pending = None
+    deadline = 0.0
+
+    try:
+        while True:
+            timeout = None if pending is None else max(0.0, deadline - loop.time())
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                yield pending
+                pending = None
+                continue
+
+            if item is _END:
+                break
+            if isinstance(item, Exception):
+                raise item
+
+            if pending is not None and _same_message(pending, item):
+                pending = ("messages", (pending[1][0] + item[1][0], pending[1][1]))
+                continue
+
+            if pending is not None:
+                yield pending
+                pending = None
+
+            if _is_message_chunk(item):
+                pending = item
+                deadline = loop.time() + interval
+                continue
+
+            yield item
+
+        if pending is not None:
+            yield pending
+    finally:
+        pump_task.cancel()
+
+
+def _is_message_chunk(event: Any) -> bool:
+    return (
+        isinstance(event, tuple) and len(event) == 2 and event[0] == "messages"
+        and isinstance(event[1], tuple) and isinstance(event[1][0], AIMessageChunk)
+    )
+
+
+def _same_message(pending: Any, event: Any) -> bool:
+    if not _is_message_chunk(event):
+        return False
+    (chunk, metadata), (next_chunk, next_metadata) = pending[1], event[1]
+    return (
+        chunk.id == next_chunk.id
+        and metadata.get("langgraph_checkpoint_ns") == next_metadata.get("langgraph_checkpoint_ns")
+    )
@@ -3,6 +3,7 @@ from typing import List, Dict, Any, Optional, AsyncGenerator
 from datetime import datetime, timezone
 from json import JSONEncoder
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage, ToolMessage
+from src.orchestrator.helpers.serializer import dumps, separator
 
 
 # Custom JSON Encoder for LangChain messages
@@ -52,8 +53,13 @@ class LangChainMessageEncoder(JSONEncoder):
 def create_metadata(run_id: str, thread_id: str, assistant_id: str, 
                     headers: Dict[str, str], message) -> Dict[str, Any]:
     """Create metadata in the exact format of LangGraph Platform API"""
-    #print(message)
-    temp = {
+    return {**create_run_metadata(run_id, thread_id, assistant_id, headers), **message}
+
+
+def create_run_metadata(run_id: str, thread_id: str, assistant_id: str,
+                        headers: Dict[str, str]) -> Dict[str, Any]:
+    """The part of the message metadata that is the same for every chunk of a run"""
+    return {
         "created_by": "system",
         "graph_id": "agent",
         "assistant_id": assistant_id,
@@ -95,8 +101,39 @@ def create_metadata(run_id: str, thread_id: str, assistant_id: str,
         "LANGSMITH_LANGGRAPH_API_VARIANT": "local_dev",
         "LANGSMITH_PROJECT": "local-agent"
     }
-    result = {**temp, **message}
-    return result
+
+
+class MetadataTemplate:
+    """
+    Message metadata of one run, serialized once.
+
+    render() splices the per-chunk fields (langgraph_node, langgraph_step, ...)
+    into the pre-serialized run metadata and returns the same JSON that
+    dumps(create_metadata(...)) would.
+    """
+
+    def __init__(self, run_id: str, thread_id: str, assistant_id: str, headers: Dict[str, str]):
+        self.metadata = create_run_metadata(run_id, thread_id, assistant_id, headers)
+        # Serialized run metadata without the closing brace
+        self._prefix = dumps(self.metadata)[:-1]
+
+    def render(self, message: Dict[str, Any]) -> str:
+        extra = {}
+        for key, value in message.items():
+            if key not in self.metadata:
+                extra[key] = value
+            elif type(value) is not type(self.metadata[key]) or value != self.metadata[key]:
+                # The chunk overrides a run field in place, rare enough to serialize it all
+                return dumps({**self.metadata, **message})
+
+        if not extra:
+            return self._prefix + "}"
+        return self._prefix + separator + dumps(extra)[1:]
+
+    @staticmethod
+    def render_chunk(message: Dict[str, Any]) -> str:
+        """Only the per-chunk fields, for messages after the first one of a run"""
+        return dumps(message)
 
 def convert_message_to_serializable(message):
     """Convert LangChain message to serializable format matching LangGraph API"""
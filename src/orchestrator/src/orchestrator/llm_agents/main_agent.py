@@ -1,5 +1,9 @@
-from src.models.orchestrator import Orchestrator as DbOrchestrator
-from src.models.api_key import ApiKey as DbApiKey
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List
+
+from src.orchestrator.core.assistant_spec import OrchestratorSpec, AgentSpec, ApiKeySpec
 
 from src.orchestrator.llm_agents.main_agent_prompt import get_system_prompt
 from src.orchestrator.llm_agents.sub_agent import get_sub_agent
@@ -8,50 +12,99 @@ from langgraph_supervisor import create_supervisor
 from langgraph.prebuilt import create_react_agent
 
 from src.orchestrator.core.llm_provider import get_llm
+from src.orchestrator.core.tracing import tracer
+from src.orchestrator.core.graph_cache import report_degraded
+from src.core.config import SUB_AGENT_BUILD_CONCURRENCY
+
+logger = logging.getLogger(__name__)
 #from src.orchestrator.core.memory_service import get_checkpointer
 
+# Last build of every sub agent: name, duration and error, by agent id
+sub_agent_builds: Dict[str, Dict[str, Any]] = {}
 
-async def get_main_agent(dbOrchestrator: DbOrchestrator, checkpointer):
 
-    apiref: DbApiKey = dbOrchestrator.api_key
+async def _build_sub_agents(agents: List[AgentSpec]) -> list:
+    """
+    Build the sub agents concurrently, at most SUB_AGENT_BUILD_CONCURRENCY at a
+    time. A sub agent that fails to build is left out, so the orchestrator starts
+    with the healthy ones, and the build is reported degraded so the graph is
+    not cached for long.
+    """
+    slots = asyncio.Semaphore(SUB_AGENT_BUILD_CONCURRENCY if SUB_AGENT_BUILD_CONCURRENCY > 0 else len(agents) or 1)
 
-    AGENT_MODEL = get_llm(
-        provider = apiref.provider_name.lower(),
-        model = apiref.model_name.lower(), 
-        api_key = apiref.secret_key
-    )
+    async def build(agent: AgentSpec):
+        async with slots:
+            start = time.perf_counter()
+            try:
+                with tracer.span("sub_agent.build", {"agent.id": str(agent.id), "agent.name": agent.name}):
+                    return await get_sub_agent(agent)
+            finally:
+                sub_agent_builds[str(agent.id)] = {
+                    "name": agent.name,
+                    "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+                    "error": None,
+                }
 
-    agent_name = str(dbOrchestrator.name).replace(' ', '_')
+    results = await asyncio.gather(*[build(agent) for agent in agents], return_exceptions=True)
 
-    if dbOrchestrator.agents:
-        subAgents = []
+    subAgents = []
+    for agent, result in zip(agents, results):
+        build_info = sub_agent_builds[str(agent.id)]
+        if isinstance(result, Exception):
+            build_info["error"] = repr(result)
+            logger.warning("Sub agent %s skipped after %s ms: %r", agent.name, build_info["duration_ms"], result)
+            report_degraded(f"sub agent {agent.name}: {result!r}")
+            continue
+        if isinstance(result, BaseException):
+            raise result
+        logger.info("Sub agent %s built in %s ms", agent.name, build_info["duration_ms"])
+        subAgents.append(result)
+    return subAgents
 
-        for subAgent in dbOrchestrator.agents:
-            sub_agent = await get_sub_agent(subAgent.agent)
-            subAgents.append(sub_agent)
 
-        # Create supervisor workflow
-        workflow = create_supervisor(
-            subAgents,
-            model=AGENT_MODEL,
-            supervisor_name=agent_name,
-            prompt=get_system_prompt(dbOrchestrator),
-            output_mode="full_history"
-        )
+async def get_main_agent(dbOrchestrator: OrchestratorSpec, checkpointer):
 
-        # Compile and run
-        graph = workflow.compile(
-            checkpointer=checkpointer
+    apiref: ApiKeySpec = dbOrchestrator.api_key
+
+    with tracer.span("llm.client", {"gen_ai.system": apiref.provider_name.lower(), "gen_ai.request.model": apiref.model_name}):
+        AGENT_MODEL = get_llm(
+            provider = apiref.provider_name.lower(),
+            model = apiref.model_name.lower(), 
+            api_key = apiref.secret_key,
+            base_url = apiref.base_url,
+            api_key_id = apiref.id
         )
 
+    agent_name = str(dbOrchestrator.name).replace(' ', '_')
+
+    subAgents = await _build_sub_agents(list(dbOrchestrator.agents))
+
+    if subAgents:
+        with tracer.span("graph.compile", {"graph.agents": len(subAgents)}):
+            # Create supervisor workflow
+            workflow = create_supervisor(
+                subAgents,
+                model=AGENT_MODEL,
+                supervisor_name=agent_name,
+                prompt=get_system_prompt(dbOrchestrator),
+                output_mode="full_history"
+            )
+
+            # Compile and run
+            graph = workflow.compile(
+                checkpointer=checkpointer
+            )
+
         return graph
 
 
-    agent = create_react_agent(
-        model=AGENT_MODEL,
-        name=agent_name,
-        prompt=get_system_prompt(dbOrchestrator),
-        checkpointer=checkpointer
-    )
+    with tracer.span("graph.compile", {"graph.agents": 0}):
+        agent = create_react_agent(
+            model=AGENT_MODEL,
+            tools=[],
+            name=agent_name,
+            prompt=get_system_prompt(dbOrchestrator),
+            checkpointer=checkpointer
+        )
     
     return agent
@@ -1,6 +1,6 @@
-from src.models.orchestrator import Orchestrator as DbOrchestrator
+from src.orchestrator.core.assistant_spec import OrchestratorSpec
 
-def get_system_prompt(orchestrator: DbOrchestrator) -> str:
+def get_system_prompt(orchestrator: OrchestratorSpec) -> str:
         """Convert agent config to system instruction"""
 
         prompt = f"""You are {orchestrator.name}.
@@ -1,23 +1,26 @@
 from src.orchestrator.llm_agents.sub_agent_prompt import get_system_prompt
-from src.models.agent import Agent as DbAgent
-from src.models.api_key import ApiKey as DbApiKey
+from src.orchestrator.core.assistant_spec import AgentSpec, ApiKeySpec
 
 from src.orchestrator.core.llm_provider import get_llm
 from src.orchestrator.core.mcp_service import get_mcp_servers_tools
+from src.orchestrator.core.tracing import tracer
 from langgraph.prebuilt import create_react_agent
 
 #from src.orchestrator.core.memory_service import get_checkpointer
 
 
-async def get_sub_agent(dbAgent: DbAgent, checkpointer = None, enable_checkpoint: bool = False):
+async def get_sub_agent(dbAgent: AgentSpec, checkpointer = None, enable_checkpoint: bool = False):
 
-    apiref: DbApiKey = dbAgent.api_key
+    apiref: ApiKeySpec = dbAgent.api_key
 
-    AGENT_MODEL = get_llm(
-        provider = apiref.provider_name.lower(),
-        model = apiref.model_name.lower(), 
-        api_key = apiref.secret_key
-    )
+    with tracer.span("llm.client", {"gen_ai.system": apiref.provider_name.lower(), "gen_ai.request.model": apiref.model_name}):
+        AGENT_MODEL = get_llm(
+            provider = apiref.provider_name.lower(),
+            model = apiref.model_name.lower(), 
+            api_key = apiref.secret_key,
+            base_url = apiref.base_url,
+            api_key_id = apiref.id
+        )
 
     agent_name = str(dbAgent.name).replace(' ', '_')
 
@@ -31,21 +34,22 @@ async def get_sub_agent(dbAgent: DbAgent, checkpointer = None, enable_checkpoint
 
     agent = None
 
-    if enable_checkpoint:
-        agent = create_react_agent(
-            model=AGENT_MODEL,
-            name=agent_name,
-            prompt=get_system_prompt(dbAgent),
-            tools=tools,
-            checkpointer=checkpointer
-        )
-    else:
-        agent = create_react_agent(
-            model=AGENT_MODEL,
-            name=agent_name,
-            prompt=get_system_prompt(dbAgent),
-            tools=tools
-        )
+    with tracer.span("graph.compile", {"graph.tools": len(tools)}):
+        if enable_checkpoint:
+            agent = create_react_agent(
+                model=AGENT_MODEL,
+                name=agent_name,
+                prompt=get_system_prompt(dbAgent),
+                tools=tools,
+                checkpointer=checkpointer
+            )
+        else:
+            agent = create_react_agent(
+                model=AGENT_MODEL,
+                name=agent_name,
+                prompt=get_system_prompt(dbAgent),
+                tools=tools
+            )
     
     return agent
 
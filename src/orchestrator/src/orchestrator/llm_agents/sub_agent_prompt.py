@@ -1,6 +1,6 @@
-from src.models.agent import Agent as DbAgent
+from src.orchestrator.core.assistant_spec import AgentSpec
 
-def get_system_prompt(myAgent: DbAgent) -> str:
+def get_system_prompt(myAgent: AgentSpec) -> str:
         """Convert agent config to system instruction"""
 
         prompt = f"""
@@ -19,7 +19,7 @@ You have access to MCP Servers and tools. If an MCP server is relevant, then use
 MCP Servers available are:
 """
                 for mcp in myAgent.mcp_servers:
-                        prompt += f"""- **{mcp.mcp_server.name}**: {mcp.mcp_server.description}.
+                        prompt += f"""- **{mcp.name}**: {mcp.description}.
 """
 #                 prompt += f"""
 # Use internal knowledge only if no relevant MCP result is returned. Clearly indicate which MCPs were used.
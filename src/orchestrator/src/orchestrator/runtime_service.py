@@ -1,56 +1,88 @@
+import asyncio
+import logging
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.crud.agent import get_agent as get_dbAgent
-from src.crud.orchestrator import get_orchestrator as get_dbOrchestrator
+from src.core.database import async_session
+from src.crud.assistant import resolve_assistant
+from src.orchestrator.core.assistant_spec import OrchestratorSpec, spec_fingerprint, spec_versions
 
-from src.orchestrator.llm_agents.main_agent import get_main_agent
+from src.orchestrator.llm_agents.main_agent import get_main_agent, sub_agent_builds
 from src.orchestrator.llm_agents.sub_agent import get_sub_agent
+from src.orchestrator.core.graph_cache import build_report, graph_cache
+from src.orchestrator.core.tracing import tracer
 
-# In-memory storage for compiled graph
-graph_store = {}
+logger = logging.getLogger(__name__)
 
+# Graph builds in progress, shared by concurrent callers of the same assistant
+_inflight_builds: dict[str, asyncio.Task] = {}
 
-async def get_agent(db: AsyncSession, agentId: str, checkpointer):
-
-    if agentId in graph_store:
-        print(f"Graph {agentId} retrieved from memory")
-        graph = graph_store.get(agentId)
-        return graph
-    
-    graph = await get_main_agent_graph(db, agentId, checkpointer)
-
-    if not graph:
-        graph = await get_sub_agent_graph(db, agentId, checkpointer)
-
-    if agentId not in graph_store:
-        print(f"Graph {agentId} added to memory")
-        graph_store[agentId] = graph
-
-    return graph
 
+async def get_agent(db: AsyncSession, agentId: str, checkpointer):
 
-async def get_main_agent_graph(db: AsyncSession, agentId: str, checkpointer):
-    # get orchestrator
-    print(f"### Orchestrator Chat")
-    orchestrator = await get_dbOrchestrator(db, agentId)
-    if not orchestrator:
-        print("Orchestrator not found")
+    with tracer.span("assistant.get", {"assistant.id": str(agentId)}) as span:
+        graph = graph_cache.get(agentId)
+        if graph is not None and graph_cache.needs_validation(agentId):
+            # The assistant may have been changed through another worker, whose
+            # invalidate() never reached this cache: compare spec fingerprints
+            with tracer.span("assistant.validate"):
+                spec = await resolve_assistant(db, agentId)
+            if not graph_cache.validate(agentId, spec_fingerprint(spec) if spec is not None else None):
+                graph = None
+        span.set_attribute("graph_cache.hit", graph is not None)
+        if graph is not None:
+            logger.debug("Graph %s retrieved from memory", agentId)
+            return graph
+
+        build = _inflight_builds.get(agentId)
+        # Joined a build started by another caller (its spans are in that caller's trace)
+        span.set_attribute("build.shared", build is not None)
+        if build is None:
+            build = asyncio.create_task(_build_agent(agentId, checkpointer))
+            _inflight_builds[agentId] = build
+            build.add_done_callback(lambda _: _inflight_builds.pop(agentId, None))
+
+        # shield: a cancelled caller must not cancel the build other callers await
+        return await asyncio.shield(build)
+
+
+async def _build_agent(agentId: str, checkpointer):
+    # An invalidate() of the assistant's records from here on makes this build stale
+    with graph_cache.building() as generation:
+        return await _build_graph(agentId, checkpointer, generation)
+
+
+async def _build_graph(agentId: str, checkpointer, generation: int):
+    # Its own session: the build is shared, and may outlive the request that started it
+    async with async_session() as db:
+        with tracer.span("assistant.resolve"):
+            spec = await resolve_assistant(db, agentId)
+    if spec is None:
+        logger.warning("Assistant %s not found", agentId)
         return None
-    
-    graph = await get_main_agent(orchestrator, checkpointer)
-
-    return graph
 
-
-async def get_sub_agent_graph(db: AsyncSession, agentId: str, checkpointer):
-    # get agent
-    print(f"### Agent Chat")
-    agent = await get_dbAgent(db, agentId)
-    if not agent:
-        print("Agent not found")
-        return None
-    
-    graph = await get_sub_agent(agent, checkpointer, True)
+    kind = "orchestrator" if isinstance(spec, OrchestratorSpec) else "agent"
+    with tracer.span("graph.build", {"assistant.kind": kind, "assistant.name": spec.name}) as span, \
+            build_report() as report:
+        if kind == "orchestrator":
+            graph = await get_main_agent(spec, checkpointer)
+        else:
+            graph = await get_sub_agent(spec, checkpointer, True)
+        span.set_attribute("graph.degraded", report.degraded)
+
+    if graph_cache.put(agentId, graph, spec_fingerprint(spec), spec_versions(spec).keys(),
+                       since=generation, degraded=report.degraded):
+        if report.degraded:
+            logger.warning("Graph %s (%s) cached for %ss only, built without: %s", agentId, kind,
+                           graph_cache.degraded_ttl_seconds, "; ".join(report.issues))
+        else:
+            logger.info("Graph %s (%s) added to memory", agentId, kind)
+    elif report.degraded and not graph_cache.degraded_ttl_seconds:
+        logger.warning("Graph %s (%s) not cached, built without: %s", agentId, kind, "; ".join(report.issues))
+    else:
+        logger.info("Graph %s (%s) not cached, the assistant changed during the build", agentId, kind)
 
     return graph
 
+
+def get_graph_cache_stats():
+    return {**graph_cache.stats(), "sub_agent_builds": sub_agent_builds}
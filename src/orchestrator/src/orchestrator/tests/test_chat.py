@@ -0,0 +1,289 @@
+import asyncio
+import json
+import time
+from typing import TypedDict
+from uuid import uuid4
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import END, START, MessagesState, StateGraph
+from langgraph.types import interrupt
+
+from src.api import chat
+from src.orchestrator.core.lite_memory.sqlite_cp import get_saver
+from src.orchestrator.core.run_manager import run_manager
+
+
+@pytest.fixture
+def client(monkeypatch):
+    async def fake_get_thread(thread_id):
+        return {"thread_id": thread_id, "assistant_id": "assistant-1"}
+
+    async def fake_touch_thread(thread_id):
+        return None
+
+    monkeypatch.setattr(chat.thread_crud, "get_thread", fake_get_thread)
+    monkeypatch.setattr(chat.thread_crud, "touch_thread", fake_touch_thread)
+
+    app = FastAPI()
+    app.include_router(chat.router)
+    app.dependency_overrides[get_saver] = lambda: None
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def _wait_done(run_id: str, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        run = run_manager.get(run_id)
+        if run is not None and run.done:
+            return run
+        time.sleep(0.01)
+    raise AssertionError(f"run {run_id} did not finish")
+
+
+def test_failed_stream_run_is_recorded_as_error(client, monkeypatch):
+    async def broken_graph(db, assistant_id, checkpointer):
+        raise RuntimeError("graph build failed")
+
+    monkeypatch.setattr(chat, "get_compiled_graph", broken_graph)
+    thread_id = str(uuid4())
+    failed_before = run_manager.failed
+
+    # The error ends the response stream
+    with pytest.raises(RuntimeError):
+        client.post(f"/chat/threads/{thread_id}/runs/stream", json={"assistant_id": "assistant-1"})
+    run = _wait_done(run_manager.list(thread_id=thread_id)[0].run_id)
+
+    assert run.status == "error"
+    assert "graph build failed" in run.error
+    assert run_manager.failed == failed_before + 1
+
+
+def _interrupted_graph(thread_id: str):
+    def review(state):
+        answer = interrupt({"question": "approve?"})
+        return {"messages": [("ai", answer)]}
+
+    builder = StateGraph(MessagesState)
+    builder.add_node("review", review)
+    builder.add_edge(START, "review")
+    builder.add_edge("review", END)
+    graph = builder.compile(checkpointer=InMemorySaver())
+    graph.invoke({"messages": [("user", "hi")]}, {"configurable": {"thread_id": thread_id}})
+    return graph
+
+
+def test_history_encodes_pending_interrupts(client, monkeypatch):
+    thread_id = str(uuid4())
+    graph = _interrupted_graph(thread_id)
+
+    async def compiled_graph(db, assistant_id, checkpointer):
+        return graph
+
+    monkeypatch.setattr(chat, "get_compiled_graph", compiled_graph)
+
+    history = client.post(f"/chat/threads/{thread_id}/history", json={}).json()
+    headers = client.post(f"/chat/threads/{thread_id}/history", json={"include_values": False}).json()
+
+    latest = history[0]
+    assert latest["next"] == ["review"]
+    assert latest["interrupts"] == [{"value": {"question": "approve?"}, "id": latest["interrupts"][0]["id"]}]
+    assert latest["tasks"][0]["interrupts"] == latest["interrupts"]
+    assert latest["values"]["messages"][0]["content"] == "hi"
+    assert "values" not in headers[0]
+    assert len(headers) == len(history)
+
+
+class BatchState(TypedDict, total=False):
+    wait: float
+    fail: bool
+    out: str
+
+
+def _batch_graph(cancelled: list):
+    async def work(state):
+        try:
+            await asyncio.sleep(state.get("wait", 0))
+        except asyncio.CancelledError:
+            cancelled.append(state)
+            raise
+        if state.get("fail"):
+            raise ValueError("bad input")
+        return {"out": "done"}
+
+    builder = StateGraph(BatchState)
+    builder.add_node("work", work)
+    builder.add_edge(START, "work")
+    builder.add_edge("work", END)
+    return builder.compile(checkpointer=InMemorySaver())
+
+
+def _use_batch_graph(monkeypatch, graph):
+    async def compiled_graph(db, assistant_id, checkpointer):
+        return graph
+
+    monkeypatch.setattr(chat, "get_compiled_graph", compiled_graph)
+
+
+def _ndjson(response):
+    return sorted((json.loads(line) for line in response.text.splitlines() if line), key=lambda item: item["index"])
+
+
+def test_batch_reports_errors_per_input(client, monkeypatch):
+    graph = _batch_graph([])
+    _use_batch_graph(monkeypatch, graph)
+
+    response = client.post("/chat/runs/batch", json={
+        "assistant_id": "assistant-1",
+        "inputs": [{}, {"fail": True}, {}],
+        "max_concurrency": 2,
+    })
+    items = _ndjson(response)
+
+    assert [item["status"] for item in items] == ["success", "error", "success"]
+    assert "bad input" in items[1]["error"]
+    assert items[0]["output"]["out"] == "done"
+    # Ephemeral: no thread and nothing written to the checkpointer
+    assert all(item["thread_id"] is None for item in items)
+    assert not graph.checkpointer.storage
+
+
+def test_persisted_batch_runs_each_input_on_its_own_thread(client, monkeypatch):
+    graph = _batch_graph([])
+    _use_batch_graph(monkeypatch, graph)
+    created = []
+
+    async def fake_create_thread(thread):
+        created.append(str(uuid4()))
+        return {"thread_id": created[-1]}
+
+    async def fake_set_thread_assistant(thread_id, assistant_id):
+        return None
+
+    monkeypatch.setattr(chat.thread_crud, "create_thread", fake_create_thread)
+    monkeypatch.setattr(chat.thread_crud, "set_thread_assistant", fake_set_thread_assistant)
+
+    response = client.post("/chat/runs/batch", json={
+        "assistant_id": "assistant-1",
+        "inputs": [{}, {}],
+        "ephemeral": False,
+    })
+    items = _ndjson(response)
+
+    assert sorted(item["thread_id"] for item in items) == sorted(created)
+    for thread_id in created:
+        state = graph.get_state({"configurable": {"thread_id": thread_id}})
+        assert state.values["out"] == "done"
+
+
+class _ConnectedRequest:
+    async def is_disconnected(self):
+        return False
+
+
+def test_batch_is_cancelled_when_the_client_leaves(monkeypatch):
+    cancelled = []
+    _use_batch_graph(monkeypatch, _batch_graph(cancelled))
+
+    async def run():
+        request = chat.RunBatchRequest(assistant_id="assistant-1", inputs=[{}, {"wait": 30}], max_concurrency=2)
+        earlier = {run.run_id for run in run_manager.list()}
+        response = await chat.batch_runs(request, _ConnectedRequest(), checkpointer=None)
+        first = await anext(response.body_iterator)
+        # The client goes away after the first line
+        await response.body_iterator.aclose()
+        batch = next(run for run in run_manager.list() if run.run_id not in earlier)
+        await asyncio.wait([batch.task], timeout=2)
+        return first, batch
+
+    first, batch = asyncio.run(run())
+
+    assert json.loads(first)["index"] == 0
+    assert batch.status == "interrupted"
+    assert cancelled == [{"wait": 30}]
+
+
+def test_background_run_reaches_success(client, monkeypatch):
+    graph = _batch_graph([])
+    _use_batch_graph(monkeypatch, graph)
+    client.app.dependency_overrides[get_saver] = lambda: graph.checkpointer
+    thread_id = str(uuid4())
+
+    created = client.post(f"/chat/threads/{thread_id}/runs", json={"assistant_id": "assistant-1", "input": {}}).json()
+    run = _wait_done(created["run_id"])
+    status = client.get(f"/chat/threads/{thread_id}/runs/{run.run_id}").json()
+    joined = client.get(f"/chat/threads/{thread_id}/runs/{run.run_id}/join")
+
+    assert created["background"] and created["thread_id"] == thread_id
+    assert status["status"] == "success"
+    assert joined.json()["out"] == "done"
+
+
+def _use_temporary_threads(monkeypatch) -> tuple:
+    created, deleted = [], []
+
+    async def fake_create_thread(thread):
+        created.append(str(uuid4()))
+        return {"thread_id": created[-1]}
+
+    async def fake_delete_thread(thread_id):
+        deleted.append(thread_id)
+        return True
+
+    monkeypatch.setattr(chat.thread_crud, "create_thread", fake_create_thread)
+    monkeypatch.setattr(chat.thread_crud, "delete_thread", fake_delete_thread)
+    return created, deleted
+
+
+@pytest.mark.parametrize("on_completion", ["delete", "keep"])
+def test_stateless_wait_deletes_its_thread_unless_kept(client, monkeypatch, on_completion):
+    graph = _batch_graph([])
+    _use_batch_graph(monkeypatch, graph)
+    client.app.dependency_overrides[get_saver] = lambda: graph.checkpointer
+    created, deleted = _use_temporary_threads(monkeypatch)
+
+    response = client.post("/chat/runs/wait", json={
+        "assistant_id": "assistant-1", "input": {}, "on_completion": on_completion,
+    })
+    checkpoints = graph.checkpointer.storage.get(created[0])
+
+    assert response.json()["out"] == "done"
+    if on_completion == "keep":
+        assert not deleted and checkpoints
+    else:
+        # The thread row and its checkpoints are gone
+        assert deleted == created and not checkpoints
+
+
+def test_join_reports_slow_and_failed_runs(client, monkeypatch):
+    _use_batch_graph(monkeypatch, _batch_graph([]))
+    thread_id = str(uuid4())
+
+    def start(input_data):
+        return client.post(f"/chat/threads/{thread_id}/runs", json={"assistant_id": "assistant-1", "input": input_data}).json()
+
+    slow = start({"wait": 0.5})
+    timed_out = client.get(f"/chat/threads/{thread_id}/runs/{slow['run_id']}/join", params={"timeout": 0.05})
+    failed = start({"fail": True})
+    _wait_done(failed["run_id"])
+    joined = client.get(f"/chat/threads/{thread_id}/runs/{failed['run_id']}/join")
+    _wait_done(slow["run_id"])
+
+    assert timed_out.status_code == 408
+    assert joined.status_code == 500
+    assert "bad input" in joined.json()["detail"]
+
+
+def test_background_run_is_rejected_when_the_queue_is_full(client, monkeypatch):
+    _use_batch_graph(monkeypatch, _batch_graph([]))
+    monkeypatch.setattr(run_manager, "max_background_queued", 1)
+    monkeypatch.setattr(run_manager, "background_queued", 1)
+    rejected_before = run_manager.rejected
+
+    response = client.post(f"/chat/threads/{uuid4()}/runs", json={"assistant_id": "assistant-1", "input": {}})
+
+    assert response.status_code == 429
+    assert run_manager.rejected == rejected_before + 1
@@ -0,0 +1,80 @@
+import asyncio
+
+import aiosqlite
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from src.orchestrator.core.checkpoint_retention import CheckpointRetention
+from src.orchestrator.core.lite_memory.sqlite_tuned import TunedSqliteSaver
+
+
+async def _put_checkpoints(saver, thread_id: str, count: int, tagged: int = -1) -> list:
+    ids = []
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    for step in range(count):
+        checkpoint = empty_checkpoint()
+        config = await saver.aput(config, checkpoint, {"step": step, "retain": step == tagged}, {})
+        await saver.aput_writes(config, [("messages", step)], task_id="task-1")
+        ids.append(checkpoint["id"])
+    return ids
+
+
+async def _scalar(saver, sql: str):
+    async with saver.conn.execute(sql) as cur:
+        return (await cur.fetchone())[0]
+
+
+def test_retention_prunes_only_threads_past_keep_last(tmp_path):
+    async def run():
+        async with TunedSqliteSaver.from_conn_string(str(tmp_path / "checkpoints.db"), window=0) as saver:
+            long_ids = await _put_checkpoints(saver, "long", 6, tagged=1)
+            short_ids = await _put_checkpoints(saver, "short", 2)
+            retention = CheckpointRetention(keep_last=2, interval=0, batch_size=2, vacuum_pages=100)
+            retention.start(saver)
+            overfull = await retention.store.overfull(2)
+            result = await retention.run_once()
+            await retention.close()
+            remaining = {
+                thread_id: [item.checkpoint["id"] async for item in saver.alist({"configurable": {"thread_id": thread_id}})]
+                for thread_id in ("long", "short")
+            }
+            writes = await _scalar(saver, "SELECT count(*) FROM writes")
+            auto_vacuum = await _scalar(saver, "PRAGMA auto_vacuum")
+            return long_ids, short_ids, overfull, result, remaining, writes, auto_vacuum
+
+    long_ids, short_ids, overfull, result, remaining, writes, auto_vacuum = asyncio.run(run())
+
+    assert overfull == [("long", "")]
+    # The newest two and the tagged one are kept
+    assert remaining["long"] == [long_ids[5], long_ids[4], long_ids[1]]
+    assert remaining["short"] == short_ids[::-1]
+    assert result["checkpoints_deleted"] == 3
+    # Writes of the deleted checkpoints go with them
+    assert writes == 5
+    # A new file is created in incremental vacuum mode
+    assert auto_vacuum == 2
+
+
+def test_reclaim_does_not_convert_an_existing_file(tmp_path):
+    path = str(tmp_path / "checkpoints.db")
+
+    async def run():
+        async with AsyncSqliteSaver.from_conn_string(path) as saver:
+            await _put_checkpoints(saver, "thread-1", 4)
+        async with aiosqlite.connect(path) as conn:
+            saver = TunedSqliteSaver(conn, path=path, window=0)
+            await saver.setup()
+            retention = CheckpointRetention(keep_last=1, interval=0, vacuum_pages=100)
+            retention.start(saver)
+            result = await retention.run_once()
+            await retention.run_once()
+            skipped = retention.store.vacuum_skipped
+            await retention.close()
+            auto_vacuum = await _scalar(saver, "PRAGMA auto_vacuum")
+            await saver.aclose()
+            return result, skipped, auto_vacuum
+
+    result, skipped, auto_vacuum = asyncio.run(run())
+
+    assert result["checkpoints_deleted"] == 3
+    assert skipped and auto_vacuum == 0
@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.core import db_metrics as db_metrics_module
+from src.core.db_metrics import DatabaseMetrics, TimedQueuePool, _percentile
+
+
+def test_percentiles_over_recent_samples():
+    samples = [i / 1000 for i in range(1, 101)]
+
+    assert _percentile([], 0.5) == 0.0
+    assert (_percentile(samples, 0.5), _percentile(samples, 0.99)) == (0.051, 0.1)
+
+    metrics = DatabaseMetrics(samples=10)
+    for seconds in samples:
+        metrics.record_checkout(seconds)
+    waits = metrics.stats()["checkout_wait_ms"]
+
+    # Percentiles cover the last 10 checkouts, avg and max all of them
+    assert (waits["p50"], waits["p99"], waits["max"]) == (96.0, 100.0, 100.0)
+    assert waits["avg"] == 50.5
+
+
+def test_engine_statements_and_checkouts_are_recorded(tmp_path, monkeypatch):
+    metrics = DatabaseMetrics(slow_query_ms=0.000001, slow_samples=2)
+    monkeypatch.setattr(db_metrics_module, "db_metrics", metrics)
+
+    async def run():
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{tmp_path / 'app.db'}",
+            poolclass=TimedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.05,
+        )
+        metrics.attach(engine)
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY)"))
+                await conn.execute(text("INSERT INTO items VALUES (1)"))
+                with pytest.raises(OperationalError):
+                    await conn.execute(text("SELECT * FROM missing"))
+                # The only connection is checked out, the next checkout times out
+                with pytest.raises(PoolTimeoutError):
+                    async with engine.connect():
+                        pass
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT count(*) FROM items"))
+            return metrics.stats(engine.pool)
+        finally:
+            await engine.dispose()
+
+    stats = asyncio.run(run())
+
+    assert (stats["checkouts"], stats["checkout_timeouts"]) == (3, 1)
+    assert stats["checkout_wait_ms"]["max"] >= 50
+    assert (stats["queries"], stats["query_errors"]) == (3, 1)
+    assert stats["slow_queries"] == 3
+    assert [query["statement"] for query in stats["recent_slow_queries"]] == [
+        "INSERT INTO items VALUES (1)", "SELECT count(*) FROM items",
+    ]
+    assert stats["pool"] == {"size": 1, "checked_out": 0, "checked_in": 1, "overflow": 0}
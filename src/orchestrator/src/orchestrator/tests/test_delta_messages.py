@@ -0,0 +1,89 @@
+import asyncio
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, RemoveMessage
+from langgraph.graph import END, START, MessagesState, StateGraph
+
+from src.orchestrator.core.checkpoint_retention import CheckpointRetention
+from src.orchestrator.core.delta_messages import DeltaMessageSaver
+from src.orchestrator.core.lite_memory.sqlite_tuned import TunedSqliteSaver
+
+
+def _chat_graph(checkpointer):
+    def reply(state):
+        last = state["messages"][-1]
+        if last.content == "forget":
+            return {"messages": [RemoveMessage(id=message.id) for message in state["messages"][:2]]}
+        return {"messages": [AIMessage(content=f"echo {last.content}")]}
+
+    builder = StateGraph(MessagesState)
+    builder.add_node("reply", reply)
+    builder.add_edge(START, "reply")
+    builder.add_edge("reply", END)
+    return builder.compile(checkpointer=checkpointer)
+
+
+async def _count_rows(saver, table: str) -> int:
+    async with saver.conn.execute(f"SELECT count(*) FROM {table}") as cur:
+        return (await cur.fetchone())[0]
+
+
+def test_messages_round_trip_and_are_stored_once(tmp_path):
+    async def run():
+        async with TunedSqliteSaver.from_conn_string(str(tmp_path / "checkpoints.db"), window=0) as saver:
+            cp = DeltaMessageSaver(saver)
+            await cp.setup()
+            serialized = []
+            dumps_typed = cp.serde.dumps_typed
+
+            def counted_dumps_typed(obj):
+                if isinstance(obj, BaseMessage):
+                    serialized.append(obj.content)
+                return dumps_typed(obj)
+
+            cp.serde.dumps_typed = counted_dumps_typed
+            graph = _chat_graph(cp)
+            config = {"configurable": {"thread_id": "thread-1"}}
+            for turn in ("one", "two", "three"):
+                await graph.ainvoke({"messages": [HumanMessage(content=turn)]}, config)
+            state = await graph.aget_state(config)
+            history = [item async for item in cp.alist(config)]
+            return cp, saver, state, history, serialized, await _count_rows(saver, "checkpoint_messages")
+
+    cp, saver, state, history, serialized, stored = asyncio.run(run())
+
+    contents = ["one", "echo one", "two", "echo two", "three", "echo three"]
+    assert [message.content for message in state.values["messages"]] == contents
+    assert all(isinstance(item.checkpoint["channel_values"].get("messages", []), list) for item in history)
+    # Each message is serialized and stored once, later steps reuse its digest
+    assert sorted(serialized) == sorted(contents)
+    assert stored == cp.bodies_written == 6
+    # Bodies went through the saver's group commit
+    assert saver.statements >= 6 + len(history)
+
+
+def test_retention_deletes_bodies_no_checkpoint_refers_to(tmp_path):
+    async def run():
+        async with TunedSqliteSaver.from_conn_string(str(tmp_path / "checkpoints.db"), window=0) as saver:
+            cp = DeltaMessageSaver(saver)
+            await cp.setup()
+            graph = _chat_graph(cp)
+            config = {"configurable": {"thread_id": "thread-1"}}
+            for turn in ("one", "two", "forget"):
+                await graph.ainvoke({"messages": [HumanMessage(content=turn)]}, config)
+
+            retention = CheckpointRetention(keep_last=1, interval=0, vacuum_pages=0)
+            retention.start(cp)
+            result = await retention.run_once()
+            await retention.close()
+            stored = await _count_rows(saver, "checkpoint_messages")
+
+            await graph.ainvoke({"messages": [HumanMessage(content="four")]}, config)
+            state = await graph.aget_state(config)
+            return result, stored, state
+
+    result, stored, state = asyncio.run(run())
+
+    # "one" and "echo one" were removed from the state, only old checkpoints referred to them
+    assert result["messages_deleted"] == 2
+    assert stored == 3
+    assert [message.content for message in state.values["messages"]] == ["two", "echo two", "forget", "four", "echo four"]
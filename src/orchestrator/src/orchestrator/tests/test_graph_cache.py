@@ -0,0 +1,23 @@
+from src.orchestrator.core.graph_cache import GraphCache
+
+
+def test_invalidations_are_kept_only_while_older_builds_run():
+    cache = GraphCache(max_entries=10, ttl_seconds=0, revalidate_seconds=0)
+
+    # No build in progress: nothing to remember
+    cache.invalidate("agent-0")
+    remembered_idle = dict(cache._invalidated)
+
+    with cache.building() as slow:
+        cache.invalidate("agent-1")
+        with cache.building() as fast:
+            cache.invalidate("agent-2")
+            fast_cached = cache.put("orchestrator-2", "graph", dependencies=["agent-1"], since=fast)
+        # The newer build is done, the slow one still needs both
+        remembered_slow = sorted(cache._invalidated)
+        slow_cached = cache.put("orchestrator-1", "graph", dependencies=["agent-2"], since=slow)
+
+    assert remembered_idle == {}
+    assert fast_cached and not slow_cached
+    assert remembered_slow == ["agent-1", "agent-2"]
+    assert cache._invalidated == {} and cache._builds == {}
@@ -0,0 +1,51 @@
+import json
+import logging
+import queue
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.core.log import ContextFilter, JsonFormatter, RequestContextMiddleware, _QueueHandler, log_context
+
+
+def _queued_logger(name: str):
+    records = queue.SimpleQueue()
+    handler = _QueueHandler(records)
+    handler.addFilter(ContextFilter())
+    logger = logging.getLogger(name)
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger, records
+
+
+def test_json_records_carry_bound_ids_and_extra_fields():
+    logger, records = _queued_logger("test.log.json")
+
+    with log_context(run_id="run-1", thread_id="thread-1"):
+        logger.info("Run %s done", "run-1", extra={"duration_ms": 12})
+    logger.info("outside")
+
+    inside = json.loads(JsonFormatter().format(records.get_nowait()))
+    outside = json.loads(JsonFormatter().format(records.get_nowait()))
+    assert inside["message"] == "Run run-1 done"
+    assert (inside["run_id"], inside["thread_id"], inside["duration_ms"]) == ("run-1", "thread-1", 12)
+    assert "run_id" not in outside
+
+
+def test_request_id_is_bound_and_returned():
+    logger, records = _queued_logger("test.log.request")
+    app = FastAPI()
+    app.add_middleware(RequestContextMiddleware)
+
+    @app.get("/")
+    async def index():
+        logger.info("handled")
+        return {}
+
+    client = TestClient(app)
+    response = client.get("/", headers={"X-Request-ID": "req-1"})
+
+    assert response.headers["x-request-id"] == "req-1"
+    assert records.get_nowait().request_id == "req-1"
+    assert client.get("/").headers["x-request-id"]
@@ -0,0 +1,40 @@
+import asyncio
+import logging
+from types import SimpleNamespace
+
+from src.orchestrator.core import mcp_pool as mcp_pool_module
+from src.orchestrator.core.mcp_pool import McpSessionPool
+
+
+def _server(modified_at: str):
+    return SimpleNamespace(id="server-1", name="files", modified_at=modified_at,
+                           config_json={"command": "files"}, transport="stdio")
+
+
+def test_close_waits_for_replaced_sessions(monkeypatch, caplog):
+    closed = []
+
+    async def slow_close(self):
+        await asyncio.sleep(0.05)
+        closed.append(self.version)
+        if self.version == "v1":
+            raise RuntimeError("server process hung")
+
+    monkeypatch.setattr(mcp_pool_module.McpServerSession, "close", slow_close)
+
+    async def run():
+        pool = McpSessionPool()
+        pool.get(_server("v1"))
+        # The config changed: v1 closes in the background
+        current = pool.get(_server("v2"))
+        closing = len(pool._closing)
+        await pool.close()
+        return current, closing, len(pool._closing)
+
+    with caplog.at_level(logging.ERROR, logger=mcp_pool_module.__name__):
+        current, closing, remaining = asyncio.run(run())
+
+    assert current.version == "v2"
+    assert (closing, remaining) == (1, 0)
+    assert sorted(closed) == ["v1", "v2"]
+    assert "Closing the replaced session of MCP server files failed" in caplog.text
@@ -0,0 +1,55 @@
+import asyncio
+
+from langchain_core.messages import AIMessageChunk
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import END, START, MessagesState, StateGraph
+
+from src.orchestrator.core.metrics import (
+    MetricsRegistry,
+    checkpoint_writes,
+    instrument_checkpointer,
+    llm_tokens,
+    record_message,
+)
+
+
+def test_histograms_render_cumulative_buckets():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+    requests = registry.counter("requests_total", "Requests", ("route",))
+
+    for value in (0.05, 0.5, 0.5, 5.0):
+        latency.observe(value, "/a")
+    requests.inc("/a")
+    requests.inc("/a")
+    text = registry.render()
+
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/a",le="1.0"} 3' in text
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 4' in text
+    assert 'latency_seconds_sum{route="/a"} 6.05' in text
+    assert 'latency_seconds_count{route="/a"} 4' in text
+    assert 'requests_total{route="/a"} 2' in text
+    assert "# TYPE latency_seconds histogram" in text
+
+
+def test_record_message_counts_reported_tokens():
+    chunk = AIMessageChunk(content="hi", usage_metadata={"input_tokens": 7, "output_tokens": 3, "total_tokens": 10})
+    before = llm_tokens.value("test-provider", "test-model", "output")
+
+    record_message("assistant-1", chunk, {"ls_provider": "test-provider", "ls_model_name": "test-model"})
+
+    assert llm_tokens.value("test-provider", "test-model", "output") - before == 3
+
+
+def test_instrumented_checkpointer_times_writes():
+    builder = StateGraph(MessagesState)
+    builder.add_node("echo", lambda state: {"messages": [("ai", "ok")]})
+    builder.add_edge(START, "echo")
+    builder.add_edge("echo", END)
+    graph = builder.compile(checkpointer=instrument_checkpointer(InMemorySaver()))
+    before = checkpoint_writes.count("aput")
+
+    asyncio.run(graph.ainvoke({"messages": [("user", "hi")]}, {"configurable": {"thread_id": "t-1"}}))
+
+    assert checkpoint_writes.count("aput") > before
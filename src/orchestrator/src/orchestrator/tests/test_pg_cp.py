@@ -0,0 +1,173 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from uuid import uuid4
+
+import asyncpg
+import pytest
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from src.core.config import CHECKPOINT_PG_DSN
+from src.orchestrator.core.delta_messages import DeltaMessageSaver
+from src.orchestrator.core.pg_memory.pg_cp import AsyncPostgresSaver, WriteBatcher, strip_nul
+
+
+def test_strip_nul_keeps_escaped_backslashes():
+    metadata = {"path": "C:\\u0000dir", "note\x00": ["a\x00b", ("c\x00",)], "step": 1}
+
+    encoded = JsonPlusSerializer().dumps(strip_nul(metadata)).decode()
+
+    assert json.loads(encoded) == {"path": "C:\\u0000dir", "note": ["ab", ["c"]], "step": 1}
+
+
+class _FakePool:
+    """Records the rows each transaction committed, fails on rows starting with "bad\""""
+
+    def __init__(self):
+        self.transactions = []
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self
+
+    @asynccontextmanager
+    async def transaction(self):
+        self._rows = []
+        yield
+        self.transactions.append(self._rows)
+
+    async def executemany(self, sql, rows):
+        if any(row[0] == "bad" for row in rows):
+            raise ValueError("bad row")
+        self._rows.extend(rows)
+
+
+def test_write_batcher_commits_concurrent_writes_together():
+    pool = _FakePool()
+
+    async def run():
+        batcher = WriteBatcher(pool, window=0.01)
+        results = await asyncio.gather(
+            batcher.submit("INSERT a", [("a1",)]),
+            batcher.submit("INSERT b", [("b1",), ("b2",)]),
+            batcher.submit("INSERT a", [("bad",)]),
+            batcher.submit("INSERT a", [("a2",)]),
+            return_exceptions=True,
+        )
+        await batcher.close()
+        return batcher, results
+
+    batcher, results = asyncio.run(run())
+
+    # The batch failed as a whole, then each write was retried on its own
+    assert [type(result) for result in results] == [type(None), type(None), ValueError, type(None)]
+    assert pool.transactions == [[("a1",)], [("b1",), ("b2",)], [("a2",)]]
+    assert batcher.stats() == {"batches": 3, "statements": 3, "pending": 0}
+
+
+def test_write_batcher_commits_statements_of_one_submit_together():
+    pool = _FakePool()
+
+    async def run():
+        batcher = WriteBatcher(pool, window=0.01)
+        results = await asyncio.gather(
+            batcher.submit("INSERT a", [("a1",)], before=[("INSERT m", [("m1",)])]),
+            batcher.submit("INSERT a", [("a2",)], before=[("INSERT m", [("bad",)])]),
+            return_exceptions=True,
+        )
+        await batcher.close()
+        return results
+
+    results = asyncio.run(run())
+
+    # The rows queued before a failed one are rolled back with it
+    assert [type(result) for result in results] == [type(None), ValueError]
+    assert pool.transactions == [[("m1",), ("a1",)]]
+
+
+async def _postgres_available() -> bool:
+    try:
+        conn = await asyncpg.connect(CHECKPOINT_PG_DSN, timeout=1)
+    except (OSError, asyncio.TimeoutError, asyncpg.PostgresError):
+        return False
+    await conn.close()
+    return True
+
+
+def test_saver_round_trip():
+    if not asyncio.run(_postgres_available()):
+        pytest.skip("Postgres is not available")
+    schema = f"test_{uuid4().hex[:8]}"
+
+    async def run():
+        async with AsyncPostgresSaver.from_conn_string(CHECKPOINT_PG_DSN, schema=schema) as saver:
+            try:
+                config = {"configurable": {"thread_id": "thread-1", "checkpoint_ns": ""}}
+                ids = []
+                for step in range(3):
+                    checkpoint = empty_checkpoint()
+                    config = await saver.aput(config, checkpoint, {"step": step, "note": "C:\\u0000\x00"}, {})
+                    ids.append(checkpoint["id"])
+                await saver.aput_writes(config, [("messages", "pending")], task_id="task-1")
+
+                latest = await saver.aget_tuple({"configurable": {"thread_id": "thread-1"}})
+                listed = [item async for item in saver.alist({"configurable": {"thread_id": "thread-1"}}, limit=2)]
+                filtered = [item async for item in saver.alist(None, filter={"step": 0})]
+                await saver.adelete_thread("thread-1")
+                deleted = await saver.aget_tuple({"configurable": {"thread_id": "thread-1"}})
+                return ids, latest, listed, filtered, deleted
+            finally:
+                async with saver.pool.acquire() as conn:
+                    await conn.execute(f"DROP SCHEMA {schema} CASCADE")
+
+    ids, latest, listed, filtered, deleted = asyncio.run(run())
+
+    assert latest.checkpoint["id"] == ids[-1]
+    assert latest.metadata["note"] == "C:\\u0000"
+    assert latest.pending_writes == [("task-1", "messages", "pending")]
+    assert latest.parent_config["configurable"]["checkpoint_id"] == ids[-2]
+    assert [item.checkpoint["id"] for item in listed] == ids[:0:-1]
+    assert [item.checkpoint["id"] for item in filtered] == [ids[0]]
+    assert deleted is None
+
+
+def test_message_bodies_share_the_checkpoint_commit():
+    if not asyncio.run(_postgres_available()):
+        pytest.skip("Postgres is not available")
+    schema = f"test_{uuid4().hex[:8]}"
+
+    async def run():
+        async with AsyncPostgresSaver.from_conn_string(CHECKPOINT_PG_DSN, schema=schema) as saver:
+            try:
+                cp = DeltaMessageSaver(saver)
+                await cp.setup()
+                submitted = []
+                submit = saver.batcher.submit
+
+                async def recorded_submit(sql, rows, *, before=()):
+                    submitted.append([statement for statement, _ in before] + [sql])
+                    await submit(sql, rows, before=before)
+
+                saver.batcher.submit = recorded_submit
+                config = {"configurable": {"thread_id": "thread-1", "checkpoint_ns": ""}}
+                messages = []
+                for content in ("one", "two"):
+                    messages.append(HumanMessage(content=content, id=content))
+                    checkpoint = empty_checkpoint()
+                    checkpoint["channel_values"] = {"messages": list(messages)}
+                    config = await cp.aput(config, checkpoint, {}, {})
+                # A new saver has no bodies cached, it reads them from the store
+                latest = await DeltaMessageSaver(saver).aget_tuple(config)
+                return submitted, latest
+            finally:
+                async with saver.pool.acquire() as conn:
+                    await conn.execute(f"DROP SCHEMA {schema} CASCADE")
+
+    submitted, latest = asyncio.run(run())
+
+    # Each checkpoint went with its new message in one submit, the only one of the step
+    assert len(submitted) == 2
+    assert all(len(statements) == 2 and "messages" in statements[0] for statements in submitted)
+    assert [message.content for message in latest.checkpoint["channel_values"]["messages"]] == ["one", "two"]
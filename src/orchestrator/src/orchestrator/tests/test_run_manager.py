@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from src.orchestrator.core.run_manager import Run, RunManager, RunQueueFull
+
+
+def test_runs_wait_for_a_slot_of_their_assistant():
+    async def run():
+        manager = RunManager(max_concurrent=2, max_per_assistant=1, max_queued=1, history=10)
+        release = asyncio.Event()
+
+        first = manager.submit(Run("run-1", "thread-1", "assistant-1"), release.wait)
+        await asyncio.sleep(0)
+        second = manager.submit(Run("run-2", "thread-2", "assistant-1"), release.wait)
+        await asyncio.sleep(0)
+        statuses = (first.status, second.status)
+
+        with pytest.raises(RunQueueFull):
+            manager.submit(Run("run-3", "thread-3", "assistant-1"), release.wait)
+
+        release.set()
+        await asyncio.wait([first.task, second.task])
+        return statuses, manager.stats()
+
+    statuses, stats = asyncio.run(run())
+
+    assert statuses == ("running", "pending")
+    assert stats["succeeded"] == 2
+    assert stats["rejected"] == 1
+    assert stats["queued"] == 0
+
+
+def test_cancel_interrupts_the_run():
+    async def run():
+        manager = RunManager(history=10)
+        run = manager.submit(Run("run-1", "thread-1", "assistant-1"), asyncio.Event().wait)
+        await asyncio.sleep(0)
+
+        cancelled = await manager.cancel("run-1", wait=True)
+        return cancelled, run, manager
+
+    cancelled, run, manager = asyncio.run(run())
+
+    assert cancelled
+    assert run.status == "interrupted"
+    assert run.finished_at is not None
+    assert manager.get("run-1") is run
+    assert not manager.active
+
+
+def test_background_runs_wait_for_a_worker():
+    async def run():
+        manager = RunManager(max_concurrent=0, max_per_assistant=0, history=10, background_workers=1)
+        release = asyncio.Event()
+
+        background = manager.submit(Run("run-1", "thread-1", "assistant-1"), release.wait, background=True)
+        queued = manager.submit(Run("run-2", "thread-2", "assistant-1"), release.wait, background=True)
+        stream = manager.submit(Run("run-3", "thread-3", "assistant-1"), release.wait)
+        await asyncio.sleep(0)
+        statuses = (background.status, queued.status, stream.status)
+        waiting = manager.stats()["background_queued"]
+
+        release.set()
+        await manager.wait("run-2")
+        return statuses, waiting, queued.status
+
+    statuses, waiting, status = asyncio.run(run())
+
+    # Interactive runs don't wait on the background workers
+    assert statuses == ("running", "pending", "running")
+    assert waiting == 1
+    assert status == "success"
+
+
+def test_assistant_slots_are_dropped_once_idle():
+    async def run():
+        manager = RunManager(max_concurrent=0, max_per_assistant=1, history=10)
+        release = asyncio.Event()
+
+        first = manager.submit(Run("run-1", "thread-1", "assistant-1"), release.wait)
+        waiting = manager.submit(Run("run-2", "thread-2", "assistant-1"), release.wait)
+        other = manager.submit(Run("run-3", "thread-3", "assistant-2"), release.wait)
+        await asyncio.sleep(0)
+        held = sorted(manager._assistant_slots)
+
+        # A run cancelled while it waits for the slot leaves nothing behind either
+        await manager.cancel(waiting.run_id, wait=True)
+        await manager.cancel(other.run_id, wait=True)
+        after_cancel = sorted(manager._assistant_slots)
+
+        release.set()
+        await asyncio.wait([first.task])
+        return held, after_cancel, manager
+
+    held, after_cancel, manager = asyncio.run(run())
+
+    assert held == ["assistant-1", "assistant-2"]
+    assert after_cancel == ["assistant-1"]
+    assert not manager._assistant_slots and not manager._assistant_runs
@@ -0,0 +1,226 @@
+import asyncio
+from dataclasses import replace
+from datetime import datetime, timezone
+from uuid import UUID, uuid4
+
+from src.orchestrator import runtime_service
+from src.orchestrator.core.assistant_spec import AgentSpec, ApiKeySpec, McpServerSpec, OrchestratorSpec
+from src.orchestrator.core import mcp_service
+from src.orchestrator.llm_agents import main_agent
+from src.orchestrator.core.graph_cache import build_report, graph_cache
+
+
+CONCURRENT_REQUESTS = 50
+
+
+def _fake_orchestrator(orchestrator_id: str):
+    now = datetime.now(timezone.utc)
+    api_key = ApiKeySpec(id=uuid4(), provider_name="openai", model_name="gpt", base_url=None,
+                         secret_key="sk", modified_at=now)
+    return OrchestratorSpec(id=UUID(orchestrator_id), name="Orchestrator", description=None,
+                            instructions="", api_key=api_key, agents=(), modified_at=now)
+
+
+def test_concurrent_first_requests_compile_once(monkeypatch):
+    """N concurrent cold-start requests for one assistant share a single build."""
+    assistant_id = str(uuid4())
+    calls = {"load": 0, "compile": 0}
+
+    async def fake_resolve_assistant(db, agentId):
+        calls["load"] += 1
+        await asyncio.sleep(0.05)  # simulate DB round trip
+        return _fake_orchestrator(agentId)
+
+    async def fake_get_main_agent(dbOrchestrator, checkpointer):
+        calls["compile"] += 1
+        await asyncio.sleep(0.2)  # simulate LLM clients, MCP discovery and compile
+        return object()
+
+    monkeypatch.setattr(runtime_service, "resolve_assistant", fake_resolve_assistant)
+    monkeypatch.setattr(runtime_service, "get_main_agent", fake_get_main_agent)
+    graph_cache.clear()
+
+    async def run():
+        return await asyncio.gather(*[
+            runtime_service.get_agent(None, assistant_id, None)
+            for _ in range(CONCURRENT_REQUESTS)
+        ])
+
+    graphs = asyncio.run(run())
+
+    assert calls == {"load": 1, "compile": 1}
+    assert all(graph is graphs[0] for graph in graphs)
+    assert assistant_id in graph_cache
+    assert not runtime_service._inflight_builds
+
+
+def test_cancelled_caller_does_not_cancel_shared_build(monkeypatch):
+    assistant_id = str(uuid4())
+    calls = {"compile": 0}
+
+    async def fake_resolve_assistant(db, agentId):
+        return _fake_orchestrator(agentId)
+
+    async def fake_get_main_agent(dbOrchestrator, checkpointer):
+        calls["compile"] += 1
+        await asyncio.sleep(0.1)
+        return object()
+
+    monkeypatch.setattr(runtime_service, "resolve_assistant", fake_resolve_assistant)
+    monkeypatch.setattr(runtime_service, "get_main_agent", fake_get_main_agent)
+    graph_cache.clear()
+
+    async def run():
+        first = asyncio.create_task(runtime_service.get_agent(None, assistant_id, None))
+        second = asyncio.create_task(runtime_service.get_agent(None, assistant_id, None))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) is not None
+    assert calls["compile"] == 1
+
+
+def _fake_sub_agent(name: str):
+    now = datetime.now(timezone.utc)
+    api_key = ApiKeySpec(id=uuid4(), provider_name="openai", model_name="gpt", base_url=None,
+                         secret_key="sk", modified_at=now)
+    return AgentSpec(id=uuid4(), name=name, description=None, role="", task="", instructions="",
+                     api_key=api_key, mcp_servers=(), modified_at=now)
+
+
+def test_sub_agents_build_concurrently_and_skip_failures(monkeypatch):
+    agents = [_fake_sub_agent(f"agent-{i}") for i in range(6)]
+    running = {"now": 0, "max": 0}
+
+    async def fake_get_sub_agent(agent):
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+        await asyncio.sleep(0.05)  # simulate MCP discovery
+        running["now"] -= 1
+        if agent.name == "agent-3":
+            raise ConnectionError("MCP server down")
+        return agent.name
+
+    monkeypatch.setattr(main_agent, "get_sub_agent", fake_get_sub_agent)
+    monkeypatch.setattr(main_agent, "SUB_AGENT_BUILD_CONCURRENCY", 3)
+
+    built = asyncio.run(main_agent._build_sub_agents(agents))
+
+    assert built == ["agent-0", "agent-1", "agent-2", "agent-4", "agent-5"]
+    assert running["max"] == 3
+    assert "ConnectionError" in main_agent.sub_agent_builds[str(agents[3].id)]["error"]
+    assert main_agent.sub_agent_builds[str(agents[0].id)]["duration_ms"] > 0
+
+
+def test_cached_graph_rebuilt_when_spec_changed_elsewhere(monkeypatch):
+    """A change made through another worker is noticed by comparing spec fingerprints."""
+    assistant_id = str(uuid4())
+    spec = {"current": _fake_orchestrator(assistant_id)}
+    calls = {"compile": 0}
+
+    async def fake_resolve_assistant(db, agentId):
+        return spec["current"]
+
+    async def fake_get_main_agent(dbOrchestrator, checkpointer):
+        calls["compile"] += 1
+        return object()
+
+    monkeypatch.setattr(runtime_service, "resolve_assistant", fake_resolve_assistant)
+    monkeypatch.setattr(runtime_service, "get_main_agent", fake_get_main_agent)
+    monkeypatch.setattr(graph_cache, "revalidate_seconds", 0.01)
+    graph_cache.clear()
+
+    async def run():
+        first = await runtime_service.get_agent(None, assistant_id, None)
+        await asyncio.sleep(0.02)
+        unchanged = await runtime_service.get_agent(None, assistant_id, None)
+        # Updated by another worker: no invalidate() in this process
+        spec["current"] = replace(spec["current"], modified_at=datetime.now(timezone.utc))
+        await asyncio.sleep(0.02)
+        changed = await runtime_service.get_agent(None, assistant_id, None)
+        return first, unchanged, changed
+
+    first, unchanged, changed = asyncio.run(run())
+
+    assert unchanged is first
+    assert changed is not first
+    assert calls["compile"] == 2
+
+
+def test_build_invalidated_midway_is_not_cached(monkeypatch):
+    assistant_id = str(uuid4())
+
+    async def fake_resolve_assistant(db, agentId):
+        return _fake_orchestrator(agentId)
+
+    async def fake_get_main_agent(dbOrchestrator, checkpointer):
+        # The assistant is updated while its graph is being built
+        graph_cache.invalidate(assistant_id)
+        return object()
+
+    monkeypatch.setattr(runtime_service, "resolve_assistant", fake_resolve_assistant)
+    monkeypatch.setattr(runtime_service, "get_main_agent", fake_get_main_agent)
+    graph_cache.clear()
+
+    graph = asyncio.run(runtime_service.get_agent(None, assistant_id, None))
+
+    assert graph is not None
+    assert assistant_id not in graph_cache
+    assert graph_cache.discarded >= 1
+
+
+def test_graph_built_without_mcp_tools_is_cached_briefly(monkeypatch):
+    now = datetime.now(timezone.utc)
+    server = McpServerSpec(id=uuid4(), name="files", description=None, transport="streamable_http",
+                           mode="autonomous", config="{}", modified_at=now)
+    agent = replace(_fake_sub_agent("agent"), mcp_servers=(server,))
+
+    async def fake_resolve_assistant(db, agentId):
+        return agent
+
+    async def server_down(mcp, timeout=None):
+        raise ConnectionError("MCP server down")
+
+    async def fake_get_sub_agent(spec, checkpointer=None, enable_checkpoint=False):
+        assert await mcp_service.get_mcp_servers_tools(spec.mcp_servers) == []
+        return object()
+
+    monkeypatch.setattr(runtime_service, "resolve_assistant", fake_resolve_assistant)
+    monkeypatch.setattr(runtime_service, "get_sub_agent", fake_get_sub_agent)
+    monkeypatch.setattr(mcp_service, "get_server_tools", server_down)
+    graph_cache.clear()
+
+    asyncio.run(runtime_service.get_agent(None, str(agent.id), None))
+
+    entry = graph_cache._entries[str(agent.id)]
+    assert entry.ttl_seconds == graph_cache.degraded_ttl_seconds
+
+
+def test_failed_sub_agents_mark_the_build_degraded(monkeypatch):
+    agents = [_fake_sub_agent("healthy"), _fake_sub_agent("broken")]
+
+    async def fake_get_sub_agent(agent):
+        if agent.name == "broken":
+            raise ConnectionError("MCP server down")
+        return agent.name
+
+    monkeypatch.setattr(main_agent, "get_sub_agent", fake_get_sub_agent)
+
+    async def run():
+        with build_report() as report:
+            built = await main_agent._build_sub_agents(agents)
+        return built, report
+
+    built, report = asyncio.run(run())
+
+    assert built == ["healthy"]
+    assert report.degraded
+    assert "broken" in report.issues[0]
+
+
+def test_spec_repr_hides_secret_key():
+    spec = _fake_orchestrator(str(uuid4()))
+
+    assert "secret_key" not in repr(spec)
+    assert spec.api_key.secret_key == "sk"
@@ -0,0 +1,82 @@
+import asyncio
+import sqlite3
+
+from langgraph.checkpoint.base import empty_checkpoint
+
+from src.orchestrator.core.lite_memory import sqlite_tuned
+from src.orchestrator.core.lite_memory.sqlite_tuned import TunedSqliteSaver
+
+
+async def _put_checkpoints(saver, thread_id: str, count: int) -> list:
+    ids = []
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    for step in range(count):
+        checkpoint = empty_checkpoint()
+        config = await saver.aput(config, checkpoint, {"step": step}, {})
+        ids.append(checkpoint["id"])
+    await saver.aput_writes(config, [("messages", "pending")], task_id="task-1")
+    return ids
+
+
+def test_alist_reads_history_in_pages(tmp_path, monkeypatch):
+    monkeypatch.setattr(sqlite_tuned, "_LIST_PAGE_SIZE", 3)
+
+    async def run():
+        async with TunedSqliteSaver.from_conn_string(str(tmp_path / "checkpoints.db"), window=0) as saver:
+            ids = await _put_checkpoints(saver, "thread-1", 7)
+            await _put_checkpoints(saver, "thread-2", 2)
+            reads = []
+            read = saver._read
+
+            async def counted_read(query, params):
+                items = await read(query, params)
+                reads.append(len(items))
+                return items
+
+            saver._read = counted_read
+            config = {"configurable": {"thread_id": "thread-1"}}
+            listed = [item async for item in saver.alist(config)]
+            limited = [item async for item in saver.alist(config, limit=4)]
+            before = {"configurable": {"checkpoint_id": ids[3]}}
+            older = [item async for item in saver.alist(config, before=before)]
+            filtered = [item async for item in saver.alist(config, filter={"step": 5})]
+            return ids, listed, limited, older, filtered, reads
+
+    ids, listed, limited, older, filtered, reads = asyncio.run(run())
+    newest_first = ids[::-1]
+
+    assert [item.checkpoint["id"] for item in listed] == newest_first
+    assert listed[0].pending_writes == [("task-1", "messages", "pending")]
+    assert [item.checkpoint["id"] for item in limited] == newest_first[:4]
+    assert [item.checkpoint["id"] for item in older] == ids[:3][::-1]
+    assert [item.metadata["step"] for item in filtered] == [5]
+    # 7 rows in pages of 3, then 4 rows as 3 + 1, then 3 rows and an empty page, then the filter
+    assert reads == [3, 3, 1, 3, 1, 3, 0, 1]
+
+
+def test_aclose_waits_for_the_commit_in_progress(tmp_path):
+    path = str(tmp_path / "checkpoints.db")
+
+    async def run():
+        async with TunedSqliteSaver.from_conn_string(path, window=0) as saver:
+            commit = saver.conn.commit
+            started = asyncio.Event()
+
+            async def slow_commit():
+                started.set()
+                await asyncio.sleep(0.05)
+                await commit()
+
+            saver.conn.commit = slow_commit
+            checkpoint = empty_checkpoint()
+            config = {"configurable": {"thread_id": "thread-1", "checkpoint_ns": ""}}
+            write = asyncio.create_task(saver.aput(config, checkpoint, {}, {}))
+            await started.wait()
+        # Closed while the commit ran: the write still completes
+        await asyncio.wait_for(write, 1)
+        return checkpoint["id"]
+
+    checkpoint_id = asyncio.run(run())
+
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT checkpoint_id FROM checkpoints").fetchall() == [(checkpoint_id,)]
@@ -0,0 +1,201 @@
+import asyncio
+import json
+import threading
+
+from langchain_core.messages import AIMessageChunk, HumanMessage, ToolMessage, SystemMessage
+
+from src.orchestrator.core.run_streams import RunStreamRegistry
+from src.orchestrator.helpers.streaming import SseFrameBuffer, RunEventLog, coalesce_message_chunks, KEEPALIVE_FRAME
+from src.orchestrator.helpers.utils import MetadataTemplate, create_metadata, LangChainMessageEncoder
+from src.orchestrator.helpers.serializer import JsonSerializer, OrjsonSerializer, orjson
+
+
+def test_slow_client_pauses_producer_at_high_watermark():
+    async def run():
+        buffer = SseFrameBuffer(high_watermark=100, low_watermark=40, max_write_bytes=30)
+        produced = 0
+
+        async def produce():
+            nonlocal produced
+            for _ in range(20):
+                await buffer.put("x" * 10)
+                produced += 1
+            buffer.close()
+
+        producer = asyncio.create_task(produce())
+        await asyncio.sleep(0.01)
+        paused_at = produced
+
+        writes = [data async for data in buffer.stream(keepalive=None)]
+        await producer
+        return paused_at, writes, buffer.pauses
+
+    paused_at, writes, pauses = asyncio.run(run())
+
+    assert paused_at == 10  # 100 bytes buffered, nothing drained yet
+    assert "".join(writes) == "x" * 200
+    assert all(len(data) <= 30 for data in writes)
+    assert pauses >= 1
+
+
+def test_keepalive_sent_while_run_is_quiet():
+    async def run():
+        buffer = SseFrameBuffer()
+
+        async def produce():
+            await asyncio.sleep(0.12)
+            await buffer.put("event: values\ndata: {}\n\n")
+            buffer.close()
+
+        producer = asyncio.create_task(produce())
+        writes = [data async for data in buffer.stream(keepalive=0.05)]
+        await producer
+        return writes
+
+    writes = asyncio.run(run())
+
+    assert writes[:2] == [KEEPALIVE_FRAME, KEEPALIVE_FRAME]
+    assert writes[-1] == "event: values\ndata: {}\n\n"
+
+
+def test_event_log_replays_after_last_event_id(tmp_path):
+    async def run():
+        log = RunEventLog(max_bytes=50, spill_path=str(tmp_path / "run.sse"), max_write_bytes=30)
+        frames = [f"id: {i}\ndata: {i:02}\n\n" for i in range(10)]
+
+        async def produce():
+            for frame in frames[:5]:
+                await log.put(frame)
+            await asyncio.sleep(0.01)
+            for frame in frames[5:]:
+                await log.put(frame)
+            log.close()
+
+        producer = asyncio.create_task(produce())
+        first = [data async for data in log.stream(keepalive=None)]
+        resumed = [data async for data in log.stream(after=3, keepalive=None)]
+        await producer
+        log.discard()
+        return frames, first, resumed
+
+    frames, first, resumed = asyncio.run(run())
+
+    # Older frames were spilled to disk and are replayed from there
+    assert "".join(first) == "".join(frames)
+    assert "".join(resumed) == "".join(frames[4:])
+    assert all(len(data) <= 30 for data in resumed)
+    assert not (tmp_path / "run.sse").exists()
+
+
+def test_adjacent_chunks_of_a_message_are_coalesced():
+    metadata = {"langgraph_checkpoint_ns": "agent:1"}
+
+    async def events():
+        for token in ["Hel", "lo", " world"]:
+            yield ("messages", (AIMessageChunk(content=token, id="run-1"), metadata))
+        yield ("values", {"messages": []})
+        yield ("messages", (AIMessageChunk(content="next", id="run-2"), metadata))
+
+    async def run():
+        return [event async for event in coalesce_message_chunks(events(), interval=1)]
+
+    result = asyncio.run(run())
+
+    assert [mode for mode, _ in result] == ["messages", "values", "messages"]
+    assert result[0][1][0].content == "Hello world"
+    assert result[0][1][1] is metadata
+    assert result[2][1][0].content == "next"
+
+
+def test_metadata_template_matches_create_metadata():
+    headers = {"host": "localhost:8000", "x-request-id": "req-1", "user-agent": "pytest"}
+    template = MetadataTemplate("run-1", "thread-1", "assistant-1", headers)
+    chunks = [
+        {},
+        {"langgraph_step": 1, "langgraph_node": "agent", "langgraph_triggers": ("branch:to:agent",)},
+        {"thread_id": "thread-1", "langgraph_node": "agent", "ls_temperature": 0.5},
+        {"thread_id": "other-thread", "run_attempt": True, "checkpoint_ns": "agent:1"},
+    ]
+
+    for chunk in chunks:
+        expected = json.dumps(create_metadata("run-1", "thread-1", "assistant-1", headers, chunk),
+                              cls=LangChainMessageEncoder)
+        assert template.render(chunk) == expected
+
+
+def test_serializers_match_langchain_message_encoder():
+    ai_chunk = AIMessageChunk(content="Hi ✓", id="run-1", tool_call_chunks=[
+        {"name": "search", "args": '{"q": 1}', "id": "call-1", "index": 0}])
+    frame = {
+        "messages": [
+            HumanMessage(content="مرحبا", id="h-1"),
+            ai_chunk,
+            ToolMessage(content="result", tool_call_id="call-1", artifact={"rows": 2}),
+            SystemMessage(content="system"),
+        ],
+        "step": 2,
+        "ratio": 0.25,
+        1: None,
+    }
+    expected = json.dumps(frame, cls=LangChainMessageEncoder)
+
+    assert JsonSerializer().dumps(frame) == expected
+    if orjson is not None:
+        # Same values, consistently compact
+        compact = json.dumps(json.loads(expected), separators=(",", ":"), ensure_ascii=False)
+        assert OrjsonSerializer().dumps(frame) == compact
+        assert OrjsonSerializer().dumps({"big": 2 ** 70, "text": "✓"}) == '{"big":1180591620717411303424,"text":"✓"}'
+
+
+def test_event_log_spills_in_batches_off_the_event_loop(tmp_path):
+    path = tmp_path / "run.sse"
+
+    async def run():
+        log = RunEventLog(max_bytes=20, spill_path=str(path), max_write_bytes=1000)
+        writes = []
+        append_spill = log._append_spill
+
+        def recorded_append_spill(data):
+            writes.append((threading.current_thread() is threading.main_thread(), data.count(b"\n\n")))
+            append_spill(data)
+
+        log._append_spill = recorded_append_spill
+        frames = [f"data: {i:02}\n\n" for i in range(10)]
+        for frame in frames:
+            await log.put(frame)
+        # Not written yet, the evicted frames are read from memory
+        pending = log.stats()["frames_spill_pending"]
+        log.close()
+        replayed = [data async for data in log.stream(keepalive=None)]
+        await log.flush()
+        spilled = path.read_text()
+        resumed = [data async for data in log.stream(after=2, keepalive=None)]
+        log.discard()
+        await log.flush()
+        return frames, writes, pending, replayed, spilled, resumed
+
+    frames, writes, pending, replayed, spilled, resumed = asyncio.run(run())
+
+    assert pending == 8
+    assert "".join(replayed) == "".join(frames)
+    assert spilled == "".join(frames[:8])
+    assert writes == [(False, 8)]
+    assert "".join(resumed) == "".join(frames[3:])
+    assert not path.exists()
+
+
+def test_registry_drops_expired_logs_in_the_background(tmp_path):
+    async def run():
+        registry = RunStreamRegistry(spill_dir=str(tmp_path), retain=0.01)
+        registry.prune_interval = 0.01
+        registry.start()
+        log = registry.create("run-1", "thread-1")
+        log.close()
+        await asyncio.sleep(0.05)
+        expired = registry.expired
+        await registry.close()
+        return expired, registry.stats()["runs"]
+
+    expired, runs = asyncio.run(run())
+
+    assert (expired, runs) == (1, 0)
@@ -0,0 +1,117 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api import chat
+from src.crud import thread as thread_crud
+from src.crud.thread import ThreadCache
+from src.orchestrator.core import thread_sweeper as sweeper_module
+from src.orchestrator.core.lite_memory.sqlite_cp import get_saver
+from src.orchestrator.core.thread_sweeper import ThreadSweeper
+
+
+def test_thread_cache_evicts_least_recent_and_expires():
+    cache = ThreadCache(max_entries=2, ttl=0.05)
+    cache.put("a", {"thread_id": "a"})
+    cache.put("b", {"thread_id": "b"})
+    cache.get("a")
+    cache.put("c", {"thread_id": "c"})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"thread_id": "a"}
+    time.sleep(0.06)
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 1
+
+
+def test_thread_cache_disabled_without_ttl():
+    cache = ThreadCache(max_entries=10, ttl=0)
+    cache.put("a", {"thread_id": "a"})
+
+    assert cache.get("a") is None
+
+
+class _FlakyCheckpointer:
+    def __init__(self, fail_on: str):
+        self.fail_on = fail_on
+        self.deleted = []
+
+    async def adelete_thread(self, thread_id: str):
+        if thread_id == self.fail_on:
+            self.fail_on = None
+            raise ConnectionError("checkpointer unavailable")
+        self.deleted.append(thread_id)
+
+
+def test_sweeper_keeps_thread_rows_until_their_checkpoints_are_gone(monkeypatch):
+    rows = {"t-1", "t-2", "t-3"}
+
+    async def fake_get_expired_thread_ids(limit):
+        return sorted(rows)[:limit]
+
+    async def fake_delete_threads(thread_ids):
+        rows.difference_update(thread_ids)
+        return len(thread_ids)
+
+    monkeypatch.setattr(sweeper_module, "get_expired_thread_ids", fake_get_expired_thread_ids)
+    monkeypatch.setattr(sweeper_module, "delete_threads", fake_delete_threads)
+    checkpointer = _FlakyCheckpointer(fail_on="t-2")
+    sweeper = ThreadSweeper(interval=0, batch_size=2)
+    sweeper.checkpointer = checkpointer
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(sweeper.sweep())
+    # The batch whose checkpoints were not all deleted keeps its rows for the next sweep
+    assert rows == {"t-1", "t-2", "t-3"}
+
+    assert asyncio.run(sweeper.sweep()) == 3
+    assert rows == set()
+    assert sorted(set(checkpointer.deleted)) == ["t-1", "t-2", "t-3"]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    created = []
+
+    async def fake_create_thread(thread):
+        created.append(thread)
+        return {"thread_id": "thread-1", "created_at": "", "updated_at": "", "metadata": {},
+                "status": "idle", "config": {}}
+
+    async def fake_get_thread(thread_id):
+        return {"thread_id": thread_id, "assistant_id": None}
+
+    async def fake_touch_thread(thread_id):
+        return None
+
+    monkeypatch.setattr(chat.thread_crud, "create_thread", fake_create_thread)
+    monkeypatch.setattr(chat.thread_crud, "get_thread", fake_get_thread)
+    monkeypatch.setattr(chat.thread_crud, "touch_thread", fake_touch_thread)
+
+    app = FastAPI()
+    app.include_router(chat.router)
+    app.dependency_overrides[get_saver] = lambda: None
+    with TestClient(app) as test_client:
+        test_client.created = created
+        yield test_client
+
+
+def test_create_thread_validates_ttl(client):
+    assert client.post("/chat/threads", json={"ttl": {"ttl": "soon"}}).status_code == 422
+    assert client.post("/chat/threads", json={"ttl": {"ttl": -5}}).status_code == 422
+    assert client.post("/chat/threads", json={"ttl": {"strategy": "keep", "ttl": 5}}).status_code == 422
+    assert not client.created
+
+    assert client.post("/chat/threads", json={"ttl": {"ttl": 30}}).status_code == 200
+    assert client.created[0]["ttl_minutes"] == 30
+
+
+def test_run_with_invalid_assistant_id_is_rejected(client):
+    response = client.post("/chat/threads/thread-1/runs/stream", json={"assistant_id": "not-a-uuid"})
+
+    assert response.status_code == 422
+    with pytest.raises(ValueError):
+        asyncio.run(thread_crud.set_thread_assistant("thread-1", "not-a-uuid"))
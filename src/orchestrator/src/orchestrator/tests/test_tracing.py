@@ -0,0 +1,68 @@
+import asyncio
+from typing import TypedDict
+
+import pytest
+from langgraph.graph import END, START, StateGraph
+
+from src.orchestrator.core import tracing
+from src.orchestrator.core.tracing import NOOP_SPAN, Tracer, TracingCallbackHandler
+
+
+def test_spans_nest_and_record_errors():
+    tracer = Tracer(exporter="memory", max_spans=10)
+
+    with tracer.span("run", root=True) as root:
+        with tracer.span("build", {"assistant.id": "a-1"}):
+            pass
+        with pytest.raises(ValueError):
+            with tracer.span("resolve"):
+                raise ValueError("boom")
+
+    spans = {span["name"]: span for span in tracer.recent()}
+    run, build, resolve = spans["run"], spans["build"], spans["resolve"]
+
+    assert run["parent_id"] is None
+    assert build["parent_id"] == resolve["parent_id"] == root.span_id
+    assert {build["context"]["trace_id"], resolve["context"]["trace_id"]} == {root.trace_id}
+    assert build["attributes"] == {"assistant.id": "a-1"}
+    assert build["status"]["status_code"] == "OK"
+    assert resolve["status"]["status_code"] == "ERROR"
+    assert resolve["events"][0]["attributes"]["exception.type"] == "ValueError"
+
+
+def test_disabled_tracer_returns_the_noop_span():
+    tracer = Tracer(exporter="none")
+
+    with tracer.span("run") as span:
+        span.set_attribute("key", "value")
+
+    assert span is NOOP_SPAN
+    assert tracer.recent() == []
+
+
+def test_callback_handler_traces_graph_nodes(monkeypatch):
+    tracer = Tracer(exporter="memory", max_spans=100)
+    monkeypatch.setattr(tracing, "tracer", tracer)
+
+    class State(TypedDict):
+        count: int
+
+    builder = StateGraph(State)
+    builder.add_node("first", lambda state: {"count": state["count"] + 1})
+    builder.add_node("second", lambda state: {"count": state["count"] + 1})
+    builder.add_edge(START, "first")
+    builder.add_edge("first", "second")
+    builder.add_edge("second", END)
+    graph = builder.compile()
+
+    async def run():
+        with tracer.span("run.stream", root=True) as root:
+            async for _ in graph.astream({"count": 0}, config={"callbacks": [TracingCallbackHandler(root)]}):
+                pass
+        return root
+
+    root = asyncio.run(run())
+    nodes = [span for span in tracer.recent() if span["name"].startswith("node ")]
+
+    assert [span["name"] for span in reversed(nodes)] == ["node first", "node second"]
+    assert all(span["parent_id"] == root.span_id for span in nodes)
@@ -0,0 +1,40 @@
+import asyncio
+from uuid import uuid4
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from src.orchestrator.core.usage_recorder import UsageRecorder
+
+
+def test_tracker_sums_usage_per_api_key():
+    api_key_id = str(uuid4())
+    llm = GenericFakeChatModel(
+        messages=iter([AIMessage(content="ok", usage_metadata={"input_tokens": 5, "output_tokens": 2, "total_tokens": 7})] * 2),
+        metadata={"api_key_id": api_key_id},
+    )
+    recorder = UsageRecorder(enabled=True, interval=0)
+    tracker = recorder.track(str(uuid4()), str(uuid4()), str(uuid4()))
+
+    async def run():
+        for _ in range(2):
+            await llm.ainvoke("hi", config={"callbacks": [tracker]})
+
+    asyncio.run(run())
+    rows = tracker.rows("success")
+
+    assert len(rows) == 1
+    assert str(rows[0]["api_key_id"]) == api_key_id
+    assert (rows[0]["llm_calls"], rows[0]["input_tokens"], rows[0]["output_tokens"]) == (2, 10, 4)
+
+
+def test_recorder_drops_oldest_rows_past_max_pending():
+    recorder = UsageRecorder(enabled=True, interval=0, max_pending=2)
+    trackers = [recorder.track(str(uuid4()), None, None) for _ in range(3)]
+
+    for tracker in trackers:
+        recorder.record(tracker, "success")
+
+    assert recorder.stats()["pending"] == 2
+    assert recorder.dropped == 1
+    assert UsageRecorder(enabled=False).track("run", None, None) is None
@@ -0,0 +1,30 @@
+from pydantic import BaseModel
+from datetime import date
+from uuid import UUID
+from typing import Optional
+
+class UsageTotals(BaseModel):
+    runs: int
+    llm_calls: int
+    input_tokens: int
+    output_tokens: int
+    total_tokens: int
+    avg_duration_ms: Optional[float] = None
+    avg_first_token_ms: Optional[float] = None
+
+class ApiKeyUsage(UsageTotals):
+    api_key_id: Optional[UUID] = None
+    api_key_name: Optional[str] = None
+    provider: Optional[str] = None
+    model: Optional[str] = None
+
+class AssistantUsage(UsageTotals):
+    assistant_id: Optional[UUID] = None
+    assistant_name: Optional[str] = None
+    assistant_type: Optional[str] = None
+
+class DailyUsage(UsageTotals):
+    day: date
+
+class ThreadUsage(UsageTotals):
+    thread_id: UUID